@@ -0,0 +1,319 @@
+"""HatchSmith benchmark: times every export stage on deterministic synthetic images and compares the results with a saved baseline. © FIWAtec GmbH"""
+import os,re,sys,json,time,shutil,zipfile,argparse,platform,tempfile,tracemalloc,multiprocessing,concurrent.futures
+from PIL import Image
+import PIL
+import numpy as np
+from hatchSmithcore import (ExportJob,Exporter,StageProfiler,PngStripWriter,QUANTIZE_METHODS,ANGLE_SETS,TRAVEL_MODES,PNG_MODES,SVG_ENCODINGS,HATCH_ENGINES,BUNDLE_MODES,Cfg,
+    safe_mkdir,rgb_to_hex,quantize_image_rgb,open_source)
+try:
+    import resource
+except ImportError:
+    resource=None
+KINDS=["gradient","photo","flat","speckle"]
+BENCH_SEED=1234
+BENCH_COLORS=(Cfg.MIN_COLORS,Cfg.MAX_COLORS)
+LAYER_LINE=re.compile(r"^\d+ - ",re.M)
+BENCH_THRESHOLD=0.15
+BENCH_MIN_S=0.05
+GEN_ROWS=256
+NOISE_OCTAVES=((4,0.55),(16,0.3),(64,0.15))
+NOISE_GRAIN=6.0
+FLAT_RECTS=24
+SPECKLE_DENSITY=0.004
+def bench_size(mp):
+    w=max(16,int(round((mp*1e6*4/3)**0.5)))
+    return w,max(16,int(round(mp*1e6/w)))
+def case_name(kind,mp,n_colors):
+    return f"{kind}_{mp:g}mp_{n_colors}c"
+def synth_context(kind,w,h,seed):
+    rng=np.random.default_rng([seed,KINDS.index(kind)])
+    if kind=="photo":
+        xf=np.linspace(0.0,1.0,w)
+        octaves=[]
+        for cells,amp in NOISE_OCTAVES:
+            gw=cells+1
+            gh=max(2,int(round(cells*h/w))+1)
+            grid=rng.uniform(0.0,255.0,(gh,gw,3))
+            pos=xf*(gw-1)
+            j0=np.minimum(pos.astype(np.int64),gw-2)
+            t=(pos-j0)[None,:,None]
+            octaves.append((amp,(grid[:,j0]*(1-t)+grid[:,j0+1]*t).astype(np.float32)))
+        return octaves
+    if kind=="flat":
+        colors=rng.integers(0,256,(6,3))
+        rects=[]
+        for _ in range(FLAT_RECTS):
+            x0,x1=np.sort(rng.uniform(0.0,1.0,2))
+            y0,y1=np.sort(rng.uniform(0.0,1.0,2))
+            rects.append((int(x0*w),int(x1*w)+1,int(y0*h),int(y1*h)+1,colors[rng.integers(len(colors))].astype(np.uint8)))
+        return rects
+    if kind=="speckle":
+        return rng.integers(0,256,(8,3)).astype(np.uint8)
+    return None
+def synth_rows(kind,w,h,y0,y1,seed,ctx):
+    rng=np.random.default_rng([seed,KINDS.index(kind),y0])
+    if kind=="gradient":
+        x=np.linspace(0.0,1.0,w,dtype=np.float32)[None,:]
+        y=(np.arange(y0,y1,dtype=np.float32)/max(1,h-1))[:,None]
+        rgb=np.empty((y1-y0,w,3),dtype=np.uint8)
+        rgb[...,0]=x*255.0
+        rgb[...,1]=y*255.0
+        rgb[...,2]=127.5+127.5*np.cos(6.2831855*(x+y))
+        return rgb
+    if kind=="photo":
+        acc=np.zeros((y1-y0,w,3),dtype=np.float32)
+        for amp,rows in ctx:
+            fy=np.arange(y0,y1)*(rows.shape[0]-1)/max(1,h-1)
+            i0=np.minimum(fy.astype(np.int64),rows.shape[0]-2)
+            t=(fy-i0).astype(np.float32)[:,None,None]
+            acc+=amp*(rows[i0]*(1-t)+rows[i0+1]*t)
+        acc+=rng.normal(0.0,NOISE_GRAIN,acc.shape).astype(np.float32)
+        return np.clip(acc,0.0,255.0).astype(np.uint8)
+    if kind=="flat":
+        rgb=np.full((y1-y0,w,3),232,dtype=np.uint8)
+        for x0,x1,ry0,ry1,c in ctx:
+            a,b=max(ry0,y0),min(ry1,y1)
+            if a<b:
+                rgb[a-y0:b-y0,x0:x1]=c
+        return rgb
+    rgb=np.full((y1-y0,w,3),236,dtype=np.uint8)
+    n=int((y1-y0)*w*SPECKLE_DENSITY)
+    ys=rng.integers(0,y1-y0,n)
+    xs=rng.integers(0,w,n)
+    c=ctx[rng.integers(0,len(ctx),n)]
+    rgb[ys,xs]=c
+    wide=rng.random(n)<0.5
+    rgb[ys[wide],np.minimum(xs[wide]+1,w-1)]=c[wide]
+    return rgb
+def synth_input(work,kind,mp,seed):
+    path=os.path.join(safe_mkdir(os.path.join(work,"inputs")),f"{kind}_{mp:g}mp_s{seed}.png")
+    if os.path.isfile(path):
+        return path
+    w,h=bench_size(mp)
+    ctx=synth_context(kind,w,h,seed)
+    tmp=f"{path}.{os.getpid()}.tmp"
+    wr=PngStripWriter(tmp,w,h,"RGB",1)
+    try:
+        for y0 in range(0,h,GEN_ROWS):
+            wr.write(synth_rows(kind,w,h,y0,min(h,y0+GEN_ROWS),seed,ctx))
+    finally:
+        wr.close()
+    os.replace(tmp,path)
+    return path
+def bench_labels(palette,counts):
+    total=max(1,int(sum(counts)))
+    lines=[]
+    for k,i in enumerate(reversed(range(len(palette))),start=1):
+        r,g,b=(min(255,int(v)+9) for v in palette[i])
+        lines.append(f"{k:02d} - label_{k:02d} (#{rgb_to_hex(r,g,b)}) Anteil {counts[i]/total*100.0:.2f}%")
+    return "\n".join(lines)
+def case_labels(path,n_colors,method):
+    with Image.open(path) as im:
+        _,_,palette,counts=quantize_image_rgb(im.convert("RGB"),n_colors,method)
+    return bench_labels(palette,counts)
+class BenchProfiler(StageProfiler):
+    def begin(self,name,cat="stage"):
+        if cat=="stage" and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self.base=tracemalloc.get_traced_memory()[0]
+        return super().begin(name,cat)
+    def end(self,span,paths=None,files=()):
+        peak=(tracemalloc.get_traced_memory()[1]-self.base)/2**20 if span[1]=="stage" and tracemalloc.is_tracing() else None
+        super().end(span,paths,files)
+        if peak is not None:
+            self.spans[-1]["peak_mb"]=peak
+def bench_export(job,run):
+    prof=BenchProfiler()
+    out=Exporter(job,profiler=prof).run()
+    for span in prof.spans:
+        if span["cat"] not in ("stage","step"):
+            continue
+        st=run.setdefault(span["name"],{"s":0.0,"step":True} if span["cat"]=="step" else {"s":0.0})
+        st["s"]+=span["wall"]
+        if "peak_mb" in span:
+            st["peak_mb"]=max(st.get("peak_mb",0.0),span["peak_mb"])
+    with open_source(job.input_png_path) as im:
+        size=im.size
+    return size,len(LAYER_LINE.findall(read_layer_list(out)))
+def read_layer_list(out):
+    path=os.path.join(out,"layer_list.txt")
+    if os.path.isfile(path):
+        with open(path,"r",encoding="utf-8") as f:
+            return f.read()
+    with zipfile.ZipFile(os.path.join(out,"export.zip")) as z:
+        return z.read("layer_list.txt").decode("utf-8")
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss/2**20 if sys.platform=="darwin" else rss/2**10
+def run_case(job,repeat,stage_memory,warm_cache=False):
+    if job.cache_mb>0:
+        shutil.rmtree(job.cache_dir,ignore_errors=True)
+    if warm_cache:
+        shutil.rmtree(job.output_dir,ignore_errors=True)
+        Exporter(job).run()
+    if stage_memory:
+        tracemalloc.start()
+    stages={}
+    try:
+        for _ in range(max(1,repeat)):
+            shutil.rmtree(job.output_dir,ignore_errors=True)
+            if job.cache_mb>0 and not warm_cache:
+                shutil.rmtree(job.cache_dir,ignore_errors=True)
+            run={}
+            size,n_labels=bench_export(job,run)
+            for name,st in run.items():
+                best=stages.setdefault(name,dict(st))
+                best["s"]=min(best["s"],st["s"])
+                if "peak_mb" in st:
+                    best["peak_mb"]=max(best["peak_mb"],st["peak_mb"])
+    finally:
+        if stage_memory:
+            tracemalloc.stop()
+    return {"size":list(size),"labels":n_labels,"stages":stages,"total_s":sum(st["s"] for st in stages.values() if not st.get("step")),"peak_rss_mb":peak_rss_mb()}
+def run_isolated(fn,*args):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1,mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn,*args).result()
+def compare_results(base,new,threshold,min_s=BENCH_MIN_S):
+    old={c["name"]:c for c in base.get("cases",[])}
+    rows=[]
+    for c in new["cases"]:
+        b=old.get(c["name"])
+        if b is None:
+            continue
+        metrics=[("total","s",b.get("total_s"),c.get("total_s")),("peak_rss","MB",b.get("peak_rss_mb"),c.get("peak_rss_mb"))]
+        for stage,st in c["stages"].items():
+            bs=b["stages"].get(stage,{})
+            metrics.append((stage,"s",bs.get("s"),st["s"]))
+            metrics.append((stage,"MB",bs.get("peak_mb"),st.get("peak_mb")))
+        for stage,unit,was,now in metrics:
+            if was is None or now is None or (unit=="s" and max(was,now)<min_s):
+                continue
+            rows.append((c["name"],stage,unit,was,now,now>was*(1.0+threshold)))
+    return rows
+def job_from_args(args,input_path,output_dir,n_colors,labels_text=""):
+    job=ExportJob()
+    job.input_png_path=input_path
+    job.output_dir=output_dir
+    job.n_colors=int(n_colors)
+    job.labels_text=labels_text
+    job.force_user_order=bool(labels_text)
+    job.quantize_method=args.quantize
+    job.pen_mm=float(args.pen_mm)
+    job.draw_w_mm=float(args.width_mm)
+    job.angle_set=args.hatching
+    job.hatch_angle=float(args.angle)
+    job.use_crosshatch=not args.no_crosshatch
+    job.join_serpentine=args.join
+    job.travel_order=args.travel
+    job.svg_encoding=args.svg_encoding
+    job.hatch_engine=args.hatch_engine
+    job.export_png_layers=not args.no_png_layers
+    job.png_crop=args.png_crop
+    job.png_mode=args.png_mode
+    job.png_compress=int(args.png_compress)
+    job.png_workers=int(args.png_workers)
+    job.svg_workers=int(args.svg_workers)
+    job.memory_budget_mb=int(args.memory_budget_mb)
+    job.speckle_filter=args.speckle_filter
+    job.panel_w_mm=float(args.panel_w_mm)
+    job.panel_h_mm=float(args.panel_h_mm)
+    job.panel_overlap_mm=float(args.panel_overlap_mm)
+    job.export_gcode=args.gcode
+    job.export_hpgl=args.hpgl
+    job.export_segments=args.segments
+    job.bundle=args.bundle
+    job.cache_mb=int(args.cache_mb)
+    job.cache_dir=output_dir+"_cache"
+    return job
+def number_list(cast):
+    return lambda text:[cast(v) for v in text.split(",") if v.strip()]
+def build_parser():
+    ap=argparse.ArgumentParser(prog="hatchSmithbench",description="Benchmark the export pipeline stage by stage on deterministic synthetic images.")
+    ap.add_argument("--kinds",type=lambda text:[v.strip() for v in text.split(",") if v.strip()],default=KINDS,help="comma list of "+", ".join(KINDS))
+    ap.add_argument("--sizes",type=number_list(float),default=[1.0],help="comma list of image sizes in megapixels, e.g. 1,4,16,100")
+    ap.add_argument("--colors",type=number_list(int),default=[2,16,64],help=f"comma list of palette sizes ({BENCH_COLORS[0]}-{BENCH_COLORS[1]})")
+    ap.add_argument("--seed",type=int,default=BENCH_SEED)
+    ap.add_argument("--repeat",type=int,default=1,help="runs per case; the fastest time per stage is kept")
+    ap.add_argument("--quantize",choices=QUANTIZE_METHODS,default=QUANTIZE_METHODS[0])
+    ap.add_argument("--pen-mm",type=float,default=Cfg.DEFAULT_PEN_MM)
+    ap.add_argument("--width-mm",type=float,default=Cfg.DEFAULT_DRAW_W_MM)
+    ap.add_argument("--hatching",choices=ANGLE_SETS,default=Cfg.DEFAULT_ANGLE_SET)
+    ap.add_argument("--angle",type=float,default=Cfg.DEFAULT_HATCH_ANGLE)
+    ap.add_argument("--no-crosshatch",action="store_true")
+    ap.add_argument("--join",action="store_true")
+    ap.add_argument("--travel",choices=TRAVEL_MODES,default=TRAVEL_MODES[0])
+    ap.add_argument("--svg-encoding",choices=SVG_ENCODINGS,default=SVG_ENCODINGS[0])
+    ap.add_argument("--hatch-engine",choices=HATCH_ENGINES,default=HATCH_ENGINES[0])
+    ap.add_argument("--no-png-layers",action="store_true")
+    ap.add_argument("--png-crop",action="store_true")
+    ap.add_argument("--png-mode",choices=PNG_MODES,default=PNG_MODES[0])
+    ap.add_argument("--png-compress",type=int,choices=range(10),default=Cfg.DEFAULT_PNG_COMPRESS,metavar="0-9")
+    ap.add_argument("--png-workers",type=int,default=Cfg.DEFAULT_PNG_WORKERS)
+    ap.add_argument("--svg-workers",type=int,default=Cfg.DEFAULT_SVG_WORKERS)
+    ap.add_argument("--memory-budget-mb",type=int,default=0,help="benchmark the tiled low-memory mode with this budget; 0 = off")
+    ap.add_argument("--speckle-filter",action="store_true")
+    ap.add_argument("--panel-w-mm",type=float,default=0.0)
+    ap.add_argument("--panel-h-mm",type=float,default=0.0)
+    ap.add_argument("--panel-overlap-mm",type=float,default=0.0)
+    ap.add_argument("--gcode",action="store_true")
+    ap.add_argument("--hpgl",action="store_true")
+    ap.add_argument("--segments",action="store_true")
+    ap.add_argument("--bundle",choices=BUNDLE_MODES,default=BUNDLE_MODES[0])
+    ap.add_argument("--cache-mb",type=int,default=0,help="enable the result cache (a fresh one per case) with this size limit; 0 = off")
+    ap.add_argument("--warm-cache",action="store_true",help="prime the cache with one untimed export so timed runs measure cache hits")
+    ap.add_argument("--no-custom-labels",action="store_true",help="skip the custom label list (derived from an untimed quantization of each input)")
+    ap.add_argument("--stage-memory",action="store_true",help="also trace peak Python/NumPy memory per stage (slower)")
+    ap.add_argument("--work-dir",default=os.path.join(tempfile.gettempdir(),"hatchsmith_bench"),help="synthetic inputs are cached here")
+    ap.add_argument("-o","--output",default="bench_results.json",help="results JSON")
+    ap.add_argument("--baseline",default="",help="results JSON to compare against")
+    ap.add_argument("--threshold",type=float,default=BENCH_THRESHOLD,help="relative slowdown that counts as a regression")
+    ap.add_argument("--min-seconds",type=float,default=BENCH_MIN_S,help="ignore stages faster than this in both runs")
+    return ap
+def main(argv=None):
+    ap=build_parser()
+    args=ap.parse_args(argv)
+    bad=[k for k in args.kinds if k not in KINDS]
+    if bad:
+        ap.error("unknown kinds: "+", ".join(bad))
+    if any(not BENCH_COLORS[0]<=n<=BENCH_COLORS[1] for n in args.colors) or any(mp<=0 for mp in args.sizes):
+        ap.error(f"colors must be {BENCH_COLORS[0]}-{BENCH_COLORS[1]} and sizes positive")
+    if args.warm_cache and args.cache_mb<=0:
+        ap.error("--warm-cache needs --cache-mb")
+    work=safe_mkdir(args.work_dir)
+    settings={k:v for k,v in vars(args).items() if k not in ("kinds","sizes","colors","work_dir","output","baseline","threshold","min_seconds")}
+    results={"created":time.strftime("%Y-%m-%d %H:%M:%S"),"python":platform.python_version(),"numpy":np.__version__,"pillow":PIL.__version__,"platform":platform.platform(),"cpus":os.cpu_count(),"settings":settings,"cases":[]}
+    for mp in args.sizes:
+        for kind in args.kinds:
+            t0=time.perf_counter()
+            src=synth_input(work,kind,mp,args.seed)
+            print(f"Input {os.path.basename(src)} ready in {time.perf_counter()-t0:.2f}s",flush=True)
+            for n_colors in args.colors:
+                name=case_name(kind,mp,n_colors)
+                out=os.path.join(work,"out",name)
+                labels_text="" if args.no_custom_labels else run_isolated(case_labels,src,n_colors,args.quantize)
+                job=job_from_args(args,src,out,n_colors,labels_text)
+                res=run_isolated(run_case,job,args.repeat,args.stage_memory,args.warm_cache)
+                shutil.rmtree(out,ignore_errors=True)
+                shutil.rmtree(job.cache_dir,ignore_errors=True)
+                results["cases"].append(dict(name=name,kind=kind,mp=mp,colors=n_colors,**res))
+                rss="n/a" if res["peak_rss_mb"] is None else f"{res['peak_rss_mb']:.0f} MB"
+                print(f"{name}: {res['total_s']:.2f}s, peak {rss} | "+" ".join(f"{k} {st['s']:.3f}" for k,st in res["stages"].items()),flush=True)
+    with open(args.output,"w",encoding="utf-8") as f:
+        json.dump(results,f,indent=1)
+    print("Results: "+args.output)
+    if not args.baseline:
+        return 0
+    with open(args.baseline,"r",encoding="utf-8") as f:
+        base=json.load(f)
+    if base.get("settings")!=settings:
+        print("Warning: baseline was recorded with different settings",file=sys.stderr)
+    rows=compare_results(base,results,args.threshold,args.min_seconds)
+    regressions=[r for r in rows if r[5]]
+    for name,stage,unit,was,now,bad in rows:
+        print(f"{'REGRESSION' if bad else 'ok':<10} {name:<24} {stage:<12} {was:10.3f} -> {now:10.3f} {unit} ({(now/was-1.0)*100.0 if was else 0.0:+.1f}%)")
+    print(f"{len(regressions)} regression(s) above {args.threshold*100.0:.0f}% in {len(rows)} compared metric(s)")
+    return 1 if regressions else 0
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""HatchSmith command line: exports one or many PNGs (files, folders or globs) without the GUI, one image per worker process. © FIWAtec GmbH"""
+import os,sys,glob,time,argparse,traceback,concurrent.futures
+from hatchSmithcore import Cfg,ExportJob,Exporter,TRAVEL_MODES,ANGLE_SETS,QUANTIZE_METHODS,PNG_MODES,BUNDLE_MODES,SVG_ENCODINGS,HATCH_ENGINES,safe_mkdir
+def collect_inputs(patterns):
+    found=[]
+    for p in patterns:
+        if os.path.isdir(p):
+            found.extend(sorted(os.path.join(p,fn) for fn in os.listdir(p) if fn.lower().endswith(".png")))
+        elif os.path.isfile(p):
+            found.append(p)
+        else:
+            found.extend(sorted(glob.glob(p)))
+    seen=set()
+    return [p for p in found if not (os.path.abspath(p) in seen or seen.add(os.path.abspath(p)))]
+def output_dirs(inputs,out_base):
+    taken=set()
+    dirs=[]
+    for p in inputs:
+        stem=os.path.splitext(os.path.basename(p))[0]
+        name=stem
+        k=1
+        while os.path.normcase(name).lower() in taken:
+            k+=1
+            name=f"{stem}_{k}"
+        taken.add(os.path.normcase(name).lower())
+        dirs.append(os.path.join(out_base,name))
+    return dirs
+def build_parser():
+    ap=argparse.ArgumentParser(prog="hatchSmithcli",description="Export PNG color layers and hatch-filled SVGs without the GUI.")
+    ap.add_argument("inputs",nargs="+",help="PNG files, folders or glob patterns")
+    ap.add_argument("-o","--output",default="exports",help="output folder; each image gets its own subfolder, numbered _2, _3… when file names repeat")
+    ap.add_argument("-j","--jobs",type=int,default=os.cpu_count() or 1,help="images processed in parallel")
+    ap.add_argument("--colors",type=int,choices=range(Cfg.MIN_COLORS,Cfg.MAX_COLORS+1),default=Cfg.DEFAULT_COLORS,metavar=f"{Cfg.MIN_COLORS}-{Cfg.MAX_COLORS}",help="palette size")
+    ap.add_argument("--quantize",choices=QUANTIZE_METHODS,default=QUANTIZE_METHODS[0])
+    ap.add_argument("--pen-mm",type=float,default=Cfg.DEFAULT_PEN_MM)
+    ap.add_argument("--width-mm",type=float,default=Cfg.DEFAULT_DRAW_W_MM)
+    ap.add_argument("--height-mm",type=float,default=0.0)
+    ap.add_argument("--no-keep-aspect",action="store_true")
+    ap.add_argument("--no-crosshatch",action="store_true")
+    ap.add_argument("--hatching",choices=ANGLE_SETS,default=Cfg.DEFAULT_ANGLE_SET)
+    ap.add_argument("--angle",type=float,default=Cfg.DEFAULT_HATCH_ANGLE,help="hatch angle for 'Custom angle'")
+    ap.add_argument("--join",action="store_true",help="join hatch lines into zig-zag polylines")
+    ap.add_argument("--travel",choices=TRAVEL_MODES,default=TRAVEL_MODES[0])
+    ap.add_argument("--svg-workers",type=int,default=1)
+    ap.add_argument("--memory-budget-mb",type=int,default=Cfg.DEFAULT_MEMORY_BUDGET_MB,help="tiled low-memory mode for huge sources; 0 = off")
+    ap.add_argument("--hatch-engine",choices=HATCH_ENGINES,default=HATCH_ENGINES[0],help="vector traces layer outlines and hatches at exact mm spacing, independent of source resolution")
+    ap.add_argument("--speckle-filter",action="store_true",help="remove sub-pen fringes, isolated specks and strokes shorter than the pen before hatching")
+    ap.add_argument("--min-area-mm2",type=float,default=0.0,help="speckle filter: smallest region kept, in mm²; 0 = 4 pen widths squared")
+    ap.add_argument("--min-segment-mm",type=float,default=0.0,help="speckle filter: shortest hatch stroke kept, in mm; 0 = pen width")
+    ap.add_argument("--no-png-layers",action="store_true")
+    ap.add_argument("--png-crop",action="store_true",help="crop PNG layers to their bounding box (offsets go to layer_list.txt)")
+    ap.add_argument("--png-mode",choices=PNG_MODES,default=PNG_MODES[0])
+    ap.add_argument("--png-compress",type=int,choices=range(10),default=Cfg.DEFAULT_PNG_COMPRESS,metavar="0-9",help="PNG zlib level")
+    ap.add_argument("--png-workers",type=int,default=Cfg.DEFAULT_PNG_WORKERS,help="PNG encoder threads; 0 = one per CPU")
+    ap.add_argument("--no-svg-layers",action="store_true")
+    ap.add_argument("--no-svg-combined",action="store_true")
+    ap.add_argument("--svg-encoding",choices=SVG_ENCODINGS,default=SVG_ENCODINGS[0],help="path coordinates: absolute mm, or relative integer µm (several times smaller and faster)")
+    ap.add_argument("--panel-w-mm",type=float,default=0.0,help="split the drawing into panels of this width (plotter bed); 0 = full drawing width")
+    ap.add_argument("--panel-h-mm",type=float,default=0.0,help="panel height; 0 = full drawing height")
+    ap.add_argument("--panel-overlap-mm",type=float,default=0.0,help="extra margin each panel repeats from its neighbours")
+    ap.add_argument("--gcode",action="store_true",help="write one streamed G-code file per layer (gcode/)")
+    ap.add_argument("--hpgl",action="store_true",help="write one HPGL file per layer (hpgl/)")
+    ap.add_argument("--segments",action="store_true",help="write float32 segment endpoints per layer as memory-mappable .npy (segments/)")
+    ap.add_argument("--pen-up",default=Cfg.DEFAULT_PEN_UP,help="G-code pen-up command")
+    ap.add_argument("--pen-down",default=Cfg.DEFAULT_PEN_DOWN,help="G-code pen-down command")
+    ap.add_argument("--feed",type=float,default=Cfg.DEFAULT_FEED,help="drawing feed rate in mm/min (G-code F, HPGL VS)")
+    ap.add_argument("--travel-feed",type=float,default=Cfg.DEFAULT_TRAVEL_FEED,help="pen-up travel feed rate in mm/min (G-code)")
+    ap.add_argument("--bundle",choices=BUNDLE_MODES,default=BUNDLE_MODES[0],help="write loose files, export.zip or both")
+    ap.add_argument("--cache-mb",type=int,default=Cfg.DEFAULT_CACHE_MB,help="enable the result cache with this size limit in MB, e.g. 2048; every export then copies its labels (1 byte per source pixel), PNG layers and strokes into the cache folder; 0 = off (default)")
+    ap.add_argument("--cache-dir",default="",help="result cache folder (default: per-user cache)")
+    ap.add_argument("--profile",action="store_true",help="log a per-stage timing table and write profile_trace.json (Chrome/Perfetto trace)")
+    ap.add_argument("--labels",default="",help="label/order list file (custom order)")
+    ap.add_argument("-v","--verbose",action="store_true",help="print tracebacks for failed images")
+    return ap
+def job_from_args(args,input_path,output_dir,labels_text=""):
+    job=ExportJob()
+    job.input_png_path=input_path
+    job.output_dir=output_dir
+    job.n_colors=int(args.colors)
+    job.quantize_method=args.quantize
+    job.pen_mm=float(args.pen_mm)
+    job.draw_w_mm=float(args.width_mm)
+    job.draw_h_mm=float(args.height_mm)
+    job.keep_aspect=not args.no_keep_aspect
+    job.use_crosshatch=not args.no_crosshatch
+    job.angle_set=args.hatching
+    job.hatch_angle=float(args.angle)
+    job.join_serpentine=args.join
+    job.travel_order=args.travel
+    job.svg_workers=int(args.svg_workers)
+    job.memory_budget_mb=int(args.memory_budget_mb)
+    job.cache_mb=int(args.cache_mb)
+    job.cache_dir=args.cache_dir
+    job.export_png_layers=not args.no_png_layers
+    job.png_crop=args.png_crop
+    job.png_mode=args.png_mode
+    job.png_compress=int(args.png_compress)
+    job.png_workers=int(args.png_workers)
+    job.export_svg_layers=not args.no_svg_layers
+    job.export_svg_combined=not args.no_svg_combined
+    job.svg_encoding=args.svg_encoding
+    job.hatch_engine=args.hatch_engine
+    job.speckle_filter=args.speckle_filter
+    job.speckle_min_area_mm2=args.min_area_mm2
+    job.min_segment_mm=args.min_segment_mm
+    job.panel_w_mm=args.panel_w_mm
+    job.panel_h_mm=args.panel_h_mm
+    job.panel_overlap_mm=args.panel_overlap_mm
+    job.export_gcode=args.gcode
+    job.export_hpgl=args.hpgl
+    job.export_segments=args.segments
+    job.pen_up=args.pen_up
+    job.pen_down=args.pen_down
+    job.feed_draw=args.feed
+    job.feed_travel=args.travel_feed
+    job.bundle=args.bundle
+    job.profile=args.profile
+    job.labels_text=labels_text
+    job.force_user_order=bool(labels_text.strip())
+    return job
+def export_one(job):
+    t0=time.time()
+    Exporter(job).run()
+    return time.time()-t0
+def main(argv=None):
+    args=build_parser().parse_args(argv)
+    inputs=collect_inputs(args.inputs)
+    if not inputs:
+        print("No PNG inputs found.",file=sys.stderr)
+        return 2
+    labels_text=""
+    if args.labels:
+        with open(args.labels,"r",encoding="utf-8") as f:
+            labels_text=f.read()
+    out_base=safe_mkdir(args.output)
+    jobs=[job_from_args(args,p,d,labels_text) for p,d in zip(inputs,output_dirs(inputs,out_base))]
+    n_jobs=max(1,min(args.jobs,len(jobs)))
+    print(f"{len(jobs)} image(s), {n_jobs} worker(s)")
+    t0=time.time()
+    failed=0
+    def report(job,fut):
+        nonlocal failed
+        try:
+            dt=fut.result() if fut else export_one(job)
+            print(f"[ok] {job.input_png_path} {dt:.2f}s -> {job.output_dir}",flush=True)
+        except Exception as e:
+            failed+=1
+            print(f"[failed] {job.input_png_path}: {e}",file=sys.stderr,flush=True)
+            if args.verbose:
+                traceback.print_exc()
+    if n_jobs==1:
+        for job in jobs:
+            report(job,None)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures={pool.submit(export_one,job):job for job in jobs}
+            for fut in concurrent.futures.as_completed(futures):
+                report(futures[fut],fut)
+    dt=time.time()-t0
+    print(f"Done: {len(jobs)-failed} ok, {failed} failed in {dt:.2f}s ({len(jobs)/dt if dt>0 else 0.0:.2f} images/s)")
+    return 1 if failed else 0
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,2220 @@
+"""HatchSmith core: quantization, PNG layers and hatch-filled SVG, G-code, HPGL and segment export without any GUI dependency. © FIWAtec GmbH"""
+import os,re,sys,json,time,mmap,zlib,ctypes,struct,hashlib,zipfile,colorsys,functools,tempfile,shutil,weakref,threading,multiprocessing,concurrent.futures
+from PIL import Image,PngImagePlugin
+import numpy as np
+try:
+    import resource
+except ImportError:
+    resource=None
+class Cfg:
+    ORG="FIWAtec GmbH"
+    APP="HatchSmith"
+    DEFAULT_COLORS=16
+    MIN_COLORS=2
+    MAX_COLORS=64
+    DEFAULT_PEN_MM=1.0
+    DEFAULT_DRAW_W_MM=1000.0
+    DEFAULT_KEEP_ASPECT=True
+    DEFAULT_CROSSHATCH=True
+    DEFAULT_ANGLE_SET="Auto"
+    DEFAULT_HATCH_ANGLE=30.0
+    DEFAULT_SVG_WORKERS=1
+    DEFAULT_MEMORY_BUDGET_MB=0
+    DEFAULT_CACHE_MB=0
+    DEFAULT_PNG_COMPRESS=6
+    DEFAULT_PNG_WORKERS=0
+    DEFAULT_PEN_UP="G0 Z5"
+    DEFAULT_PEN_DOWN="G0 Z0"
+    DEFAULT_FEED=3000.0
+    DEFAULT_TRAVEL_FEED=6000.0
+    UI_W=1920
+    UI_H=1080
+def script_dir():
+    try:
+        return os.path.dirname(os.path.abspath(__file__))
+    except Exception:
+        return os.getcwd()
+def safe_mkdir(p):
+    os.makedirs(p,exist_ok=True)
+    return p
+def clamp(v,a,b):
+    return a if v<a else b if v>b else v
+def hex_to_rgb(hx):
+    hx=hx.strip().lstrip("#")
+    return (int(hx[0:2],16),int(hx[2:4],16),int(hx[4:6],16))
+def rgb_to_hex(r,g,b):
+    return f"{r:02X}{g:02X}{b:02X}"
+def parse_label_list(text):
+    lines=[l.strip() for l in text.splitlines() if l.strip()]
+    items=[]
+    pat=re.compile(r"^\s*(\d{2})\s*-\s*([a-zA-Z0-9_]+)\s*\(#([0-9A-Fa-f]{6})\)\s*Anteil\s*([0-9]+(?:\.[0-9]+)?)%")
+    for l in lines:
+        m=pat.search(l)
+        if not m:
+            continue
+        prefix,name,hx,share=m.group(1),m.group(2),m.group(3).upper(),float(m.group(4))
+        items.append((prefix,name,hx,share))
+    return items
+QUANTIZE_METHODS=["Median cut","K-means (sampled)"]
+KMEANS_SAMPLE=1<<17
+KMEANS_BATCH=4096
+KMEANS_ITERS=200
+KMEANS_LLOYD=3
+KMEANS_TOL=0.05
+KMEANS_CHUNK=1<<14
+LUT_BITS=6
+LUT_EXACT=255
+SRGB_TO_XYZ=np.array([[0.4124564,0.3575761,0.1804375],[0.2126729,0.7151522,0.0721750],[0.0193339,0.1191920,0.9503041]])
+D65_WHITE=np.array([0.95047,1.0,1.08883])
+def srgb_to_lab(rgb):
+    c=np.asarray(rgb,dtype=np.float64)/255.0
+    c=np.where(c>0.04045,((c+0.055)/1.055)**2.4,c/12.92)
+    xyz=(c@SRGB_TO_XYZ.T)/D65_WHITE
+    f=np.where(xyz>(6.0/29.0)**3,np.cbrt(xyz),xyz/(3.0*(6.0/29.0)**2)+4.0/29.0)
+    return np.stack((116.0*f[...,1]-16.0,500.0*(f[...,0]-f[...,1]),200.0*(f[...,1]-f[...,2])),axis=-1)
+def nearest_center(X,C):
+    out=np.empty(len(X),dtype=np.int64)
+    cc=(C*C).sum(axis=1)
+    for k0 in range(0,len(X),KMEANS_CHUNK):
+        x=X[k0:k0+KMEANS_CHUNK]
+        out[k0:k0+KMEANS_CHUNK]=np.argmin(cc[None,:]-2.0*(x@C.T),axis=1)
+    return out
+def stratified_sample(arr,n,seed=0):
+    h,w=arr.shape[:2]
+    s=max(1,int(np.sqrt(h*w/n)))
+    rng=np.random.default_rng(seed)
+    ys=np.minimum(np.arange(0,h,s)[:,None]+rng.integers(0,s,((h+s-1)//s,(w+s-1)//s)),h-1)
+    xs=np.minimum(np.arange(0,w,s)[None,:]+rng.integers(0,s,ys.shape),w-1)
+    return arr[ys,xs].reshape(-1,3)
+def kmeans_init(X,k,rng):
+    C=np.empty((k,3))
+    C[0]=X[rng.integers(len(X))]
+    d=((X-C[0])**2).sum(axis=1)
+    for i in range(1,k):
+        C[i]=X[rng.choice(len(X),p=d/d.sum())]
+        d=np.minimum(d,((X-C[i])**2).sum(axis=1))
+    return C
+def cluster_sums(lab,X,k):
+    return np.bincount(lab,minlength=k),np.stack([np.bincount(lab,weights=X[:,d],minlength=k) for d in range(X.shape[1])],axis=1)
+def kmeans_palette(sample,n_colors,seed=0):
+    sample=np.asarray(sample,dtype=np.uint8).reshape(-1,3)
+    keys=np.unique((sample[:,0].astype(np.int64)<<16)|(sample[:,1].astype(np.int64)<<8)|sample[:,2])
+    if len(keys)<=n_colors:
+        return np.stack(((keys>>16)&255,(keys>>8)&255,keys&255),axis=1).astype(np.uint8)
+    X=srgb_to_lab(sample)
+    rng=np.random.default_rng(seed)
+    C=kmeans_init(X,n_colors,rng)
+    seen=np.zeros(n_colors)
+    for _ in range(KMEANS_ITERS):
+        B=X[rng.integers(0,len(X),KMEANS_BATCH)]
+        n,sums=cluster_sums(nearest_center(B,C),B,n_colors)
+        hit=n>0
+        seen[hit]+=n[hit]
+        step=(n[hit]/seen[hit])[:,None]*(sums[hit]/n[hit][:,None]-C[hit])
+        C[hit]+=step
+        if np.abs(step).max()<KMEANS_TOL:
+            break
+    for _ in range(KMEANS_LLOYD):
+        n,sums=cluster_sums(nearest_center(X,C),X,n_colors)
+        C[n>0]=sums[n>0]/n[n>0][:,None]
+    n,sums=cluster_sums(nearest_center(X,C),sample.astype(np.float64),n_colors)
+    palette=np.rint(sums[n>0]/n[n>0][:,None]).astype(np.uint8)
+    _,first=np.unique(palette,axis=0,return_index=True)
+    return palette[np.sort(first)]
+def lut_cell(rgb):
+    c=np.asarray(rgb)>>(8-LUT_BITS)
+    return (c[...,0].astype(np.int32)<<(2*LUT_BITS))|(c[...,1].astype(np.int32)<<LUT_BITS)|c[...,2]
+def palette_lut(palette):
+    g=(np.arange(1<<LUT_BITS)<<(8-LUT_BITS))+(1<<(7-LUT_BITS))
+    r,gg,b=np.meshgrid(g,g,g,indexing="ij")
+    grid=np.stack((r.ravel(),gg.ravel(),b.ravel()),axis=1)
+    lut=nearest_center(srgb_to_lab(grid),srgb_to_lab(palette)).astype(np.uint8)
+    lut[lut_cell(palette)]=LUT_EXACT
+    return lut
+def lut_map(rgb,lut,palette):
+    h,w=rgb.shape[:2]
+    out=np.empty((h,w),dtype=np.uint8)
+    per=max(1,HATCH_CHUNK//max(1,w))
+    pal_lab=srgb_to_lab(palette)
+    for y0 in range(0,h,per):
+        c=rgb[y0:y0+per]
+        q=lut[lut_cell(c)]
+        exact=q==LUT_EXACT
+        if exact.any():
+            px=c[exact].astype(np.int64)
+            keys,inv=np.unique((px[:,0]<<16)|(px[:,1]<<8)|px[:,2],return_inverse=True)
+            q[exact]=nearest_center(srgb_to_lab(np.stack(((keys>>16)&255,(keys>>8)&255,keys&255),axis=1)),pal_lab)[inv.ravel()]
+        out[y0:y0+per]=q
+    return out
+def quantize_image_kmeans(img_rgb,n_colors):
+    arr=np.asarray(img_rgb)
+    palette=kmeans_palette(stratified_sample(arr,KMEANS_SAMPLE),n_colors)
+    q_arr=lut_map(arr,palette_lut(palette),palette)
+    q=Image.fromarray(q_arr,"P")
+    q.putpalette(palette.ravel().tolist())
+    counts=np.bincount(q_arr.ravel(),minlength=len(palette))
+    return q,q_arr,[tuple(int(v) for v in p) for p in palette],counts
+def quantize_image_rgb(img_rgb,n_colors,method=QUANTIZE_METHODS[0]):
+    if method==QUANTIZE_METHODS[1]:
+        return quantize_image_kmeans(img_rgb,n_colors)
+    q=img_rgb.quantize(colors=n_colors,method=Image.MEDIANCUT)
+    q_arr=np.array(q)
+    pal=q.getpalette()[:n_colors*3]
+    palette=[(pal[i],pal[i+1],pal[i+2]) for i in range(0,len(pal),3)]
+    counts=np.bincount(q_arr.flatten(),minlength=n_colors)
+    return q,q_arr,palette,counts
+TILE_BYTES_PER_PX=32
+TILE_SAMPLE_PIXELS=1<<22
+TILE_SAMPLE_BYTES_PER_PX=160
+TILE_READ=1<<16
+def tile_rows(w,budget_mb,parts=1):
+    return max(1,int(budget_mb*(1<<20))//max(1,w*TILE_BYTES_PER_PX*parts))
+def release_pages(arr):
+    mm=getattr(arr,"_mmap",None)
+    if mm is not None and hasattr(mm,"madvise") and hasattr(mmap,"MADV_DONTNEED"):
+        mm.madvise(mmap.MADV_DONTNEED)
+PNG_DIRECT_PILLOW=(9,12)
+PNG_RAW_MODES={"RGB":"RGBX","RGBA":"RGBA","L":"L","P":"P"}
+def open_source(path):
+    try:
+        return PngImagePlugin.PngImageFile(path)
+    except SyntaxError:
+        return Image.open(path)
+def direct_png_decode(im):
+    major=int(Image.__version__.split(".")[0])
+    return im.format=="PNG" and im.mode in PNG_RAW_MODES and PNG_DIRECT_PILLOW[0]<=major<=PNG_DIRECT_PILLOW[1] and hasattr(Image.core,"map_buffer") and hasattr(Image,"_getdecoder") and hasattr(im,"_PngImageFile__prepare_idat") and hasattr(im,"load_read")
+class TiledSource:
+    def __init__(self,path,npy_path):
+        im=open_source(path)
+        self.size=im.size
+        self.lut=None
+        self.alpha=None
+        self.direct=direct_png_decode(im)
+        try:
+            if not self.direct:
+                raise ValueError(im.mode)
+            raw=PNG_RAW_MODES[im.mode]
+            self.data=self._decode(im,raw,npy_path)
+            if raw=="L":
+                self.lut=np.repeat(np.arange(256,dtype=np.uint8)[:,None],3,axis=1)
+            elif raw=="P":
+                pal=np.array(im.getpalette("RGB"),dtype=np.uint8).reshape(-1,3)
+                self.lut=np.zeros((256,3),dtype=np.uint8)
+                self.lut[:len(pal)]=pal
+                trns=im.info.get("transparency")
+                if isinstance(trns,bytes):
+                    self.alpha=np.full(256,255,dtype=np.uint8)
+                    self.alpha[:len(trns)]=np.frombuffer(trns,dtype=np.uint8)[:256]
+                elif isinstance(trns,int):
+                    self.alpha=np.full(256,255,dtype=np.uint8)
+                    self.alpha[trns]=0
+            elif raw=="RGBA":
+                self.alpha=slice(3,4)
+        except (ValueError,AttributeError,TypeError):
+            self.direct=False
+            self.lut=None
+            self.alpha=None
+            self.data=self._convert(path,npy_path)
+        finally:
+            im.close()
+    def _convert(self,path,npy_path):
+        with open_source(path) as im:
+            im.load()
+            w,h=im.size
+            data=np.lib.format.open_memmap(npy_path,mode="w+",dtype=np.uint8,shape=(h,w,3))
+            per=max(1,HATCH_CHUNK//max(1,w))
+            for y0 in range(0,h,per):
+                cancel_check()
+                data[y0:y0+per]=np.asarray(im.crop((0,y0,w,min(h,y0+per))).convert("RGB"))
+                release_pages(data)
+        return data
+    def _decode(self,im,raw,npy_path):
+        w,h=im.size
+        ch=4 if raw in ("RGBX","RGBA") else 1
+        data=np.lib.format.open_memmap(npy_path,mode="w+",dtype=np.uint8,shape=(h,w,ch) if ch>1 else (h,w))
+        target=Image.core.map_buffer(data,(w,h),"raw",0,(raw,w*ch,1))
+        if im.info.get("interlace"):
+            im.decoderconfig=im.decoderconfig+(1,)
+        im._PngImageFile__idat=im._PngImageFile__prepare_idat
+        for tile in im.tile:
+            dec=Image._getdecoder(im.mode,tile[0],tile[3],im.decoderconfig)
+            dec.setimage(target,tile[1])
+            im.fp.seek(tile[2])
+            buf=b""
+            n=0
+            try:
+                while n>=0:
+                    chunk=im.load_read(TILE_READ)
+                    if not chunk:
+                        raise OSError("image file is truncated")
+                    buf+=chunk
+                    n,err=dec.decode(buf)
+                    if err<0:
+                        raise OSError(f"decoder error {err}")
+                    buf=buf[n:]
+                    release_pages(data)
+            finally:
+                dec.cleanup()
+        return data
+    def rows(self,y0,y1):
+        a=self.data[y0:y1]
+        return self.lut[a] if self.lut is not None else np.ascontiguousarray(a[...,:3])
+    def rgba(self,y0,y1,x0=0,x1=None):
+        a=self.data[y0:y1,x0:x1]
+        out=np.empty(a.shape[:2]+(4,),dtype=np.uint8)
+        out[...,:3]=self.lut[a] if self.lut is not None else a[...,:3]
+        out[...,3:]=255 if self.alpha is None else a[...,self.alpha] if isinstance(self.alpha,slice) else self.alpha[a][...,None]
+        return out
+    def close(self):
+        self.data=None
+def fit_palette_sample(src,n_colors,budget_mb,method=QUANTIZE_METHODS[0]):
+    w,h=src.size
+    limit=max(1,min(TILE_SAMPLE_PIXELS,int(budget_mb*(1<<20))//TILE_SAMPLE_BYTES_PER_PX))
+    s=max(1,int(np.ceil(np.sqrt(w*h/limit))))
+    rows=[]
+    for y in range(0,h,s):
+        rows.append(src.rows(y,y+1)[:,::s])
+        release_pages(src.data)
+    sample=np.concatenate(rows)
+    if method==QUANTIZE_METHODS[1]:
+        return [tuple(int(v) for v in p) for p in kmeans_palette(sample,n_colors)]
+    q=Image.fromarray(sample).quantize(colors=n_colors,method=Image.MEDIANCUT)
+    pal=q.getpalette()[:n_colors*3]
+    return [(pal[i],pal[i+1],pal[i+2]) for i in range(0,len(pal),3)]
+def palette_image(palette):
+    pal_img=Image.new("P",(1,1))
+    pal_img.putpalette([v for rgb in palette for v in rgb]+list(palette[0])*(256-len(palette)))
+    return pal_img
+def map_to_palette(rgb,pal_img,n_labels):
+    idx=np.array(Image.fromarray(rgb).quantize(palette=pal_img,dither=Image.Dither.NONE))
+    idx[idx>=n_labels]=0
+    return idx
+def palette_mapper(palette,method=QUANTIZE_METHODS[0]):
+    if method==QUANTIZE_METHODS[1]:
+        palette=np.array(palette,dtype=np.uint8)
+        return functools.partial(lut_map,lut=palette_lut(palette),palette=palette)
+    return functools.partial(map_to_palette,pal_img=palette_image(palette),n_labels=len(palette))
+PNG_MODES=["RGBA","1-bit palette"]
+PNG_LAYER_RAM=1<<31
+class PngStripWriter:
+    def __init__(self,path,w,h,mode="RGBA",level=6,rgb=(0,0,0)):
+        self.mode=mode
+        self.f=open(path,"wb")
+        self.f.write(b"\x89PNG\r\n\x1a\n")
+        if mode=="1":
+            self._chunk(b"IHDR",struct.pack(">IIBBBBB",w,h,1,3,0,0,0))
+            self._chunk(b"PLTE",bytes((0,0,0)+tuple(int(c) for c in rgb)))
+            self._chunk(b"tRNS",b"\x00")
+        else:
+            self._chunk(b"IHDR",struct.pack(">IIBBBBB",w,h,8,{"L":0,"RGB":2,"RGBA":6}[mode],0,0,0))
+        self.z=zlib.compressobj(level)
+    def _chunk(self,tag,data):
+        self.f.write(struct.pack(">I",len(data))+tag+data+struct.pack(">I",zlib.crc32(data,zlib.crc32(tag))&0xFFFFFFFF))
+    def write(self,rows):
+        if self.mode=="1":
+            rows=np.packbits(rows,axis=1)
+        n=rows.shape[0]
+        raw=np.zeros((n,rows[0].size+1),dtype=np.uint8)
+        raw[:,1:]=rows.reshape(n,-1)
+        data=self.z.compress(raw.tobytes())
+        if data:
+            self._chunk(b"IDAT",data)
+    def close(self):
+        if self.f.closed:
+            return
+        self._chunk(b"IDAT",self.z.flush())
+        self._chunk(b"IEND",b"")
+        self.f.close()
+def png_box(index,pidx,size,crop=False):
+    if not crop:
+        return (0,0)+tuple(size)
+    box=index[pidx]
+    if box is None:
+        return (0,0,1,1)
+    _,y0,y1,x0,x1=box
+    return (x0,y0,x1-x0+1,y1-y0+1)
+def png_workers(n,size=0,crop=True):
+    n=n if n>0 else (os.cpu_count() or 1)
+    if not crop:
+        n=min(n,max(1,PNG_LAYER_RAM//max(1,size[0]*size[1]*5)))
+    return n
+def save_png_layer(path,mask,origin,box,rgb,mode=PNG_MODES[0],level=6):
+    bx,by,bw,bh=box
+    x0,y0=origin[0]-bx,origin[1]-by
+    if mode==PNG_MODES[1]:
+        m=np.zeros((bh,bw),dtype=np.uint8)
+        m[y0:y0+mask.shape[0],x0:x0+mask.shape[1]]=mask
+        img=Image.frombytes("P",(bw,bh),m.tobytes())
+        img.putpalette((0,0,0)+tuple(rgb))
+        img.save(path,compress_level=level,bits=1,transparency=0)
+        return
+    layer=np.zeros((bh,bw,4),dtype=np.uint8)
+    layer[...,0]=rgb[0]
+    layer[...,1]=rgb[1]
+    layer[...,2]=rgb[2]
+    layer[y0:y0+mask.shape[0],x0:x0+mask.shape[1],3]=mask.astype(np.uint8)*255
+    Image.fromarray(layer).save(path,compress_level=level)
+def png_strip(lab,y0,pidx,rgb,box,writer):
+    bx,by,bw,bh=box
+    a=max(y0,by)
+    b=min(y0+lab.shape[0],by+bh)
+    if a>=b:
+        return
+    m=lab[a-y0:b-y0,bx:bx+bw]==pidx
+    if writer.mode=="1":
+        writer.write(m)
+        return
+    layer=np.empty(m.shape+(4,),dtype=np.uint8)
+    layer[...,0]=rgb[0]
+    layer[...,1]=rgb[1]
+    layer[...,2]=rgb[2]
+    np.multiply(m,255,out=layer[...,3],casting="unsafe")
+    writer.write(layer)
+def label_index(q_arr,n_labels):
+    h,w=q_arr.shape
+    rows=np.zeros((h,n_labels),dtype=np.int64)
+    cols=np.zeros((w,n_labels),dtype=np.int64)
+    col_base=np.arange(w,dtype=np.int64)*n_labels
+    per=max(1,HATCH_CHUNK//max(1,w))
+    for y0 in range(0,h,per):
+        cancel_check()
+        strip=q_arr[y0:y0+per].astype(np.int64)
+        sh=strip.shape[0]
+        row_base=np.arange(sh,dtype=np.int64)*n_labels
+        rows[y0:y0+sh]=np.bincount((strip+row_base[:,None]).ravel(),minlength=sh*n_labels).reshape(sh,n_labels)
+        cols+=np.bincount((strip+col_base[None,:]).ravel(),minlength=w*n_labels).reshape(w,n_labels)
+        release_pages(q_arr)
+    counts=rows.sum(axis=0)
+    index=[]
+    for i in range(n_labels):
+        if counts[i]==0:
+            index.append(None)
+            continue
+        ys=np.flatnonzero(rows[:,i])
+        xs=np.flatnonzero(cols[:,i])
+        index.append((int(counts[i]),int(ys[0]),int(ys[-1]),int(xs[0]),int(xs[-1])))
+    return index
+def label_mask(q_arr,index,pidx):
+    box=index[pidx]
+    if box is None:
+        return np.zeros((0,0),dtype=bool),(0,0)
+    _,y0,y1,x0,x1=box
+    return q_arr[y0:y1+1,x0:x1+1]==pidx,(x0,y0)
+SPECKLE_AREA_PENS=4.0
+SPECKLE_HOLE=255
+SPECKLE_SHIFTS=((np.s_[:,1:],np.s_[:,:-1]),(np.s_[:,:-1],np.s_[:,1:]),(np.s_[1:],np.s_[:-1]),(np.s_[:-1],np.s_[1:]))
+def speckle_params(pen_mm,mm_per_px,min_area_mm2=0.0,min_segment_mm=0.0):
+    radius=max(0,int(round((pen_mm/mm_per_px-1.0)/2.0)))
+    area=max(1,int(round((min_area_mm2 or SPECKLE_AREA_PENS*pen_mm*pen_mm)/(mm_per_px*mm_per_px))))
+    return radius,area,(min_segment_mm or pen_mm)/mm_per_px
+def label_opening(lab,radius):
+    core=np.ones(lab.shape,dtype=bool)
+    for d in range(1,radius+1):
+        eq=lab[:,d:]==lab[:,:-d]
+        core[:,d:]&=eq
+        core[:,:-d]&=eq
+    row=core.copy()
+    for d in range(1,radius+1):
+        eq=lab[d:]==lab[:-d]
+        core[d:]&=eq&row[:-d]
+        core[:-d]&=eq&row[d:]
+    near=np.where(core,lab,SPECKLE_HOLE).astype(np.uint8)
+    for sl in ((np.s_[:,d:],np.s_[:,:-d]) for d in range(1,radius+1)),((np.s_[d:],np.s_[:-d]) for d in range(1,radius+1)):
+        src=near.copy()
+        for a,b in sl:
+            for dst,s in ((a,b),(b,a)):
+                t=near[dst]==SPECKLE_HOLE
+                near[dst][t]=src[s][t]
+    return near!=lab
+def fill_holes(lab,hole,limit):
+    out=np.where(hole,SPECKLE_HOLE,lab).astype(np.uint8)
+    for _ in range(limit):
+        todo=out==SPECKLE_HOLE
+        if not todo.any():
+            break
+        for dst,src in SPECKLE_SHIFTS:
+            t=todo[dst]&(out[src]!=SPECKLE_HOLE)
+            out[dst][t]=out[src][t]
+            todo[dst]&=~t
+    left=out==SPECKLE_HOLE
+    out[left]=lab[left]
+    return out
+def union_roots(n,a,b):
+    parent=np.arange(n)
+    while len(a):
+        cancel_check()
+        pa,pb=parent[a],parent[b]
+        diff=pa!=pb
+        if not diff.any():
+            break
+        a,b,pa,pb=a[diff],b[diff],pa[diff],pb[diff]
+        np.minimum.at(parent,np.maximum(pa,pb),np.minimum(pa,pb))
+        while True:
+            nxt=parent[parent]
+            if np.array_equal(nxt,parent):
+                break
+            parent=nxt
+    return parent
+def label_components(lab):
+    h,w=lab.shape
+    flat=lab.ravel()
+    cut=np.ones(flat.size,dtype=bool)
+    cut[1:]=flat[1:]!=flat[:-1]
+    cut[::w]=True
+    starts=np.flatnonzero(cut)
+    size=np.diff(np.append(starts,flat.size))
+    n=len(starts)
+    lo=np.searchsorted(starts,starts+w,"right")-1
+    cnt=np.where(starts<flat.size-w,np.searchsorted(starts,starts+size+w,"left")-lo,0)
+    a=np.repeat(np.arange(n),cnt)
+    b=np.arange(len(a))-np.repeat(np.cumsum(cnt)-cnt,cnt)+lo[a]
+    same=flat[starts[a]]==flat[starts[b]]
+    comp=union_roots(n,a[same],b[same])
+    area=np.bincount(comp,weights=size,minlength=n)
+    top,bottom=np.searchsorted(starts,w),np.searchsorted(starts,flat.size-w)
+    return size,comp,area,top,bottom
+def row_ids(size,comp,ids,runs):
+    return np.repeat(ids[comp[runs]],size[runs])
+def clean_labels(src,dst,radius,min_area,rows=0):
+    h,w=src.shape
+    rows=rows or h
+    spans=[(y0,min(h,y0+rows)) for y0 in range(0,h,rows)]
+    halo=4*radius+2 if rows<h and radius else 0
+    for y0,y1 in spans:
+        cancel_check()
+        a,b=max(0,y0-halo),min(h,y1+halo)
+        lab=np.ascontiguousarray(src[a:b])
+        dst[y0:y1]=(fill_holes(lab,label_opening(lab,radius),2*radius+2) if radius else lab)[y0-a:y1-a]
+        release_pages(src)
+    if min_area>1:
+        edge_area,bases,links,last,n_edge=[],[],[],None,0
+        for y0,y1 in spans if len(spans)>1 else ():
+            cancel_check()
+            size,comp,area,top,bottom=label_components(np.ascontiguousarray(dst[y0:y1]))
+            edge=np.unique(np.concatenate((comp[:top],comp[bottom:])))
+            ids=np.full(len(comp),-1,dtype=np.int64)
+            ids[edge]=n_edge+np.arange(len(edge))
+            bases.append(n_edge)
+            n_edge+=len(edge)
+            edge_area.append(area[edge])
+            if last is not None:
+                same=dst[y0-1]==dst[y0]
+                links.append((last[same],row_ids(size,comp,ids,np.s_[:top])[same]))
+            last=row_ids(size,comp,ids,np.s_[bottom:])
+        if links:
+            edge_area=np.concatenate(edge_area)
+            root=union_roots(n_edge,*(np.concatenate(v) for v in zip(*links)))
+            edge_small=np.bincount(root,weights=edge_area,minlength=n_edge)[root]<min_area
+        limit=int(np.sqrt(min_area))+2
+        masks,pending={},[]
+        for k,(y0,y1) in enumerate(spans):
+            cancel_check()
+            a,b=max(0,y0-limit),min(h,y1+limit)
+            for i in range(a//rows,(b-1)//rows+1):
+                if i not in masks:
+                    size,comp,area,top,bottom=label_components(np.ascontiguousarray(dst[spans[i][0]:spans[i][1]]))
+                    small=area<min_area
+                    if links:
+                        edge=np.unique(np.concatenate((comp[:top],comp[bottom:])))
+                        small[edge]=edge_small[bases[i]+np.arange(len(edge))]
+                    masks[i]=np.repeat(small[comp],size).reshape(-1,w)
+            hole=np.concatenate([masks[i] for i in range(a//rows,(b-1)//rows+1)])[a-a//rows*rows:b-a//rows*rows]
+            pending.append((y0,y1,fill_holes(np.ascontiguousarray(dst[a:b]),hole,limit)[y0-a:y1-a] if hole.any() else None))
+            nxt=y1-limit
+            while pending and (k+1==len(spans) or pending[0][1]<=nxt):
+                p0,p1,out=pending.pop(0)
+                if out is not None:
+                    dst[p0:p1]=out
+            for i in [i for i in masks if spans[i][1]<=nxt and k+1<len(spans)]:
+                del masks[i]
+            release_pages(dst)
+    changed=0
+    for y0,y1 in spans:
+        changed+=int(np.count_nonzero(dst[y0:y1]!=src[y0:y1]))
+        release_pages(src)
+        release_pages(dst)
+    return changed
+MAPPING_WARN_DE=10.0
+def linear_assignment(cost):
+    cost=np.asarray(cost,dtype=np.float64)
+    flip=cost.shape[0]>cost.shape[1]
+    if flip:
+        cost=cost.T
+    n,m=cost.shape
+    u=np.zeros(n+1)
+    v=np.zeros(m+1)
+    p=np.zeros(m+1,dtype=np.int64)
+    way=np.zeros(m+1,dtype=np.int64)
+    for i in range(1,n+1):
+        p[0]=i
+        j0=0
+        minv=np.full(m+1,np.inf)
+        used=np.zeros(m+1,dtype=bool)
+        while p[j0]!=0:
+            used[j0]=True
+            free=~used
+            free[0]=False
+            cur=cost[p[j0]-1]-u[p[j0]]-v[1:]
+            upd=free[1:]&(cur<minv[1:])
+            minv[1:][upd]=cur[upd]
+            way[1:][upd]=j0
+            j1=int(np.argmin(np.where(free,minv,np.inf)))
+            delta=minv[j1]
+            u[p[used]]+=delta
+            v[used]-=delta
+            minv[free]-=delta
+            j0=j1
+        while j0:
+            j1=way[j0]
+            p[j0]=p[j1]
+            j0=j1
+    cols=np.flatnonzero(p[1:])
+    rows=p[1:][cols]-1
+    order=np.argsort(rows)
+    rows,cols=rows[order],cols[order]
+    return (cols,rows) if flip else (rows,cols)
+def palette_assignment_nearest(palette,desired_hex_list):
+    desired=srgb_to_lab(np.array([hex_to_rgb(hx) for hx in desired_hex_list],dtype=np.float64).reshape(-1,3))
+    have=srgb_to_lab(np.array(palette,dtype=np.float64).reshape(-1,3))
+    dist=np.sqrt(((desired[:,None,:]-have[None,:,:])**2).sum(axis=2))
+    rows,cols=linear_assignment(dist)
+    return {int(j):int(i) for j,i in zip(rows,cols)},{int(j):float(dist[j,i]) for j,i in zip(rows,cols)}
+def hsv_v(r,g,b):
+    rf,gf,bf=r/255.0,g/255.0,b/255.0
+    hh,ss,vv=colorsys.rgb_to_hsv(rf,gf,bf)
+    return vv,ss,hh
+def spacing_mm_from_v(v,pen_mm):
+    return float(clamp((0.9+(v**1.2)*3.6)*pen_mm,0.7*pen_mm,6.0*pen_mm))
+def svg_header(width_mm,height_mm):
+    return '<?xml version="1.0" encoding="UTF-8"?>\n'+f'<svg xmlns="http://www.w3.org/2000/svg" width="{width_mm:.3f}mm" height="{height_mm:.3f}mm" viewBox="0 0 {width_mm:.3f} {height_mm:.3f}">\n'+'<metadata>HatchSmith © FIWAtec GmbH</metadata>\n'+'<rect x="0" y="0" width="100%" height="100%" fill="white"/>\n'
+def svg_footer():
+    return "</svg>\n"
+ANGLE_SETS=["Auto","Horizontal","Vertical","Cross","45°","-45°","Cross + 45°","Custom angle"]
+def angle_modes_from_choice(choice,v,use_crosshatch,custom_angle=0.0):
+    if choice=="Horizontal":
+        return ["h"]
+    if choice=="Vertical":
+        return ["v"]
+    if choice=="Cross":
+        return ["h","v"]
+    if choice=="45°":
+        return ["d1"]
+    if choice=="-45°":
+        return ["d2"]
+    if choice=="Cross + 45°":
+        return ["h","v","d1","d2"]
+    if choice=="Custom angle":
+        a=float(custom_angle)
+        return [a,a+90.0] if use_crosshatch and v<0.35 else [a]
+    if choice=="Auto":
+        if not use_crosshatch:
+            return ["h"]
+        return ["h","v"] if v<0.35 else ["h"]
+    return ["h"]
+HATCH_ANGLES={"h":0.0,"v":90.0,"d1":45.0,"d2":-45.0}
+HATCH_CHUNK=1<<22
+CANCEL_EVERY=1<<12
+_CANCEL=threading.local()
+def set_cancel_check(stop):
+    _CANCEL.stop=stop
+def cancel_check():
+    stop=getattr(_CANCEL,"stop",None)
+    if stop is not None and stop():
+        raise RuntimeError("Canceled.")
+_STEPS=threading.local()
+def set_step_log(log):
+    _STEPS.log=log
+def step_begin():
+    return time.perf_counter(),time.thread_time()
+def step_end(name,start):
+    log=getattr(_STEPS,"log",None)
+    if log is not None:
+        log.append((name,start[0],time.perf_counter()-start[0],time.thread_time()-start[1]))
+def runs_from_bool_2d(arr_bool):
+    padded=np.zeros((arr_bool.shape[0],arr_bool.shape[1]+2),dtype=np.int8)
+    padded[:,1:-1]=arr_bool
+    d=np.diff(padded,axis=1)
+    lines,starts=np.nonzero(d==1)
+    _,ends=np.nonzero(d==-1)
+    return lines,starts,ends-1
+@functools.lru_cache(maxsize=64)
+def hatch_lines(w,h,angle_deg,step_px):
+    a=((angle_deg+90.0)%180.0)-90.0
+    if a==-90.0:
+        a=90.0
+    steep=abs(a)>45.0
+    rad=np.deg2rad(a)
+    slope=round(float(np.cos(rad)/-np.sin(rad)) if steep else float(-np.tan(rad)),12)
+    n_major,n_minor=(h,w) if steep else (w,h)
+    off=np.rint(slope*np.arange(n_major)).astype(np.int64)
+    lo=-int(off.max())
+    hi=n_minor-1-int(off.min())
+    if slope<=0:
+        c=np.arange(lo,hi+1,step_px,dtype=np.int64)
+    else:
+        c=np.arange(hi,lo-1,-step_px,dtype=np.int64)
+    return steep,slope,off,c
+def runs_table(lines_bool):
+    n,m=lines_bool.shape
+    per=max(1,HATCH_CHUNK//max(1,m))
+    ks=[]
+    starts=[]
+    ends=[]
+    for k0 in range(0,n,per):
+        cancel_check()
+        k,a,b=runs_from_bool_2d(lines_bool[k0:k0+per])
+        ks.append(k+k0)
+        starts.append(a)
+        ends.append(b)
+    if not ks:
+        z=np.zeros(0,dtype=np.int64)
+        return z,z,z
+    return np.concatenate(ks),np.concatenate(starts),np.concatenate(ends)
+def sheared_runs_table(mask,steep,off,c):
+    h,w=mask.shape
+    n_major,n_minor=(h,w) if steep else (w,h)
+    flat=np.ascontiguousarray(mask,dtype=bool).ravel()
+    t=np.arange(n_major,dtype=np.int64)[None,:]
+    per=max(1,HATCH_CHUNK//max(1,n_major))
+    ks=[]
+    starts=[]
+    ends=[]
+    for k0 in range(0,len(c),per):
+        cancel_check()
+        minor=c[k0:k0+per,None]+off[None,:]
+        valid=(minor>=0)&(minor<n_minor)
+        np.clip(minor,0,n_minor-1,out=minor)
+        hit=flat[t*w+minor if steep else minor*w+t]
+        hit&=valid
+        k,a,b=runs_from_bool_2d(hit)
+        ks.append(k+k0)
+        starts.append(a)
+        ends.append(b)
+    if not ks:
+        z=np.zeros(0,dtype=np.int64)
+        return z,z,z
+    return np.concatenate(ks),np.concatenate(starts),np.concatenate(ends)
+def hatch_runs(mask,angle_deg,step_px,origin=(0,0),shape=None):
+    mh,mw=mask.shape
+    ox,oy=origin
+    h,w=shape if shape else (mh,mw)
+    steep,slope,off,c=hatch_lines(w,h,float(angle_deg),int(step_px))
+    if mask.size==0:
+        z=np.zeros(0,dtype=np.int64)
+        return steep,slope,off,z,z,z,z
+    o_major,o_minor=(oy,ox) if steep else (ox,oy)
+    if slope==0.0:
+        r0=(-o_minor)%step_px
+        lines=mask[:,r0::step_px].T if steep else mask[r0::step_px]
+        k,t0,t1=runs_table(lines)
+        line=(k*step_px+r0+o_minor)//step_px
+    else:
+        n_major,n_minor=(mh,mw) if steep else (mw,mh)
+        loff=off[o_major:o_major+n_major]
+        lc=c-o_minor
+        keep=np.flatnonzero((lc+loff.min()<=n_minor-1)&(lc+loff.max()>=0))
+        k,t0,t1=sheared_runs_table(mask,steep,loff,lc[keep])
+        line=keep[k]
+    return steep,slope,off,line,c[line],t0+o_major,t1+o_major+1
+def run_span(slope,c,t0,t1,n_minor=0):
+    cl=c.astype(float)+max(0.0,-slope)
+    t0=t0.astype(float)
+    t1=t1.astype(float)
+    if slope!=0.0 and n_minor:
+        a,b=(0.0,float(n_minor)) if slope>0 else (float(n_minor),0.0)
+        t0=np.maximum(t0,(a-cl)/slope)
+        t1=np.maximum(np.minimum(t1,(b-cl)/slope),t0)
+    return cl,t0,t1
+def segments_from_runs(steep,slope,c,t0,t1,n_minor=0):
+    cl,t0,t1=run_span(slope,c,t0,t1,n_minor)
+    m0=cl+slope*t0
+    m1=cl+slope*t1
+    if n_minor:
+        np.clip(m0,0.0,n_minor,out=m0)
+        np.clip(m1,0.0,n_minor,out=m1)
+    if steep:
+        return m0,t0,m1,t1
+    return t0,m0,t1,m1
+def hatch_segments(mask,angle_deg,step_px,origin=(0,0),shape=None):
+    steep,slope,_,_,c,t0,t1=hatch_runs(mask,angle_deg,step_px,origin,shape)
+    h,w=shape if shape else mask.shape
+    return segments_from_runs(steep,slope,c,t0,t1,w if steep else h)
+SERPENTINE_REACH=8
+def serpentine_links(mask,origin,step_px,steep,off,ca,cb,tp):
+    mh,mw=mask.shape
+    u=np.linspace(0.0,1.0,step_px+1)[None,:]
+    per=max(1,HATCH_CHUNK//u.shape[1])
+    ok=np.zeros(len(tp),dtype=bool)
+    for k0 in range(0,len(tp),per):
+        cancel_check()
+        sl=slice(k0,k0+per)
+        t=np.broadcast_to(tp[sl,None],(len(tp[sl]),u.shape[1]))
+        mm=np.rint((ca[sl]+off[tp[sl]])[:,None]+(cb[sl]-ca[sl])[:,None]*u).astype(np.int64)
+        xs,ys=(mm,t) if steep else (t,mm)
+        xs=xs-origin[0]
+        ys=ys-origin[1]
+        inside=(xs>=0)&(xs<mw)&(ys>=0)&(ys<mh)
+        hit=mask[np.clip(ys,0,mh-1),np.clip(xs,0,mw-1)]&inside
+        ok[sl]=hit.all(axis=1)
+    return ok
+def serpentine_chains(mask,origin,step_px,steep,off,line,c,t0,t1):
+    n=len(line)
+    if n==0:
+        return []
+    last=t1-1
+    span=int(t1.max())+2
+    nl=line+1
+    reach=SERPENTINE_REACH*step_px
+    hi=np.searchsorted(line*span+t0,nl*span+last,side="right")-1
+    hi_c=np.clip(hi,0,n-1)
+    ok_hi=(hi>=0)&(line[hi_c]==nl)&(last[hi_c]>=t0)&(np.abs(last[hi_c]-last)<=reach)
+    lo=np.searchsorted(line*span+last,nl*span+t0,side="left")
+    lo_c=np.clip(lo,0,n-1)
+    ok_lo=(lo<n)&(line[lo_c]==nl)&(t0[lo_c]<=last)&(np.abs(t0[lo_c]-t0)<=reach)
+    idx=np.flatnonzero(ok_hi)
+    ok_hi[idx]=serpentine_links(mask,origin,step_px,steep,off,c[idx],c[hi_c[idx]],np.minimum(last[idx],last[hi_c[idx]]))
+    idx=np.flatnonzero(ok_lo)
+    ok_lo[idx]=serpentine_links(mask,origin,step_px,steep,off,c[idx],c[lo_c[idx]],np.maximum(t0[idx],t0[lo_c[idx]]))
+    nxt_hi=np.where(ok_hi,hi_c,-1).tolist()
+    nxt_lo=np.where(ok_lo,lo_c,-1).tolist()
+    claimed=[False]*n
+    chains=[]
+    for i in range(n):
+        if i%CANCEL_EVERY==0:
+            cancel_check()
+        if claimed[i]:
+            continue
+        claimed[i]=True
+        fwd=not (nxt_hi[i]<0 and nxt_lo[i]>=0)
+        chain=[(i,fwd)]
+        cur=i
+        while True:
+            j=nxt_hi[cur] if fwd else nxt_lo[cur]
+            if j<0 or claimed[j]:
+                break
+            claimed[j]=True
+            fwd=not fwd
+            chain.append((j,fwd))
+            cur=j
+        chains.append(chain)
+    return chains
+def serpentine_points(chain,steep,slope,cl,t0,t1):
+    def pt(i,t):
+        return (cl[i]+slope*t,t) if steep else (t,cl[i]+slope*t)
+    i,fwd=chain[0]
+    pts=[pt(i,t0[i] if fwd else t1[i])]
+    for (a,fa),(b,_) in zip(chain,chain[1:]):
+        ta,tb=(t1[a],t1[b]) if fa else (t0[a],t0[b])
+        tp=min(ta,tb) if fa else max(ta,tb)
+        pts.append(pt(a,ta))
+        if ta!=tp:
+            pts.append(pt(a,tp))
+        pts.append(pt(b,tp))
+        if tb!=tp:
+            pts.append(pt(b,tb))
+    i,fwd=chain[-1]
+    pts.append(pt(i,t1[i] if fwd else t0[i]))
+    return pts
+SVG_BATCH=4096
+SVG_BUFFER=1<<20
+SVG_ENCODINGS=["Absolute (mm)","Compact (µm, relative)"]
+SVG_UNITS_PER_MM=1000
+SVG_COMPACT_CMDS=np.array(["m%d %d","l%d %d","h%d","v%d"])
+TRAVEL_MODES=["Raster","Nearest neighbour","Nearest neighbour + 2-opt"]
+TRAVEL_RING_MAX=64
+TRAVEL_GRID_CELLS=16
+TRAVEL_2OPT_WINDOW=24
+def strokes_from_runs(runs,mask,origin,step_px,join=False,shape=None):
+    steep,slope,off,line,c,t0,t1=runs
+    h,w=shape if shape else mask.shape
+    n_minor=w if steep else h
+    if not join:
+        x0,y0,x1,y1=segments_from_runs(steep,slope,c,t0,t1,n_minor)
+        return np.column_stack((x0,x1)).ravel(),np.column_stack((y0,y1)).ravel(),np.arange(0,2*len(x0)+1,2,dtype=np.int64),len(x0)
+    chains=serpentine_chains(mask,origin,step_px,steep,off,line,c,t0,t1)
+    cl,t0f,t1f=(a.tolist() for a in run_span(slope,c,t0,t1,n_minor))
+    xs=[]
+    ys=[]
+    offs=[0]
+    for k,chain in enumerate(chains):
+        if k%CANCEL_EVERY==0:
+            cancel_check()
+        for x,y in serpentine_points(chain,steep,slope,cl,t0f,t1f):
+            xs.append(x)
+            ys.append(y)
+        offs.append(len(xs))
+    xs=np.array(xs,dtype=float)
+    ys=np.array(ys,dtype=float)
+    np.clip(xs if steep else ys,0.0,n_minor,out=xs if steep else ys)
+    return xs,ys,np.array(offs,dtype=np.int64),len(line)
+def drop_short_runs(runs,min_px):
+    steep,slope,off,line,c,t0,t1=runs
+    keep=(t1-t0)*np.hypot(1.0,slope)>=min_px
+    return steep,slope,off,line[keep],c[keep],t0[keep],t1[keep]
+def mode_strokes(mask,step_px,mode,origin=(0,0),shape=None,join=False,min_px=0.0):
+    runs=hatch_runs(mask,HATCH_ANGLES.get(mode,mode),step_px,origin,shape)
+    return strokes_from_runs(drop_short_runs(runs,min_px) if min_px>0 else runs,mask,origin,step_px,join,shape)
+def hatch_mode_order(modes):
+    return [m for m in ("h","v") if m in modes]+[m for m in modes if m not in ("h","v")]
+def layer_strokes(mask,step_px,modes,origin=(0,0),shape=None,join=False,min_px=0.0):
+    for m in hatch_mode_order(modes):
+        st=step_begin()
+        strokes=mode_strokes(mask,step_px,m,origin,shape,join,min_px)
+        step_end(f"hatch {m}",st)
+        yield strokes
+class LabelMask:
+    def __init__(self,labels,pidx):
+        self.labels=labels
+        self.pidx=pidx
+        self.shape=labels.shape
+    def __getitem__(self,key):
+        return self.labels[key]==self.pidx
+def merge_strip_runs(parts):
+    steep,slope,off=parts[0][:3]
+    line,c,t0,t1=(np.concatenate([p[k] for p in parts]) for k in range(3,7))
+    o=np.lexsort((t0,line))
+    line,c,t0,t1=line[o],c[o],t0[o],t1[o]
+    if len(line):
+        cut=np.ones(len(line),dtype=bool)
+        cut[1:]=(line[1:]!=line[:-1])|(t0[1:]!=t1[:-1])
+        first=np.flatnonzero(cut)
+        last=np.append(first[1:],len(line))-1
+        line,c,t0,t1=line[first],c[first],t0[first],t1[last]
+    return steep,slope,off,line,c,t0,t1
+def tiled_mode_runs(labels,pidx,box,strip_rows,step_px,m):
+    _,y0,y1,x0,x1=box
+    parts=[]
+    for ys in range(y0,y1+1,strip_rows):
+        cancel_check()
+        parts.append(hatch_runs(labels[ys:min(ys+strip_rows,y1+1),x0:x1+1]==pidx,HATCH_ANGLES.get(m,m),step_px,(x0,ys),labels.shape))
+        release_pages(labels)
+    return merge_strip_runs(parts)
+def tiled_layer_strokes(labels,pidx,box,strip_rows,step_px,modes,join=False,min_px=0.0):
+    if box is None:
+        return
+    mask=LabelMask(labels,pidx)
+    for m in hatch_mode_order(modes):
+        st=step_begin()
+        runs=tiled_mode_runs(labels,pidx,box,strip_rows,step_px,m)
+        strokes=strokes_from_runs(drop_short_runs(runs,min_px) if min_px>0 else runs,mask,(0,0),step_px,join,labels.shape)
+        release_pages(labels)
+        step_end(f"hatch {m}",st)
+        yield strokes
+HATCH_ENGINES=["Raster (pixel runs)","Vector (polygon outlines)"]
+MS_EDGE_X=np.array([0.0,0.5,0.0,-0.5])
+MS_EDGE_Y=np.array([-0.5,0.0,0.5,0.0])
+MS_SEGS=np.array([[-1,-1,-1,-1],[3,2,-1,-1],[2,1,-1,-1],[3,1,-1,-1],[0,1,-1,-1],[3,2,0,1],[0,2,-1,-1],[3,0,-1,-1],[3,0,-1,-1],[0,2,-1,-1],[3,0,2,1],[0,1,-1,-1],[3,1,-1,-1],[2,1,-1,-1],[3,2,-1,-1],[-1,-1,-1,-1]],dtype=np.int64)
+def outline_segments(padded,ox,oy):
+    p=padded.astype(np.uint8)
+    case=(p[:-1,:-1]<<3)|(p[:-1,1:]<<2)|(p[1:,1:]<<1)|p[1:,:-1]
+    r,c=np.nonzero((case!=0)&(case!=15))
+    k=case[r,c]
+    cx=(c+ox).astype(float)
+    cy=(r+oy).astype(float)
+    parts=[]
+    for s in (0,2):
+        e0=MS_SEGS[k,s]
+        sel=e0>=0
+        e0,e1=e0[sel],MS_SEGS[k[sel],s+1]
+        parts.append((cx[sel]+MS_EDGE_X[e0],cy[sel]+MS_EDGE_Y[e0],cx[sel]+MS_EDGE_X[e1],cy[sel]+MS_EDGE_Y[e1]))
+    return tuple(np.concatenate(q) for q in zip(*parts))
+def mask_outline(mask,origin=(0,0)):
+    return outline_segments(np.pad(mask,1),*origin)
+def layer_outline(labels,pidx,box,strip_rows=0):
+    _,y0,y1,x0,x1=box
+    rows=strip_rows or (y1-y0+1)
+    parts=[]
+    for ys in range(y0,y1+1,rows):
+        cancel_check()
+        ye=min(y1+1,ys+rows)
+        body=labels[max(y0,ys-1):ye,x0:x1+1]==pidx
+        body=np.pad(body,((int(ys==y0),int(ye>y1)),(1,1)))
+        parts.append(outline_segments(body,x0,ys))
+        release_pages(labels)
+    return tuple(np.concatenate(q) for q in zip(*parts))
+def clip_hatch(x0,y0,x1,y1,angle_deg,spacing,min_px=0.0):
+    a=np.deg2rad(float(angle_deg))
+    ca,sa=np.cos(a),np.sin(a)
+    v0=x0*sa+y0*ca
+    v1=x1*sa+y1*ca
+    k0=np.ceil(np.minimum(v0,v1)/spacing-0.5).astype(np.int64)
+    cnt=np.ceil(np.maximum(v0,v1)/spacing-0.5).astype(np.int64)-k0
+    e=np.repeat(np.arange(len(k0)),cnt)
+    k=k0[e]+np.arange(len(e))-np.repeat(np.cumsum(cnt)-cnt,cnt)
+    cancel_check()
+    u0=x0[e]*ca-y0[e]*sa
+    u=u0+((k+0.5)*spacing-v0[e])/(v1[e]-v0[e])*(x1[e]*ca-y1[e]*sa-u0)
+    o=np.lexsort((u,k))
+    k,ua,ub=k[o][0::2],u[o][0::2],u[o][1::2]
+    keep=(ub-ua)>=max(min_px,1e-9)
+    k,ua,ub=k[keep],ua[keep],ub[keep]
+    v=(k+0.5)*spacing
+    xs=np.column_stack((ua*ca+v*sa,ub*ca+v*sa)).ravel()
+    ys=np.column_stack((v*ca-ua*sa,v*ca-ub*sa)).ravel()
+    return xs,ys,np.arange(0,2*len(k)+1,2,dtype=np.int64),len(k)
+def vector_layer_strokes(labels,pidx,box,strip_rows,spacing,modes,join=False,min_px=0.0):
+    if box is None:
+        return
+    h,w=labels.shape
+    st=step_begin()
+    edges=layer_outline(labels,pidx,box,strip_rows)
+    step_end("outline",st)
+    for m in hatch_mode_order(modes):
+        st=step_begin()
+        xs,ys,offs,n=clip_hatch(*edges,HATCH_ANGLES.get(m,m),spacing,min_px)
+        step_end(f"hatch {m}",st)
+        yield np.clip(xs,0.0,w,out=xs),np.clip(ys,0.0,h,out=ys),offs,n
+def layer_source(q_arr,index,pidx,strip_rows=0,engine=HATCH_ENGINES[0]):
+    if engine==HATCH_ENGINES[1]:
+        return functools.partial(vector_layer_strokes,q_arr,pidx,index[pidx],strip_rows)
+    if strip_rows:
+        return functools.partial(tiled_layer_strokes,q_arr,pidx,index[pidx],strip_rows)
+    mask,origin=label_mask(q_arr,index,pidx)
+    return functools.partial(layer_strokes,mask,origin=origin,shape=q_arr.shape)
+def layer_run_count(q_arr,index,pidx,strip_rows,engine,step_px,modes):
+    box=index[pidx]
+    if box is None:
+        return 0
+    if engine==HATCH_ENGINES[1]:
+        def count(step,ms):
+            return sum(t[3] for t in vector_layer_strokes(q_arr,pidx,box,strip_rows,step,ms))
+    elif strip_rows:
+        def count(step,ms):
+            return sum(len(tiled_mode_runs(q_arr,pidx,box,strip_rows,step,m)[3]) for m in ms)
+    else:
+        mask,origin=label_mask(q_arr,index,pidx)
+        def count(step,ms):
+            return sum(len(hatch_runs(mask,HATCH_ANGLES.get(m,m),step,origin,q_arr.shape)[3]) for m in ms)
+    return count(step_px,modes) or count(1,["h"])
+def concat_strokes(tables):
+    if not tables:
+        return np.zeros(0,dtype=float),np.zeros(0,dtype=float),np.zeros(1,dtype=np.int64),0
+    offs=[tables[0][2]]
+    base=tables[0][2][-1]
+    for t in tables[1:]:
+        offs.append(t[2][1:]+base)
+        base+=t[2][-1]
+    return np.concatenate([t[0] for t in tables]),np.concatenate([t[1] for t in tables]),np.concatenate(offs),sum(t[3] for t in tables)
+def stroke_ends(xs,ys,offs):
+    return xs[offs[:-1]],ys[offs[:-1]],xs[offs[1:]-1],ys[offs[1:]-1]
+def stroke_travel(xs,ys,offs):
+    if len(offs)<3:
+        return 0.0
+    sx,sy,ex,ey=stroke_ends(xs,ys,offs)
+    return float(np.hypot(sx[1:]-ex[:-1],sy[1:]-ey[:-1]).sum())
+def apply_stroke_order(xs,ys,offs,order,flip):
+    lens=np.diff(offs)[order]
+    starts=offs[:-1][order]
+    new_offs=np.zeros(len(order)+1,dtype=np.int64)
+    np.cumsum(lens,out=new_offs[1:])
+    pos=np.arange(new_offs[-1],dtype=np.int64)-np.repeat(new_offs[:-1],lens)
+    src=np.repeat(starts,lens)+np.where(np.repeat(flip,lens),np.repeat(lens,lens)-1-pos,pos)
+    return xs[src],ys[src],new_offs
+def travel_grid(px,py,n):
+    x0=float(px.min())
+    y0=float(py.min())
+    w=max(float(px.max())-x0,1e-9)
+    h=max(float(py.max())-y0,1e-9)
+    nx=min(n,max(1,int(round(np.sqrt(n*w/h)))))
+    ny=min(n,max(1,n//nx))
+    ux=np.count_nonzero(np.bincount(np.minimum(((px-x0)*(nx/w)).astype(np.int64),nx-1),minlength=nx))
+    uy=np.count_nonzero(np.bincount(np.minimum(((py-y0)*(ny/h)).astype(np.int64),ny-1),minlength=ny))
+    nx,ny=min(n,nx*ny//uy),min(n,ny*nx//ux)
+    shrink=np.sqrt(nx*ny/(TRAVEL_GRID_CELLS*n))
+    if shrink>1:
+        nx=max(1,int(nx/shrink))
+        ny=max(1,int(ny/shrink))
+    return x0,y0,int(nx),int(ny),w/nx*(1.0+1e-9),h/ny*(1.0+1e-9)
+def nearest_neighbour_order(sx,sy,ex,ey):
+    n=len(sx)
+    px=np.concatenate((sx,ex))
+    py=np.concatenate((sy,ey))
+    x0,y0,nx,ny,cw,ch=travel_grid(px,py,n)
+    gx=np.minimum(((px-x0)/cw).astype(np.int64),nx-1)
+    gy=np.minimum(((py-y0)/ch).astype(np.int64),ny-1)
+    key=gy*nx+gx
+    srt=np.argsort(key,kind="stable")
+    bounds=np.searchsorted(key[srt],np.arange(nx*ny+1)).tolist()
+    end=bounds[1:]
+    pos=np.empty(2*n,dtype=np.int64)
+    pos[srt]=np.arange(2*n)
+    pos=pos.tolist()
+    ids=srt.tolist()
+    key=key.tolist()
+    PX=px.tolist()
+    PY=py.tolist()
+    rank=np.concatenate((np.arange(0,2*n,2),np.arange(1,2*n,2))).tolist()
+    pad=1e-9*max(cw*nx,ch*ny)
+    far=TRAVEL_RING_MAX*max(cw,ch)
+    visited=bytearray(n)
+    order=[]
+    flip=[]
+    nxt=0
+    def drop(p):
+        c=key[p]
+        i=pos[p]
+        last=end[c]-1
+        q=ids[last]
+        ids[i]=q
+        pos[q]=i
+        ids[last]=p
+        pos[p]=last
+        end[c]=last
+    def take(s,rev):
+        visited[s]=1
+        drop(s)
+        drop(s+n)
+        order.append(s)
+        flip.append(rev)
+        e=s if rev else s+n
+        return PX[e],PY[e]
+    cx,cy=take(0,False)
+    for k in range(n-1):
+        if k%CANCEL_EVERY==0:
+            cancel_check()
+        gcx=min(nx-1,int((cx-x0)/cw))
+        gcy=min(ny-1,int((cy-y0)/ch))
+        best=-1
+        bd=float("inf")
+        i0=i1=gcx
+        j0=j1=gcy
+        a0,a1,b0,b1=i0,i0-1,j0,j0-1
+        r=0.0
+        final=False
+        while True:
+            for j in range(j0,j1+1):
+                cols=(range(i0,a0),range(a1+1,i1+1)) if b0<=j<=b1 else (range(i0,i1+1),)
+                for span in cols:
+                    for cc in range(j*nx+span.start,j*nx+span.stop):
+                        for q in range(bounds[cc],end[cc]):
+                            e=ids[q]
+                            d=(PX[e]-cx)**2+(PY[e]-cy)**2
+                            if d<bd or d==bd and rank[e]<rank[best]:
+                                bd=d
+                                best=e
+            if final or i0==0 and j0==0 and i1==nx-1 and j1==ny-1:
+                break
+            if best>=0:
+                r=np.sqrt(bd)
+                final=True
+            else:
+                r=2.0*r if r else min(cw,ch)
+                if r>far:
+                    break
+            a0,a1,b0,b1=i0,i1,j0,j1
+            i0=max(0,int((cx-r-pad-x0)/cw))
+            i1=min(nx-1,int((cx+r+pad-x0)/cw))
+            j0=max(0,int((cy-r-pad-y0)/ch))
+            j1=min(ny-1,int((cy+r+pad-y0)/ch))
+        if best<0:
+            while visited[nxt]:
+                nxt+=1
+            best=nxt
+        cx,cy=take(best if best<n else best-n,best>=n)
+    return np.array(order,dtype=np.int64),np.array(flip,dtype=bool)
+def two_opt_refine(sx,sy,ex,ey,window=TRAVEL_2OPT_WINDOW):
+    n=len(sx)
+    order=np.arange(n,dtype=np.int64)
+    flip=np.zeros(n,dtype=bool)
+    sx,sy,ex,ey=sx.copy(),sy.copy(),ex.copy(),ey.copy()
+    for i in range(n-2):
+        if i%CANCEL_EVERY==0:
+            cancel_check()
+        j=np.arange(i+2,min(n,i+window+1))
+        if not len(j):
+            break
+        nj=np.minimum(j+1,n-1)
+        tail=j<n-1
+        old=np.hypot(sx[i+1]-ex[i],sy[i+1]-ey[i])+np.where(tail,np.hypot(sx[nj]-ex[j],sy[nj]-ey[j]),0.0)
+        new=np.hypot(ex[j]-ex[i],ey[j]-ey[i])+np.where(tail,np.hypot(sx[nj]-sx[i+1],sy[nj]-sy[i+1]),0.0)
+        k=int(np.argmin(new-old))
+        if new[k]-old[k]>=-1e-9:
+            continue
+        a,b=i+1,int(j[k])+1
+        order[a:b]=order[a:b][::-1].copy()
+        flip[a:b]=~flip[a:b][::-1]
+        sx[a:b],ex[a:b]=ex[a:b][::-1].copy(),sx[a:b][::-1].copy()
+        sy[a:b],ey[a:b]=ey[a:b][::-1].copy(),sy[a:b][::-1].copy()
+    return order,flip
+def optimize_stroke_order(xs,ys,offs,refine=False):
+    n=len(offs)-1
+    if n<3:
+        return xs,ys,offs
+    xs,ys,offs=apply_stroke_order(xs,ys,offs,*nearest_neighbour_order(*stroke_ends(xs,ys,offs)))
+    if refine:
+        xs,ys,offs=apply_stroke_order(xs,ys,offs,*two_opt_refine(*stroke_ends(xs,ys,offs)))
+    return xs,ys,offs
+def stroke_path_batches(xs,ys,offs,mm_per_px):
+    X=(xs*mm_per_px).tolist()
+    Y=(ys*mm_per_px).tolist()
+    n=len(offs)-1
+    if offs[-1]==2*n:
+        for k in range(0,n,SVG_BATCH):
+            cancel_check()
+            sl=slice(2*k,2*min(n,k+SVG_BATCH))
+            batch=zip(X[sl][0::2],Y[sl][0::2],X[sl][1::2],Y[sl][1::2])
+            yield "".join([f'<path d="M {a:.3f} {b:.3f} L {c:.3f} {d:.3f}"/>\n' for a,b,c,d in batch]),min(SVG_BATCH,n-k)
+        return
+    O=offs.tolist()
+    for k in range(0,n,SVG_BATCH):
+        cancel_check()
+        parts=[]
+        for i in range(k,min(n,k+SVG_BATCH)):
+            a,b=O[i],O[i+1]
+            parts.append(f'<path d="M {X[a]:.3f} {Y[a]:.3f}'+"".join([f" L {X[q]:.3f} {Y[q]:.3f}" for q in range(a+1,b)])+'"/>\n')
+        yield "".join(parts),len(parts)
+def compact_path_batches(xs,ys,offs,mm_per_px):
+    X=np.rint(xs*mm_per_px*SVG_UNITS_PER_MM).astype(np.int64)
+    Y=np.rint(ys*mm_per_px*SVG_UNITS_PER_MM).astype(np.int64)
+    n=len(offs)-1
+    for k in range(0,n,SVG_BATCH):
+        cancel_check()
+        starts=offs[k:min(n,k+SVG_BATCH)+1]
+        a,b=int(starts[0]),int(starts[-1])
+        dx=np.diff(X[a:b],prepend=0)
+        dy=np.diff(Y[a:b],prepend=0)
+        cmd=np.where(dy==0,2,np.where(dx==0,3,1))
+        cmd[starts[:-1]-a]=0
+        vals=np.column_stack((dx,dy))[np.column_stack((cmd!=3,cmd!=2))]
+        yield '<path d="'+"".join(SVG_COMPACT_CMDS[cmd].tolist())%tuple(vals.tolist())+'"/>\n',len(starts)-1
+def write_strokes(write,tables,mm_per_px,travel="Raster",keep=None,encoding=SVG_ENCODINGS[0]):
+    before=after=None
+    if travel!="Raster":
+        xs,ys,offs,runs=concat_strokes(list(tables))
+        st=step_begin()
+        before=stroke_travel(xs,ys,offs)*mm_per_px
+        xs,ys,offs=optimize_stroke_order(xs,ys,offs,travel==TRAVEL_MODES[2])
+        after=stroke_travel(xs,ys,offs)*mm_per_px
+        step_end("travel order",st)
+        tables=[(xs,ys,offs,runs)]
+    pc=0
+    runs=0
+    for xs,ys,offs,r in tables:
+        st=step_begin()
+        if keep is not None:
+            keep.append((xs,ys,offs,r))
+        for text,n in (compact_path_batches if encoding==SVG_ENCODINGS[1] else stroke_path_batches)(xs,ys,offs,mm_per_px):
+            write(text)
+            pc+=n
+        runs+=r
+        step_end("SVG write",st)
+    return pc,runs,before,after
+def svg_tee(*files):
+    files=[f for f in files if f is not None]
+    def write(text):
+        for f in files:
+            f.write(text)
+    return write
+def save_strokes_cache(path,tables,stat):
+    xs,ys,offs,runs=concat_strokes(tables)
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    tmp=f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp,xs=xs,ys=ys,offs=offs,stat=np.array([np.nan if v is None else v for v in stat],dtype=float))
+    os.replace(tmp,path)
+def load_strokes_cache(path):
+    with np.load(path) as z:
+        pc,runs,before,after=z["stat"].tolist()
+        return [(z["xs"],z["ys"],z["offs"],int(runs))],(int(pc),int(runs),None if np.isnan(before) else before,None if np.isnan(after) else after)
+PLOT_FORMATS=["G-code","HPGL","Segments (.npy)"]
+PLOT_DIRS={"G-code":("gcode",".gcode"),"HPGL":("hpgl",".hpgl"),"Segments (.npy)":("segments",".npy")}
+HPGL_UNITS_PER_MM=40
+def plot_points(tables,mm_per_px,height_mm=None):
+    for xs,ys,offs,_ in tables:
+        for k in range(0,len(offs)-1,SVG_BATCH):
+            cancel_check()
+            starts=offs[k:min(len(offs)-1,k+SVG_BATCH)+1]
+            a,b=int(starts[0]),int(starts[-1])
+            X=xs[a:b]*mm_per_px
+            Y=ys[a:b]*mm_per_px
+            yield X,Y if height_mm is None else height_mm-Y,starts-a
+def point_codes(n,offs):
+    codes=np.ones(n,dtype=np.int64)
+    codes[offs[1:]-1]=2
+    codes[offs[:-1]]=0
+    return codes
+def write_gcode(path,tables,mm_per_px,label,opts):
+    up=opts["pen_up"].replace("%","%%")
+    down=opts["pen_down"].replace("%","%%")
+    travel=f" F{opts['feed_travel']:g}" if opts["feed_travel"]>0 else ""
+    feed=f" F{opts['feed_draw']:g}" if opts["feed_draw"]>0 else ""
+    tmpl=np.array([f"{up}\nG0 X%.3f Y%.3f{travel}\n{down}\n","G1 X%.3f Y%.3f\n","G1 X%.3f Y%.3f\n",f"G1 X%.3f Y%.3f{feed}\n"])
+    with open(path,"w",encoding="utf-8",buffering=SVG_BUFFER) as f:
+        f.write(f"; HatchSmith © FIWAtec GmbH\n; Layer {label}\nG21\nG90\n")
+        for X,Y,offs in plot_points(tables,mm_per_px,opts["height_mm"]):
+            codes=point_codes(len(X),offs)
+            codes[offs[:-1][np.diff(offs)>1]+1]=3
+            f.write("".join(tmpl[codes].tolist())%tuple(np.column_stack((X,Y)).ravel().tolist()))
+        f.write(opts["pen_up"]+"\n")
+def write_hpgl(path,tables,mm_per_px,label,opts):
+    tmpl=np.array(["PU%d,%d;PD","%d,%d,","%d,%d;\n"])
+    with open(path,"w",encoding="ascii",buffering=SVG_BUFFER) as f:
+        f.write("IN;SP1;"+(f"VS{opts['feed_draw']/600.0:.1f};" if opts["feed_draw"]>0 else "")+"\n")
+        for X,Y,offs in plot_points(tables,mm_per_px,opts["height_mm"]):
+            P=np.rint(np.column_stack((X,Y))*HPGL_UNITS_PER_MM).astype(np.int64)
+            moved=np.concatenate(([0],np.cumsum(np.any(P[1:]!=P[:-1],axis=1))))
+            keep=moved[offs[1:]-1]>moved[offs[:-1]]
+            lens=np.diff(offs)
+            P=P[np.repeat(keep,lens)]
+            lens=lens[keep]
+            offs=np.concatenate(([0],np.cumsum(lens)))
+            f.write("".join(tmpl[point_codes(len(P),offs)].tolist())%tuple(P.ravel().tolist()))
+        f.write("PU;SP0;\n")
+def write_segments(path,tables,mm_per_px,label,opts):
+    n=sum(len(t[0])-(len(t[2])-1) for t in tables)
+    seg=np.lib.format.open_memmap(path,mode="w+",dtype=np.float32,shape=(n,4))
+    i=0
+    for X,Y,offs in plot_points(tables,mm_per_px):
+        keep=np.ones(max(0,len(X)-1),dtype=bool)
+        keep[offs[1:-1]-1]=False
+        m=int(keep.sum())
+        seg[i:i+m]=np.column_stack((X[:-1][keep],Y[:-1][keep],X[1:][keep],Y[1:][keep]))
+        i+=m
+    seg.flush()
+    del seg
+PLOT_WRITERS={"G-code":write_gcode,"HPGL":write_hpgl,"Segments (.npy)":write_segments}
+def write_plot_files(plots,tables,mm_per_px,label):
+    outputs,opts=plots
+    for fmt,path in outputs:
+        PLOT_WRITERS[fmt](path,tables,mm_per_px,label,opts)
+def clip_strokes(xs,ys,offs,rect):
+    x0,y0,x1,y1=rect
+    seg=np.ones(max(0,len(xs)-1),dtype=bool)
+    seg[offs[1:-1]-1]=False
+    i=np.flatnonzero(seg)
+    ax,ay=xs[i],ys[i]
+    dx,dy=xs[i+1]-ax,ys[i+1]-ay
+    t0=np.zeros(len(i))
+    t1=np.ones(len(i))
+    out=np.zeros(len(i),dtype=bool)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        for p,q,edge in ((-dx,ax-x0,False),(dx,x1-ax,True),(-dy,ay-y0,False),(dy,y1-ay,True)):
+            r=q/p
+            t0=np.where(p<0,np.maximum(t0,r),t0)
+            t1=np.where(p>0,np.minimum(t1,r),t1)
+            out|=(p==0)&((q<=0) if edge else (q<0))
+    keep=(t0<t1)&~out
+    i,t0,t1,ax,ay,dx,dy=i[keep],t0[keep],t1[keep],ax[keep],ay[keep],dx[keep],dy[keep]
+    new=t0>0
+    if len(i):
+        new[0]=True
+        new[1:]|=(i[1:]!=i[:-1]+1)|(t1[:-1]<1)
+    m=np.column_stack((new,np.ones(len(i),dtype=bool))).ravel()
+    pos=np.cumsum(m)-1
+    px=np.column_stack((ax+t0*dx,ax+t1*dx)).ravel()[m]-x0
+    py=np.column_stack((ay+t0*dy,ay+t1*dy)).ravel()[m]-y0
+    return px,py,np.append(pos[0::2][new],len(px)).astype(np.int64),int(new.sum())
+def panel_grid(width_mm,height_mm,panel_w_mm,panel_h_mm,overlap_mm=0.0):
+    pw=panel_w_mm or width_mm
+    ph=panel_h_mm or height_mm
+    cells=[]
+    for r in range(max(1,int(np.ceil(height_mm/ph-1e-9)))):
+        for c in range(max(1,int(np.ceil(width_mm/pw-1e-9)))):
+            core=(c*pw,r*ph,min(width_mm,(c+1)*pw),min(height_mm,(r+1)*ph))
+            box=(max(0.0,core[0]-overlap_mm),max(0.0,core[1]-overlap_mm),min(width_mm,core[2]+overlap_mm),min(height_mm,core[3]+overlap_mm))
+            cells.append((f"r{r+1:02d}_c{c+1:02d}",r+1,c+1,core,box))
+    return cells
+def panel_rects(grid,mm_per_px,area=4):
+    rows,cols=grid[-1][1],grid[-1][2]
+    return [(cell[area][0]/mm_per_px,cell[area][1]/mm_per_px,cell[area][2]/mm_per_px if cell[2]<cols else np.inf,cell[area][3]/mm_per_px if cell[1]<rows else np.inf) for cell in grid]
+def svg_group(prefix,name,hx,pen_mm,encoding=SVG_ENCODINGS[0]):
+    if encoding==SVG_ENCODINGS[1]:
+        return f'<g id="{prefix}_{name}" stroke="#{hx}" stroke-width="{pen_mm*SVG_UNITS_PER_MM:g}" stroke-linecap="round" stroke-linejoin="round" fill="none" transform="scale({1.0/SVG_UNITS_PER_MM:g})">\n'
+    return f'<g id="{prefix}_{name}" stroke="#{hx}" stroke-width="{pen_mm:.3f}" stroke-linecap="round" stroke-linejoin="round" fill="none">\n'
+def write_panel_files(panels,tables,mm_per_px,prefix,name,hx,pen_mm,encoding=SVG_ENCODINGS[0]):
+    items,plot_fmts,plot_opts=panels
+    for folder,rect,w_mm,h_mm in items:
+        clipped=[t for t in (clip_strokes(xs,ys,offs,rect) for xs,ys,offs,_ in tables) if t[3]]
+        cancel_check()
+        if not clipped:
+            continue
+        with open(os.path.join(folder,f"{prefix}_{name}_{hx}.svg"),"w",encoding="utf-8",buffering=SVG_BUFFER) as f:
+            f.write(svg_header(w_mm,h_mm)+svg_group(prefix,name,hx,pen_mm,encoding))
+            write_strokes(f.write,clipped,mm_per_px,encoding=encoding)
+            f.write("</g>\n"+svg_footer())
+        if plot_fmts:
+            outputs=[(fmt,os.path.join(folder,f"{prefix}_{name}_{hx}{PLOT_DIRS[fmt][1]}")) for fmt in plot_fmts]
+            write_plot_files((outputs,dict(plot_opts,height_mm=h_mm)),clipped,mm_per_px,f"{prefix}_{name} #{hx} panel {os.path.basename(folder)}")
+def write_svg_layer(write,strokes,mm_per_px,step_px,modes,prefix,name,hx,pen_mm,join=False,travel="Raster",cache_path=None,encoding=SVG_ENCODINGS[0],plots=None,min_px=0.0,panels=None):
+    write(svg_group(prefix,name,hx,pen_mm,encoding))
+    if cache_path and os.path.isfile(cache_path):
+        keep,stat=load_strokes_cache(cache_path)
+        write_strokes(write,keep,mm_per_px,encoding=encoding)
+    else:
+        keep=[] if cache_path or plots or panels else None
+        stat=write_strokes(write,strokes(step_px,modes,join=join,min_px=min_px),mm_per_px,travel,keep,encoding)
+        if stat[0]==0:
+            keep=[] if cache_path or plots or panels else None
+            stat=write_strokes(write,strokes(1,["h"],join=join,min_px=min_px),mm_per_px,travel,keep,encoding)
+        if cache_path:
+            save_strokes_cache(cache_path,keep,stat)
+    if plots:
+        write_plot_files(plots,keep,mm_per_px,f"{prefix}_{name} #{hx}")
+    if panels:
+        write_panel_files(panels,keep,mm_per_px,prefix,name,hx,pen_mm,encoding)
+    write("</g>\n")
+    return stat
+def append_file_range(dst,src_path,start,end):
+    dst.flush()
+    with open(src_path,"rb") as src:
+        src.seek(start)
+        left=end-start
+        while left>0:
+            buf=src.read(min(left,SVG_BUFFER))
+            if not buf:
+                break
+            dst.buffer.write(buf)
+            left-=len(buf)
+_LABEL_MAPS={}
+def svg_worker_init(stop):
+    set_cancel_check(stop.is_set)
+def svg_layer_task(label_path,index,strip_rows,engine,layer_path,header,footer,pidx,*args):
+    q_arr=_LABEL_MAPS.get(label_path)
+    if q_arr is None:
+        q_arr=_LABEL_MAPS.setdefault(label_path,np.load(label_path,mmap_mode="r"))
+    strokes=layer_source(q_arr,index,pidx,strip_rows,engine)
+    t,c,rss=time.perf_counter(),time.process_time(),process_rss()
+    steps=[]
+    set_step_log(steps)
+    try:
+        with open(layer_path,"w",encoding="utf-8",buffering=SVG_BUFFER) as f:
+            f.write(header)
+            f.flush()
+            start=f.buffer.tell()
+            stat=write_svg_layer(f.write,strokes,*args)
+            f.flush()
+            end=f.buffer.tell()
+            f.write(footer)
+    finally:
+        set_step_log(None)
+    return stat,start,end,span_timing(t,c,rss),steps
+CACHE_KINDS=("labels","runs","png","hatch")
+def default_cache_dir():
+    base=os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"),".cache")
+    return os.path.join(base,"HatchSmith","cache")
+CACHE_GRACE_S=300.0
+FILE_DIGEST_MEMO=256
+_CACHE_LOCK=threading.Lock()
+_CACHE_OPEN={}
+@functools.lru_cache(maxsize=FILE_DIGEST_MEMO)
+def _file_digest(path,size,mtime_ns):
+    h=hashlib.sha256()
+    with open(path,"rb") as f:
+        for buf in iter(lambda:f.read(SVG_BUFFER),b""):
+            h.update(buf)
+    return h.hexdigest()
+def file_digest(path):
+    st=os.stat(path)
+    return _file_digest(os.path.abspath(path),st.st_size,st.st_mtime_ns)
+def cache_key(*parts):
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:40]
+class ResultCache:
+    def __init__(self,root,limit_mb):
+        self.root=root
+        self.limit=int(limit_mb)<<20
+        self.stats={k:[0,0] for k in CACHE_KINDS}
+        self.started=time.time()
+        with _CACHE_LOCK:
+            _CACHE_OPEN[id(self)]=(os.path.abspath(root),self.started)
+        self.close=weakref.finalize(self,_CACHE_OPEN.pop,id(self),None)
+    def path(self,key,ext):
+        return os.path.join(self.root,key[:2],key+ext)
+    def lookup(self,kind,key,*exts):
+        paths=[self.path(key,ext) for ext in exts]
+        with _CACHE_LOCK:
+            try:
+                for p in paths:
+                    os.utime(p)
+                hit=True
+            except OSError:
+                hit=False
+        self.stats[kind][0 if hit else 1]+=1
+        return paths[0] if hit else None
+    def store(self,src,key,ext):
+        p=self.path(key,ext)
+        os.makedirs(os.path.dirname(p),exist_ok=True)
+        tmp=f"{p}.{os.getpid()}.tmp"
+        shutil.copyfile(src,tmp)
+        os.replace(tmp,p)
+        return p
+    def store_array(self,arr,key,ext):
+        if getattr(arr,"filename",None):
+            return self.store(arr.filename,key,ext)
+        p=self.path(key,ext)
+        os.makedirs(os.path.dirname(p),exist_ok=True)
+        tmp=f"{p}.{os.getpid()}.tmp"
+        with open(tmp,"wb") as f:
+            np.save(f,arr)
+        os.replace(tmp,p)
+        return p
+    def store_json(self,obj,key,ext):
+        p=self.path(key,ext)
+        os.makedirs(os.path.dirname(p),exist_ok=True)
+        tmp=f"{p}.{os.getpid()}.tmp"
+        with open(tmp,"w",encoding="utf-8") as f:
+            json.dump(obj,f)
+        os.replace(tmp,p)
+        return p
+    def evict(self,keep_after=0.0):
+        with _CACHE_LOCK:
+            root=os.path.abspath(self.root)
+            keep_after=min([keep_after,time.time()-CACHE_GRACE_S]+[t for k,(r,t) in _CACHE_OPEN.items() if r==root and k!=id(self)])
+            return self._evict(keep_after)
+    def _evict(self,keep_after):
+        files=[]
+        for root,_,names in os.walk(self.root):
+            for fn in names:
+                fp=os.path.join(root,fn)
+                try:
+                    st=os.stat(fp)
+                except OSError:
+                    continue
+                files.append((st.st_mtime,st.st_size,fp))
+        total=sum(f[1] for f in files)
+        removed=0
+        for mtime,size,fp in sorted(files):
+            if total<=self.limit or mtime>=keep_after:
+                break
+            try:
+                os.remove(fp)
+            except OSError:
+                continue
+            total-=size
+            removed+=1
+        return removed
+    def summary(self):
+        return "Cache: "+", ".join(f"{k} {h} hit / {m} miss" for k,(h,m) in self.stats.items())
+BUNDLE_MODES=["Files + zip","Zip only","Files only"]
+ZIP_STORED_EXTS={".png",".npz",".zip",".gz"}
+ZIP_PROBE=1<<16
+ZIP_MIN_GAIN=0.9
+def zip_compress_type(path):
+    if os.path.splitext(path)[1].lower() not in ZIP_STORED_EXTS:
+        return zipfile.ZIP_DEFLATED
+    with open(path,"rb") as f:
+        head=f.read(ZIP_PROBE)
+    return zipfile.ZIP_DEFLATED if len(zlib.compress(head,1))<ZIP_MIN_GAIN*len(head) else zipfile.ZIP_STORED
+class ZipBundle:
+    def __init__(self,path,root,keep_files=True):
+        self.path=path
+        self.root=root
+        self.keep_files=keep_files
+        self.z=zipfile.ZipFile(path,"w",compression=zipfile.ZIP_DEFLATED)
+        self.pool=concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.futures=[]
+    def add(self,path,arcname=None):
+        self.futures.append(self.pool.submit(self._add,path,arcname))
+    def _add(self,path,arcname):
+        self.z.write(path,arcname or os.path.relpath(path,self.root),compress_type=zip_compress_type(path))
+        if arcname is None and not self.keep_files:
+            os.remove(path)
+    def close(self):
+        self.pool.shutdown(wait=True)
+        try:
+            for fut in self.futures:
+                fut.result()
+        finally:
+            self.z.close()
+    def abort(self):
+        self.pool.shutdown(wait=True,cancel_futures=True)
+        try:
+            self.z.close()
+        except (OSError,ValueError):
+            pass
+        if self.keep_files:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+PROFILE_TRACE="profile_trace.json"
+PROFILE_TOP_LAYERS=5
+if os.name=="nt":
+    class _MemCounters(ctypes.Structure):
+        _fields_=[("cb",ctypes.c_ulong),("faults",ctypes.c_ulong)]+[(f"v{i}",ctypes.c_size_t) for i in range(8)]
+    _K32=ctypes.WinDLL("kernel32")
+    _K32.GetCurrentProcess.restype=ctypes.c_void_p
+    _K32.K32GetProcessMemoryInfo.argtypes=[ctypes.c_void_p,ctypes.c_void_p,ctypes.c_ulong]
+def process_rss():
+    if os.name=="nt":
+        c=_MemCounters()
+        c.cb=ctypes.sizeof(c)
+        return c.v1 if _K32.K32GetProcessMemoryInfo(_K32.GetCurrentProcess(),ctypes.byref(c),c.cb) else 0
+    try:
+        with open("/proc/self/statm","rb") as f:
+            return int(f.read().split()[1])*mmap.PAGESIZE
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform=="darwin" else rss*1024
+def span_timing(t,c,rss):
+    return t,time.perf_counter()-t,time.process_time()-c,process_rss()-rss,os.getpid()
+class NullProfiler:
+    def begin(self,name,cat="stage"):
+        return None
+    def end(self,span,paths=None,files=()):
+        pass
+    def add(self,name,cat,start,wall,cpu,rss_delta,pid=None,paths=None,nbytes=None):
+        pass
+class StageProfiler(NullProfiler):
+    def __init__(self):
+        self.t0=time.perf_counter()
+        self.pid=os.getpid()
+        self.tid=threading.get_ident()
+        self.spans=[]
+    def begin(self,name,cat="stage"):
+        clock=time.thread_time if cat=="layer" else time.process_time
+        return name,cat,clock,time.perf_counter(),clock(),process_rss()
+    def end(self,span,paths=None,files=()):
+        name,cat,clock,t,c,rss=span
+        wall,cpu=time.perf_counter()-t,clock()-c
+        self.add(name,cat,t,wall,cpu,process_rss()-rss,None,paths,sum(os.path.getsize(p) for p in files if p and os.path.isfile(p)) if files else None)
+    def add(self,name,cat,start,wall,cpu,rss_delta,pid=None,paths=None,nbytes=None):
+        tid=threading.get_ident() if pid is None else pid
+        self.spans.append({"name":name,"cat":cat,"start":start-self.t0,"wall":wall,"cpu":cpu,"rss_delta":rss_delta,"paths":paths,"bytes":nbytes,"pid":pid or self.pid,"tid":tid})
+    def _row(self,name,s):
+        paths="-" if s["paths"] is None else str(s["paths"])
+        out="-" if s["bytes"] is None else f"{s['bytes']/2**20:.2f}"
+        return f"{name[:28]:<28} {s['wall']:8.3f} {s['cpu']:8.3f} {paths:>9} {out:>9} {s['rss_delta']/2**20:+9.1f}"
+    def summary(self):
+        lines=[f"{'Stage':<28} {'wall s':>8} {'CPU s':>8} {'paths':>9} {'MB out':>9} {'ΔRSS MB':>9}"]
+        lines+=[self._row(s["name"],s) for s in self.spans if s["cat"]=="stage"]
+        steps={}
+        for s in self.spans:
+            if s["cat"]=="step":
+                a=steps.setdefault(s["name"],{"wall":0.0,"cpu":0.0,"rss_delta":0,"paths":None,"bytes":None})
+                a["wall"]+=s["wall"]
+                a["cpu"]+=s["cpu"]
+        if steps:
+            lines.append("Steps summed over all layers and workers:")
+            lines+=[self._row(name,a) for name,a in steps.items()]
+        layers=sorted((s for s in self.spans if s["cat"]=="layer"),key=lambda s:-s["wall"])[:PROFILE_TOP_LAYERS]
+        if layers:
+            lines.append(f"Slowest {len(layers)} of {sum(1 for s in self.spans if s['cat']=='layer')} layers:")
+            lines+=[self._row(s["name"],s) for s in layers]
+        return lines
+    def save_trace(self,path):
+        names={}
+        for s in self.spans:
+            key=(s["pid"],s["tid"])
+            if key not in names:
+                names[key]="export" if key==(self.pid,self.tid) else f"worker {len(names)}" if s["pid"]==self.pid else f"SVG process {s['pid']}"
+        events=[{"name":"thread_name","ph":"M","pid":pid,"tid":tid,"args":{"name":label}} for (pid,tid),label in names.items()]
+        for s in self.spans:
+            args={"cpu_ms":round(s["cpu"]*1000.0,3),"rss_delta_mb":round(s["rss_delta"]/2**20,3)}
+            if s["paths"] is not None:
+                args["paths"]=s["paths"]
+            if s["bytes"] is not None:
+                args["bytes"]=s["bytes"]
+            events.append({"name":s["name"],"cat":s["cat"],"ph":"X","ts":round(s["start"]*1e6,1),"dur":round(s["wall"]*1e6,1),"pid":s["pid"],"tid":s["tid"],"args":args})
+        with open(path,"w",encoding="utf-8") as f:
+            json.dump({"traceEvents":events,"displayTimeUnit":"ms"},f)
+        return path
+class ExportJob:
+    def __init__(self):
+        self.input_png_path=""
+        self.output_dir=""
+        self.n_colors=Cfg.DEFAULT_COLORS
+        self.quantize_method=QUANTIZE_METHODS[0]
+        self.pen_mm=Cfg.DEFAULT_PEN_MM
+        self.draw_w_mm=Cfg.DEFAULT_DRAW_W_MM
+        self.draw_h_mm=0.0
+        self.keep_aspect=Cfg.DEFAULT_KEEP_ASPECT
+        self.use_crosshatch=Cfg.DEFAULT_CROSSHATCH
+        self.angle_set=Cfg.DEFAULT_ANGLE_SET
+        self.hatch_angle=Cfg.DEFAULT_HATCH_ANGLE
+        self.export_png_layers=True
+        self.export_svg_layers=True
+        self.export_svg_combined=True
+        self.export_gcode=False
+        self.export_hpgl=False
+        self.export_segments=False
+        self.pen_up=Cfg.DEFAULT_PEN_UP
+        self.pen_down=Cfg.DEFAULT_PEN_DOWN
+        self.feed_draw=Cfg.DEFAULT_FEED
+        self.feed_travel=Cfg.DEFAULT_TRAVEL_FEED
+        self.svg_workers=Cfg.DEFAULT_SVG_WORKERS
+        self.memory_budget_mb=Cfg.DEFAULT_MEMORY_BUDGET_MB
+        self.cache_mb=Cfg.DEFAULT_CACHE_MB
+        self.png_crop=False
+        self.png_mode=PNG_MODES[0]
+        self.png_compress=Cfg.DEFAULT_PNG_COMPRESS
+        self.png_workers=Cfg.DEFAULT_PNG_WORKERS
+        self.bundle=BUNDLE_MODES[0]
+        self.cache_dir=""
+        self.join_serpentine=False
+        self.travel_order=TRAVEL_MODES[0]
+        self.svg_encoding=SVG_ENCODINGS[0]
+        self.hatch_engine=HATCH_ENGINES[0]
+        self.panel_w_mm=0.0
+        self.panel_h_mm=0.0
+        self.panel_overlap_mm=0.0
+        self.speckle_filter=False
+        self.speckle_min_area_mm2=0.0
+        self.min_segment_mm=0.0
+        self.labels_text=""
+        self.force_user_order=False
+        self.profile=False
+def layer_hatch_params(rgb,job,mm_per_px):
+    v,_,_=hsv_v(*rgb)
+    step_px=spacing_mm_from_v(v,job.pen_mm)/mm_per_px
+    return (step_px if job.hatch_engine==HATCH_ENGINES[1] else max(1,int(round(step_px)))),angle_modes_from_choice(job.angle_set,v,job.use_crosshatch,job.hatch_angle)
+PREVIEW_MAX=(1200,700)
+PYRAMID_TILE=512
+def reduce_rgba(a):
+    if a.shape[0]%2 or a.shape[1]%2:
+        a=np.pad(a,((0,a.shape[0]%2),(0,a.shape[1]%2),(0,0)),mode="edge")
+    if (a[...,3]==255).all():
+        s=a[0::2,0::2].astype(np.uint16)
+        s+=a[1::2,0::2]
+        s+=a[0::2,1::2]
+        s+=a[1::2,1::2]
+        s+=2
+        s>>=2
+        return s.astype(np.uint8)
+    a=a.astype(np.uint32)
+    al=a[...,3:]
+    pm=a[...,:3]*al
+    sa=al[0::2,0::2]+al[1::2,0::2]+al[0::2,1::2]+al[1::2,1::2]
+    sp=pm[0::2,0::2]+pm[1::2,0::2]+pm[0::2,1::2]+pm[1::2,1::2]
+    out=np.empty(sa.shape[:2]+(4,),dtype=np.uint8)
+    out[...,:3]=(sp+sa//2)//np.maximum(sa,1)
+    out[...,3:]=(sa+2)>>2
+    return out
+class ImagePyramid:
+    def __init__(self,path,tile=PYRAMID_TILE):
+        self.tile=tile
+        self.dir=tempfile.mkdtemp(prefix="hatchsmith_view_")
+        weakref.finalize(self,shutil.rmtree,self.dir,True)
+        self.src=TiledSource(path,os.path.join(self.dir,"level0.npy"))
+        self.size=self.src.size
+        self.sizes=[self.size]
+        self.levels=[self.src]
+        while max(self.sizes[-1])>tile:
+            self.levels.append(self._reduce(len(self.levels)))
+            self.sizes.append((self.levels[-1].shape[1],self.levels[-1].shape[0]))
+    def rgba(self,level,y0,y1,x0=0,x1=None):
+        return self.src.rgba(y0,y1,x0,x1) if level==0 else self.levels[level][y0:y1,x0:x1]
+    def _reduce(self,level):
+        pw,ph=self.sizes[level-1]
+        w,h=-(-pw//2),-(-ph//2)
+        dst=np.lib.format.open_memmap(os.path.join(self.dir,f"level{level}.npy"),mode="w+",dtype=np.uint8,shape=(h,w,4))
+        rows=max(1,HATCH_CHUNK//max(1,4*w))
+        for y0 in range(0,h,rows):
+            dst[y0:y0+rows]=reduce_rgba(self.rgba(level-1,2*y0,min(ph,2*(y0+rows))))
+            release_pages(dst)
+            release_pages(self.src.data if level==1 else self.levels[level-1])
+        return dst
+    def preview(self,max_size=PREVIEW_MAX):
+        w,h=self.size
+        scale=min(max_size[0]/w,max_size[1]/h,1.0)
+        if scale>=1.0:
+            return Image.fromarray(self.rgba(0,0,h),"RGBA")
+        tw,th=max(1,int(w*scale)),max(1,int(h*scale))
+        base=0
+        for level,(lw,lh) in enumerate(self.sizes[1:],1):
+            if lw<2*tw or lh<2*th:
+                break
+            base=level
+        return Image.fromarray(self.rgba(base,0,self.sizes[base][1]),"RGBA").resize((tw,th),Image.LANCZOS)
+    def level_for(self,px_per_src):
+        if px_per_src<=0:
+            return len(self.levels)-1
+        return min(len(self.levels)-1,max(0,int(np.floor(np.log2(1.0/px_per_src)))))
+    def tiles(self,level,x0,y0,x1,y1):
+        f=self.tile<<level
+        w,h=self.sizes[level]
+        nx=-(-w//self.tile)
+        ny=-(-h//self.tile)
+        return [(tx,ty) for ty in range(max(0,int(y0//f)),min(ny,int(y1//f)+1)) for tx in range(max(0,int(x0//f)),min(nx,int(x1//f)+1))]
+    def tile_rgba(self,level,tx,ty):
+        t=self.tile
+        return np.ascontiguousarray(self.rgba(level,ty*t,ty*t+t,tx*t,tx*t+t))
+def load_pyramid(path,tile=PYRAMID_TILE):
+    return ImagePyramid(path,tile)
+MTIME_SLACK_S=0.1
+def remove_outputs(root,since):
+    files,dirs=[],[]
+    for base,_,names in os.walk(root,topdown=False):
+        for fp in [os.path.join(base,fn) for fn in names]+[base]:
+            try:
+                if os.stat(fp).st_mtime>=since:
+                    (files if fp!=base else dirs).append(fp)
+            except OSError:
+                pass
+    for fp in files:
+        try:
+            os.remove(fp)
+        except OSError:
+            pass
+    for d in dirs:
+        try:
+            os.rmdir(d)
+        except OSError:
+            pass
+class Exporter:
+    def __init__(self,job,log=None,progress=None,profiler=None):
+        self.job=job
+        self.log=log or (lambda msg:None)
+        self.progress=progress or (lambda value:None)
+        self._stop=False
+        self.profiler=profiler
+        self.prof=NullProfiler()
+    def stop(self):
+        self._stop=True
+    def run(self):
+        started=time.time()-MTIME_SLACK_S
+        tmp=tempfile.mkdtemp(prefix="hatchsmith_") if self.job.memory_budget_mb>0 else None
+        self._bundle=None
+        set_cancel_check(lambda:self._stop)
+        try:
+            return self._run(tmp)
+        except BaseException:
+            if self._bundle:
+                self._bundle.abort()
+            if self.job.output_dir:
+                remove_outputs(self.job.output_dir,started)
+            raise
+        finally:
+            set_cancel_check(None)
+            if tmp:
+                shutil.rmtree(tmp,ignore_errors=True)
+    def _run(self,tmp):
+        j=self.job
+        t0=time.time()
+        prof=self.prof=self.profiler if self.profiler is not None else StageProfiler() if j.profile else NullProfiler()
+        if not j.input_png_path or not os.path.isfile(j.input_png_path):
+            raise RuntimeError("Missing input PNG.")
+        out=safe_mkdir(j.output_dir)
+        self.log("Opened: "+j.input_png_path)
+        preview_path=os.path.join(out,"quantized_preview.png")
+        cache=ResultCache(j.cache_dir or default_cache_dir(),j.cache_mb) if j.cache_mb>0 else None
+        bundle=self._bundle=ZipBundle(os.path.join(out,"export.zip"),out,j.bundle!=BUNDLE_MODES[1]) if j.bundle!=BUNDLE_MODES[2] else None
+        sp=prof.begin("cache lookup")
+        labels_key=cache_key("labels",file_digest(j.input_png_path),j.n_colors,j.quantize_method,j.memory_budget_mb) if cache else None
+        hit=cache.lookup("labels",labels_key,".npy",".json",".png") if cache else None
+        prof.end(sp)
+        sp=prof.begin("labels from cache" if hit else "quantize (tiled)" if tmp else "decode")
+        if hit:
+            q_arr=np.load(hit,mmap_mode="r")
+            h,w=q_arr.shape
+            with open(cache.path(labels_key,".json"),"r",encoding="utf-8") as f:
+                meta=json.load(f)
+            palette=[tuple(p) for p in meta["palette"]]
+            counts=np.array(meta["counts"],dtype=np.int64)
+            index=[tuple(box) if box else None for box in meta["index"]]
+            shutil.copyfile(cache.path(labels_key,".png"),preview_path)
+            self.log(f"Image size: {w}×{h}px")
+            self.log(f"Quantized labels for {j.n_colors} colors: from cache")
+            strip_rows=tile_rows(w,j.memory_budget_mb,max(1,j.svg_workers)) if tmp else 0
+        elif tmp:
+            q_arr,palette=self._quantize_tiled(preview_path,tmp)
+            h,w=q_arr.shape
+            index=label_index(q_arr,len(palette))
+            counts=np.array([box[0] if box else 0 for box in index],dtype=np.int64)
+            strip_rows=tile_rows(w,j.memory_budget_mb,max(1,j.svg_workers))
+        else:
+            img_rgb=Image.open(j.input_png_path).convert("RGB")
+            w,h=img_rgb.size
+            prof.end(sp)
+            sp=prof.begin("quantize")
+            self.log(f"Image size: {w}×{h}px")
+            self.progress(5)
+            self.log(f"Quantizing to {j.n_colors} colors…" if j.quantize_method==QUANTIZE_METHODS[0] else f"Quantizing to {j.n_colors} colors ({j.quantize_method})…")
+            q,q_arr,palette,counts=quantize_image_rgb(img_rgb,j.n_colors,j.quantize_method)
+            index=label_index(q_arr,len(palette))
+            q.convert("RGB").save(preview_path)
+            del img_rgb,q
+            strip_rows=0
+        if cache and not hit:
+            cache.store(preview_path,labels_key,".png")
+            cache.store_json({"palette":[list(map(int,p)) for p in palette],"counts":[int(c) for c in counts],"index":index},labels_key,".json")
+            cache.store_array(q_arr,labels_key,".npy")
+        if bundle:
+            bundle.add(preview_path)
+        prof.end(sp,None,(preview_path,))
+        total=int(counts.sum())
+        self.progress(12)
+        self.log("Saved preview: "+preview_path)
+        self.progress(16)
+        if j.keep_aspect or j.draw_h_mm<=0.0:
+            mm_per_px=j.draw_w_mm/float(w)
+            draw_h_mm=h*mm_per_px
+        else:
+            mm_per_px=j.draw_w_mm/float(w)
+            draw_h_mm=j.draw_h_mm
+        self.log(f"Target size: {j.draw_w_mm:.1f}mm × {draw_h_mm:.1f}mm | Pen: {j.pen_mm:.2f}mm")
+        layers_key=labels_key
+        min_px=0.0
+        runs_before={}
+        if j.speckle_filter:
+            sp=prof.begin("speckle filter")
+            radius,min_area,min_px=speckle_params(j.pen_mm,mm_per_px,j.speckle_min_area_mm2,j.min_segment_mm)
+            self.log(f"Speckle filter: opening {2*radius+1}px, min area {min_area}px, min stroke {min_px*mm_per_px:.2f}mm…")
+            raw,raw_index=q_arr,index
+            q_arr=np.lib.format.open_memmap(os.path.join(tmp,"labels_clean.npy"),mode="w+",dtype=raw.dtype,shape=raw.shape) if tmp else np.empty_like(raw)
+            changed=clean_labels(raw,q_arr,radius,min_area,strip_rows)
+            params=[(pidx,)+layer_hatch_params(palette[pidx],j,mm_per_px) for pidx,box in enumerate(raw_index) if box]
+            runs_key=cache_key("runs",labels_key,j.hatch_engine,params) if cache else None
+            hit=cache.lookup("runs",runs_key,".json") if cache else None
+            if hit:
+                with open(hit,"r",encoding="utf-8") as f:
+                    runs_before={int(k):v for k,v in json.load(f).items()}
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max(1,j.svg_workers)) as pool:
+                    runs_before=dict(zip((p[0] for p in params),pool.map(lambda p:layer_run_count(raw,raw_index,p[0],strip_rows,j.hatch_engine,p[1],p[2]),params)))
+                if cache:
+                    cache.store_json(runs_before,runs_key,".json")
+            del raw,raw_index
+            index=label_index(q_arr,len(palette))
+            counts=np.array([box[0] if box else 0 for box in index],dtype=np.int64)
+            if cache:
+                layers_key=cache_key("speckle",labels_key,radius,min_area,min_px)
+            prof.end(sp)
+            self.log(f"Speckle filter: {changed} px ({changed/total*100.0:.2f}%) reassigned to neighbouring layers")
+        self.progress(20)
+        sp=prof.begin("layer list")
+        labels=parse_label_list(j.labels_text) if j.labels_text.strip() else []
+        have_user_labels=(len(labels)==j.n_colors)
+        order=[]
+        mapping_err={}
+        if have_user_labels and j.force_user_order:
+            self.log("Layer naming/order: custom list")
+            desired_hex=[hx for _,_,hx,_ in labels]
+            assigned,delta_e=palette_assignment_nearest(palette,desired_hex)
+            for idx,(prefix,name,hx,share) in enumerate(labels):
+                if idx not in assigned:
+                    self.log(f"Label {prefix} - {name} has no palette color left, skipped")
+                    continue
+                pidx=assigned[idx]
+                mapping_err[pidx]=delta_e[idx]
+                if delta_e[idx]>MAPPING_WARN_DE:
+                    self.log(f"Label {prefix} - {name} (#{hx}) mapped to #{rgb_to_hex(*palette[pidx])} with ΔE {delta_e[idx]:.1f}")
+                order.append((prefix,name,hx,float(share),pidx))
+        else:
+            self.log("Layer order: automatic (dark → light)")
+            meta=[]
+            for i,(r,g,b) in enumerate(palette):
+                v,_,_=hsv_v(r,g,b)
+                meta.append((i,v,int(counts[i])))
+            meta_sorted=sorted(meta,key=lambda t:(t[1],-t[2]))
+            for k,(i,v,cnt) in enumerate(meta_sorted,start=1):
+                prefix=f"{k:02d}"
+                hx=rgb_to_hex(*palette[i])
+                name=f"layer_{prefix}"
+                share=cnt/total*100.0
+                order.append((prefix,name,hx,share,i))
+        mapping_path=os.path.join(out,"layer_list.txt")
+        with open(mapping_path,"w",encoding="utf-8") as f:
+            f.write("HatchSmith export list © FIWAtec GmbH\n")
+            f.write(f"Source: {os.path.basename(j.input_png_path)}\n")
+            f.write(f"PNG: {w}×{h}px\n")
+            f.write(f"Target: {j.draw_w_mm:.1f}mm × {draw_h_mm:.1f}mm | Pen {j.pen_mm:.2f}mm\n")
+            f.write(f"Colors: {j.n_colors}\n" if j.quantize_method==QUANTIZE_METHODS[0] else f"Colors: {j.n_colors} | Quantization: {j.quantize_method}\n")
+            hatching=f"{j.angle_set} ({j.hatch_angle:.1f}°)" if j.angle_set=="Custom angle" else j.angle_set
+            f.write(f"Hatching: {hatching} | Crosshatch: {int(j.use_crosshatch)}\n\n" if j.hatch_engine==HATCH_ENGINES[0] else f"Hatching: {hatching} | Crosshatch: {int(j.use_crosshatch)} | Engine: {j.hatch_engine}\n\n")
+            for prefix,name,hx,share,pidx in order:
+                line=f"{prefix} - {name} (#{hx}) Share {share:.2f}%"
+                if pidx in mapping_err:
+                    line+=f" | Palette #{rgb_to_hex(*palette[pidx])} ΔE {mapping_err[pidx]:.1f}"
+                if j.export_png_layers and j.png_crop:
+                    bx,by,bw,bh=png_box(index,pidx,(w,h),True)
+                    line+=f" | PNG offset {bx},{by} size {bw}×{bh}px"
+                f.write(line+"\n")
+        if bundle:
+            bundle.add(mapping_path)
+        prof.end(sp,None,(mapping_path,))
+        self.log("Saved layer list: "+mapping_path)
+        self.progress(26)
+        if j.export_png_layers:
+            sp=prof.begin("PNG layers")
+            self.log("Exporting PNG layers…")
+            layers_dir=safe_mkdir(os.path.join(out,"png_layers"))
+            todo=[]
+            for prefix,name,hx,share,pidx in order:
+                key=cache_key("png",layers_key,pidx,j.png_crop,j.png_mode,j.png_compress) if cache else None
+                hit=cache.lookup("png",key,".png") if cache else None
+                fp=os.path.join(layers_dir,f"{prefix}_{name}_#{hx}.png")
+                if hit and bundle and not bundle.keep_files:
+                    bundle.add(hit,os.path.relpath(fp,out))
+                elif hit:
+                    shutil.copyfile(hit,fp)
+                    if bundle:
+                        bundle.add(fp)
+                else:
+                    todo.append((prefix,name,hx,share,pidx,key))
+            if tmp and todo:
+                n_workers=png_workers(j.png_workers)
+                self._png_layers_tiled(q_arr,index,palette,[t[:5] for t in todo],layers_dir,tile_rows(w,j.memory_budget_mb,n_workers),n_workers)
+                for prefix,name,hx,share,pidx,key in todo:
+                    self._png_ready(os.path.join(layers_dir,f"{prefix}_{name}_#{hx}.png"),key,cache,bundle)
+            elif todo:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=png_workers(j.png_workers,(w,h),j.png_crop)) as pool:
+                    futs=[pool.submit(self._png_layer,q_arr,index,palette,pidx,os.path.join(layers_dir,f"{prefix}_{name}_#{hx}.png")) for prefix,name,hx,share,pidx,key in todo]
+                    try:
+                        for i,(fut,(prefix,name,hx,share,pidx,key)) in enumerate(zip(futs,todo)):
+                            fut.result()
+                            self._png_ready(os.path.join(layers_dir,f"{prefix}_{name}_#{hx}.png"),key,cache,bundle)
+                            if (i%2)==0:
+                                self.progress(26+int(18*(i+1)/len(todo)))
+                    except BaseException:
+                        for fut in futs:
+                            fut.cancel()
+                        raise
+            prof.end(sp,None,[os.path.join(layers_dir,f"{prefix}_{name}_#{hx}.png") for prefix,name,hx,_,_ in order])
+            self.log("PNG layers: "+layers_dir)
+        self.progress(45)
+        sp=prof.begin("SVG layers")
+        if j.join_serpentine and j.hatch_engine==HATCH_ENGINES[1]:
+            self.log("Zig-zag joining needs the raster engine, vector hatch lines stay single strokes")
+        svg_dir=safe_mkdir(os.path.join(out,"svg"))
+        stats=[]
+        tasks=[]
+        plot_fmts=[fmt for fmt,on in zip(PLOT_FORMATS,(j.export_gcode,j.export_hpgl,j.export_segments)) if on]
+        plot_dirs={fmt:safe_mkdir(os.path.join(out,PLOT_DIRS[fmt][0])) for fmt in plot_fmts}
+        plot_opts={"pen_up":j.pen_up,"pen_down":j.pen_down,"feed_draw":float(j.feed_draw),"feed_travel":float(j.feed_travel),"height_mm":float(draw_h_mm)}
+        plot_paths=[]
+        grid=panel_grid(j.draw_w_mm,draw_h_mm,j.panel_w_mm,j.panel_h_mm,j.panel_overlap_mm) if j.panel_w_mm>0 or j.panel_h_mm>0 else []
+        panels_dir=safe_mkdir(os.path.join(out,"panels")) if grid else None
+        panels=([(safe_mkdir(os.path.join(panels_dir,pname)),rect,box[2]-box[0],box[3]-box[1]) for (pname,row,col,core,box),rect in zip(grid,panel_rects(grid,mm_per_px))],plot_fmts,plot_opts) if grid else None
+        if grid:
+            self.log(f"Panels: {grid[-1][1]}×{grid[-1][2]} grid of {j.panel_w_mm or j.draw_w_mm:.1f}mm × {j.panel_h_mm or draw_h_mm:.1f}mm, overlap {j.panel_overlap_mm:.1f}mm")
+        for prefix,name,hx,share,pidx in order:
+            step_px,modes=layer_hatch_params(palette[pidx],j,mm_per_px)
+            cache_path=None
+            if cache:
+                key=cache_key("hatch",layers_key,pidx,step_px,modes,j.join_serpentine,j.travel_order,mm_per_px,j.hatch_engine)
+                cache_path=cache.lookup("hatch",key,".npz") or cache.path(key,".npz")
+            outputs=[(fmt,os.path.join(plot_dirs[fmt],f"{prefix}_{name}_{hx}{PLOT_DIRS[fmt][1]}")) for fmt in plot_fmts]
+            plot_paths.append([path for _,path in outputs])
+            tasks.append((pidx,mm_per_px,step_px,modes,prefix,name,hx,j.pen_mm,j.join_serpentine,j.travel_order,cache_path,j.svg_encoding,(outputs,plot_opts) if outputs else None,min_px,panels))
+        header=svg_header(j.draw_w_mm,draw_h_mm)
+        layer_paths=[os.path.join(svg_dir,f"{prefix}_{name}_{hx}.svg") if j.export_svg_layers else None for prefix,name,hx,_,_ in order]
+        combined_path=os.path.join(svg_dir,"combined.svg")
+        comb_f=open(combined_path,"w",encoding="utf-8",buffering=SVG_BUFFER) if j.export_svg_combined else None
+        try:
+            if comb_f:
+                comb_f.write(header)
+            if j.svg_workers>1 and len(tasks)>1:
+                n_workers=min(j.svg_workers,len(tasks))
+                self.log(f"SVG layers: {n_workers} worker processes")
+                counts=self._svg_layers_parallel(q_arr,index,strip_rows,tasks,layer_paths,header,comb_f,n_workers)
+            else:
+                counts=self._svg_layers_serial(q_arr,index,strip_rows,tasks,layer_paths,header,comb_f)
+            for i,((prefix,name,hx,share,pidx),stat) in enumerate(zip(order,counts)):
+                stats.append((prefix,name,hx)+tuple(stat))
+                if bundle and layer_paths[i]:
+                    bundle.add(layer_paths[i])
+                if bundle:
+                    for path in plot_paths[i]:
+                        bundle.add(path)
+                self.progress(45+int(50*(i+1)/len(order)))
+            if comb_f:
+                comb_f.write(svg_footer())
+        finally:
+            if comb_f:
+                comb_f.close()
+        if j.export_svg_combined:
+            if bundle:
+                bundle.add(combined_path)
+            self.log("Combined SVG: "+combined_path)
+        for fmt in plot_fmts:
+            self.log(f"{fmt}: "+plot_dirs[fmt])
+        prof.end(sp,sum(st[3] for st in stats),layer_paths+[combined_path if j.export_svg_combined else None]+[path for paths in plot_paths for path in paths])
+        if grid:
+            sp=prof.begin("panels")
+            self._assemble_panels(grid,panels_dir,order,plot_fmts,draw_h_mm,bundle)
+            prof.end(sp)
+            self.log("Panels: "+panels_dir)
+        stats_path=os.path.join(svg_dir,"svg_stats.txt")
+        with open(stats_path,"w",encoding="utf-8") as f:
+            for (prefix,name,hx,pc,runs,before,after),(_,_,_,_,pidx) in zip(stats,order):
+                line=f"{prefix}_{name}_{hx}.svg paths={pc}"
+                if j.join_serpentine:
+                    line+=f" runs={runs} pen_lifts={pc}"
+                if j.speckle_filter:
+                    line+=f" {'runs' if j.join_serpentine else 'paths'}_before_filter={runs_before.get(pidx,0)}"
+                if before is not None:
+                    line+=f" travel_before={before:.1f}mm travel_after={after:.1f}mm"
+                f.write(line+"\n")
+        self.log("SVG stats: "+stats_path)
+        if bundle:
+            bundle.add(stats_path)
+            self.progress(97)
+            sp=prof.begin("bundle")
+            bundle.close()
+            prof.end(sp,None,(bundle.path,))
+            self._bundle=None
+            if not bundle.keep_files:
+                for d in (svg_dir,os.path.join(out,"png_layers")):
+                    if os.path.isdir(d) and not os.listdir(d):
+                        os.rmdir(d)
+            self.log("Bundle: "+bundle.path)
+        if cache:
+            sp=prof.begin("cache evict")
+            self.log(cache.summary())
+            cache.evict(t0)
+            cache.close()
+            prof.end(sp)
+        if j.profile:
+            for line in prof.summary():
+                self.log(line)
+            self.log("Profile trace: "+prof.save_trace(os.path.join(out,PROFILE_TRACE)))
+        self.progress(100)
+        self.log(f"Done in {time.time()-t0:.2f}s")
+        return out
+    def _quantize_tiled(self,preview_path,tmp):
+        j=self.job
+        src=TiledSource(j.input_png_path,os.path.join(tmp,"source.npy"))
+        w,h=src.size
+        self.log(f"Image size: {w}×{h}px")
+        rows=tile_rows(w,j.memory_budget_mb)
+        self.log(f"Tiled mode: {j.memory_budget_mb} MB budget, {rows} rows per strip")
+        if not src.direct:
+            self.log(f"Tiled mode: no streaming PNG decode for this file with Pillow {Image.__version__}, the source was decoded in full once")
+        self.progress(5)
+        self.log(f"Quantizing to {j.n_colors} colors ({j.quantize_method}, palette fitted on a sample)…")
+        palette=fit_palette_sample(src,j.n_colors,j.memory_budget_mb,j.quantize_method)
+        to_labels=palette_mapper(palette,j.quantize_method)
+        lut=np.array(palette,dtype=np.uint8)
+        q_arr=np.lib.format.open_memmap(os.path.join(tmp,"labels.npy"),mode="w+",dtype=np.uint8,shape=(h,w))
+        preview=PngStripWriter(preview_path,w,h,"RGB")
+        try:
+            for y0 in range(0,h,rows):
+                if self._stop:
+                    raise RuntimeError("Canceled.")
+                idx=to_labels(src.rows(y0,y0+rows))
+                q_arr[y0:y0+len(idx)]=idx
+                preview.write(lut[idx])
+                release_pages(src.data)
+                release_pages(q_arr)
+                self.progress(5+int(7*min(h,y0+rows)/h))
+        finally:
+            preview.close()
+            src.close()
+        q_arr.flush()
+        return q_arr,palette
+    def _png_layer(self,q_arr,index,palette,pidx,path):
+        if self._stop:
+            raise RuntimeError("Canceled.")
+        j=self.job
+        sp=self.prof.begin("PNG "+os.path.splitext(os.path.basename(path))[0],"layer")
+        h,w=q_arr.shape
+        mask,origin=label_mask(q_arr,index,pidx)
+        save_png_layer(path,mask,origin,png_box(index,pidx,(w,h),j.png_crop),palette[pidx],j.png_mode,j.png_compress)
+        self.prof.end(sp,None,(path,))
+    def _png_ready(self,path,key,cache,bundle):
+        if cache:
+            cache.store(path,key,".png")
+        if bundle:
+            bundle.add(path)
+    def _png_layers_tiled(self,q_arr,index,palette,order,layers_dir,rows,n_workers):
+        j=self.job
+        h,w=q_arr.shape
+        mode="1" if j.png_mode==PNG_MODES[1] else "RGBA"
+        boxes=[png_box(index,pidx,(w,h),j.png_crop) for prefix,name,hx,share,pidx in order]
+        writers=[]
+        try:
+            for (prefix,name,hx,share,pidx),box in zip(order,boxes):
+                writers.append(PngStripWriter(os.path.join(layers_dir,f"{prefix}_{name}_#{hx}.png"),box[2],box[3],mode,j.png_compress,palette[pidx]))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as pool:
+                for y0 in range(0,h,rows):
+                    if self._stop:
+                        raise RuntimeError("Canceled.")
+                    lab=np.asarray(q_arr[y0:y0+rows])
+                    for fut in [pool.submit(png_strip,lab,y0,pidx,palette[pidx],box,wr) for (prefix,name,hx,share,pidx),box,wr in zip(order,boxes,writers)]:
+                        fut.result()
+                    release_pages(q_arr)
+                    self.progress(26+int(18*min(h,y0+rows)/h))
+        finally:
+            for wr in writers:
+                wr.close()
+    def _assemble_panels(self,grid,panels_dir,order,plot_fmts,draw_h_mm,bundle):
+        j=self.job
+        listing=[]
+        for pname,row,col,core,box in grid:
+            folder=os.path.join(panels_dir,pname)
+            header=svg_header(box[2]-box[0],box[3]-box[1])
+            layers=[]
+            for prefix,name,hx,share,pidx in order:
+                fn=f"{prefix}_{name}_{hx}"
+                if os.path.isfile(os.path.join(folder,fn+".svg")):
+                    layers.append(dict({"layer":f"{prefix}_{name}","color":"#"+hx,"svg":fn+".svg"},**{PLOT_DIRS[fmt][0]:fn+PLOT_DIRS[fmt][1] for fmt in plot_fmts}))
+            files=[os.path.join(folder,v) for layer in layers for k,v in layer.items() if k not in ("layer","color")]
+            if layers:
+                combined=os.path.join(folder,"combined.svg")
+                with open(combined,"w",encoding="utf-8",buffering=SVG_BUFFER) as f:
+                    f.write(header)
+                    for layer in layers:
+                        path=os.path.join(folder,layer["svg"])
+                        append_file_range(f,path,len(header.encode("utf-8")),os.path.getsize(path)-len(svg_footer().encode("utf-8")))
+                    f.write(svg_footer())
+                files.append(combined)
+            info={"panel":pname,"row":row,"col":col,"origin_mm":[round(box[0],3),round(box[1],3)],"size_mm":[round(box[2]-box[0],3),round(box[3]-box[1],3)],"core_mm":[round(v,3) for v in core],"overlap_mm":j.panel_overlap_mm,"combined":"combined.svg" if layers else None,"layers":layers}
+            with open(os.path.join(folder,"panel.json"),"w",encoding="utf-8") as f:
+                json.dump(info,f,indent=1)
+            files.append(os.path.join(folder,"panel.json"))
+            listing.append({k:info[k] for k in ("panel","row","col","origin_mm","size_mm","core_mm")})
+            if bundle:
+                for path in files:
+                    bundle.add(path)
+        index_path=os.path.join(panels_dir,"index.json")
+        with open(index_path,"w",encoding="utf-8") as f:
+            json.dump({"drawing_mm":[round(j.draw_w_mm,3),round(draw_h_mm,3)],"panel_mm":[j.panel_w_mm or j.draw_w_mm,j.panel_h_mm or round(draw_h_mm,3)],"overlap_mm":j.panel_overlap_mm,"rows":grid[-1][1],"cols":grid[-1][2],"panels":listing},f,indent=1)
+        if bundle:
+            bundle.add(index_path)
+    def _svg_layers_serial(self,q_arr,index,strip_rows,tasks,layer_paths,header,comb_f):
+        for (pidx,*args),layer_path in zip(tasks,layer_paths):
+            if self._stop:
+                raise RuntimeError("Canceled.")
+            sp=self.prof.begin(f"SVG {args[3]}_{args[4]}","layer")
+            strokes=layer_source(q_arr,index,pidx,strip_rows,self.job.hatch_engine)
+            layer_f=open(layer_path,"w",encoding="utf-8",buffering=SVG_BUFFER) if layer_path else None
+            steps=[]
+            set_step_log(steps)
+            try:
+                if layer_f:
+                    layer_f.write(header)
+                stat=write_svg_layer(svg_tee(layer_f,comb_f),strokes,*args)
+                if layer_f:
+                    layer_f.write(svg_footer())
+            finally:
+                set_step_log(None)
+                if layer_f:
+                    layer_f.close()
+            self.prof.end(sp,stat[0],(layer_path,) if layer_path else ())
+            for name,t,wall,cpu in steps:
+                self.prof.add(name,"step",t,wall,cpu,0)
+            yield stat
+    def _svg_layers_parallel(self,q_arr,index,strip_rows,tasks,layer_paths,header,comb_f,n_workers):
+        tmp=tempfile.mkdtemp(prefix="hatchsmith_")
+        label_path=getattr(q_arr,"filename",None)
+        if label_path is None:
+            label_path=os.path.join(tmp,"labels.npy")
+            np.save(label_path,q_arr)
+        parts=[p if p else os.path.join(tmp,f"layer_{i}.part") for i,p in enumerate(layer_paths)]
+        ctx=multiprocessing.get_context("spawn")
+        stop=ctx.Event()
+        pool=concurrent.futures.ProcessPoolExecutor(max_workers=n_workers,mp_context=ctx,initializer=svg_worker_init,initargs=(stop,))
+        try:
+            futures=[pool.submit(svg_layer_task,label_path,index,strip_rows,self.job.hatch_engine,part,header if p else "",svg_footer() if p else "",*t) for t,p,part in zip(tasks,layer_paths,parts)]
+            for fut,part,t in zip(futures,parts,tasks):
+                while True:
+                    if self._stop:
+                        stop.set()
+                        raise RuntimeError("Canceled.")
+                    try:
+                        stat,start,end,timing,steps=fut.result(timeout=0.2)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        pass
+                self.prof.add(f"SVG {t[4]}_{t[5]}","layer",*timing,paths=stat[0],nbytes=end-start)
+                for name,st,wall,cpu in steps:
+                    self.prof.add(name,"step",st,wall,cpu,0,timing[4])
+                if comb_f:
+                    append_file_range(comb_f,part,start,end)
+                yield stat
+        finally:
+            stop.set()
+            pool.shutdown(wait=True,cancel_futures=True)
+            shutil.rmtree(tmp,ignore_errors=True)
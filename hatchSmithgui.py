@@ -0,0 +1,991 @@
+"""HatchSmith desktop GUI (PySide6): preview, export settings and a queue of background export workers. © FIWAtec GmbH"""
+import os,traceback,time,struct,functools,concurrent.futures
+from PySide6.QtCore import Qt,QThread,Signal,QObject,QSettings,QSize,QTimer,QByteArray,QDataStream,QIODevice
+from PySide6.QtGui import QAction,QKeySequence,QPixmap,QImage,QPalette,QColor,QFont,QPainter,QPainterPath,QPen
+from PySide6.QtWidgets import QApplication,QMainWindow,QWidget,QVBoxLayout,QHBoxLayout,QFormLayout,QLabel,QPlainTextEdit,QPushButton,QSpinBox,QDoubleSpinBox,QCheckBox,QComboBox,QLineEdit,QFileDialog,QMessageBox,QProgressBar,QSplitter,QGroupBox,QGraphicsView,QGraphicsScene,QGraphicsPixmapItem,QGraphicsPathItem,QTableWidget,QTableWidgetItem,QHeaderView,QAbstractItemView
+import numpy as np
+from hatchSmithcore import Cfg,ExportJob,Exporter,TRAVEL_MODES,ANGLE_SETS,QUANTIZE_METHODS,PNG_MODES,BUNDLE_MODES,SVG_ENCODINGS,HATCH_ENGINES,script_dir,safe_mkdir,quantize_image_rgb,label_index,layer_source,layer_hatch_params,speckle_params,clean_labels,hsv_v,rgb_to_hex,load_pyramid
+class Worker(QObject):
+    log=Signal(int,str)
+    progress=Signal(int,int)
+    done=Signal(int,str)
+    failed=Signal(int,str)
+    def __init__(self,job,jid=0):
+        super().__init__()
+        self.job=job
+        self.jid=jid
+        self.canceled=False
+        self.exporter=Exporter(job,lambda msg:self.log.emit(self.jid,msg),lambda value:self.progress.emit(self.jid,value))
+    def stop(self):
+        self.canceled=True
+        self.exporter.stop()
+    def run(self):
+        try:
+            self.done.emit(self.jid,self.exporter.run())
+        except Exception as e:
+            self.failed.emit(self.jid,"Canceled." if self.canceled else str(e)+"\n\n"+traceback.format_exc())
+JOB_FINAL=("Done","Failed","Canceled")
+class JobQueue(QObject):
+    log=Signal(int,str)
+    progress=Signal(int,int)
+    state=Signal(int,str,str)
+    def __init__(self,max_jobs=1):
+        super().__init__()
+        self.max_jobs=max(1,int(max_jobs))
+        self.jobs={}
+        self.pending=[]
+        self.active={}
+        self.next_id=1
+    def submit(self,job):
+        jid=self.next_id
+        self.next_id+=1
+        self.jobs[jid]=job
+        self.pending.append(jid)
+        self.state.emit(jid,"Queued","")
+        self._pump()
+        return jid
+    def busy(self):
+        return bool(self.pending or self.active)
+    def set_max_jobs(self,n):
+        self.max_jobs=max(1,int(n))
+        self._pump()
+    def cancel(self,jid):
+        if jid in self.pending:
+            self.pending.remove(jid)
+            self.jobs.pop(jid,None)
+            self.state.emit(jid,"Canceled","")
+        elif jid in self.active and not self.active[jid][1].canceled:
+            self.active[jid][1].stop()
+            self.state.emit(jid,"Canceling…","")
+    def cancel_all(self):
+        for jid in list(self.pending)+list(self.active):
+            self.cancel(jid)
+    def shutdown(self):
+        self.pending=[]
+        for thread,worker in list(self.active.values()):
+            worker.stop()
+        for thread,worker in list(self.active.values()):
+            thread.quit()
+            thread.wait()
+        self.active={}
+    def _pump(self):
+        while self.pending and len(self.active)<self.max_jobs:
+            jid=self.pending.pop(0)
+            thread=QThread()
+            worker=Worker(self.jobs.pop(jid),jid)
+            worker.moveToThread(thread)
+            thread.started.connect(worker.run)
+            worker.log.connect(self.log)
+            worker.progress.connect(self.progress)
+            worker.done.connect(self._on_done)
+            worker.failed.connect(self._on_failed)
+            self.active[jid]=(thread,worker)
+            self.state.emit(jid,"Running","")
+            thread.start()
+    def _finish(self,jid,state,detail):
+        thread,worker=self.active.pop(jid)
+        thread.quit()
+        thread.wait()
+        self.state.emit(jid,state,detail)
+        self._pump()
+    def _on_done(self,jid,out_dir):
+        if jid in self.active:
+            self._finish(jid,"Done",out_dir)
+    def _on_failed(self,jid,err):
+        if jid in self.active:
+            self._finish(jid,"Canceled" if self.active[jid][1].canceled else "Failed",err)
+def path_elements(tables):
+    e=np.empty(sum(len(t[0]) for t in tables),np.dtype([("t",">i4"),("x",">f8"),("y",">f8")]))
+    e["t"]=1
+    i=0
+    for xs,ys,offs,_ in tables:
+        n=len(xs)
+        e["t"][i+np.asarray(offs[:-1],np.int64)]=0
+        e["x"][i:i+n]=xs
+        e["y"][i:i+n]=ys
+        i+=n
+    return e
+def streamed_path(e):
+    data=QByteArray(struct.pack(">i",len(e))+e.tobytes()+struct.pack(">ii",0,0))
+    path=QPainterPath()
+    QDataStream(data,QIODevice.ReadOnly)>>path
+    return path
+def drawn_path(e):
+    path=QPainterPath()
+    for t,x,y in e.tolist():
+        if t:
+            path.lineTo(x,y)
+        else:
+            path.moveTo(x,y)
+    return path
+def path_points(path):
+    return [(p.type.value if hasattr(p.type,"value") else int(p.type),p.x,p.y) for p in (path.elementAt(i) for i in range(path.elementCount()))]
+@functools.lru_cache(maxsize=1)
+def streamed_path_ok():
+    e=path_elements([(np.array([0.5,1.0,3.0,5.0,7.25]),np.array([0.0,2.0,-4.0,6.0,8.0]),np.array([0,3,5]),2)])
+    return path_points(streamed_path(e))==path_points(drawn_path(e))
+def strokes_path(tables):
+    e=path_elements(tables)
+    return streamed_path(e) if streamed_path_ok() else drawn_path(e)
+class PreviewWorker(QObject):
+    ready=Signal(int,object,float)
+    failed=Signal(str)
+    def __init__(self):
+        super().__init__()
+        self.generation=0
+        self.pool=concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.labels_key=None
+        self.labels=None
+        self.raw=None
+        self.paths={}
+    def request(self,img,img_key,job):
+        self.generation+=1
+        self.pool.submit(self._run,self.generation,img,img_key,job)
+        return self.generation
+    def cancel(self):
+        self.generation+=1
+    def shutdown(self):
+        self.cancel()
+        self.pool.shutdown(wait=True)
+    def _run(self,gen,img,img_key,job):
+        try:
+            t0=time.perf_counter()
+            key=(img_key,job.n_colors,job.quantize_method)
+            if key!=self.labels_key:
+                _,q_arr,palette,_=quantize_image_rgb(img,job.n_colors,job.quantize_method)
+                self.raw=(q_arr,palette)
+                self.labels_key=key
+                self.labels=None
+            q_arr,palette=self.raw
+            mm_per_px=job.draw_w_mm/float(q_arr.shape[1])
+            clean=speckle_params(job.pen_mm,mm_per_px,job.speckle_min_area_mm2,job.min_segment_mm) if job.speckle_filter else None
+            if self.labels is None or self.labels[3]!=clean:
+                if clean:
+                    q_arr=q_arr.copy()
+                    clean_labels(self.raw[0],q_arr,*clean[:2])
+                self.labels=(q_arr,palette,label_index(q_arr,len(palette)),clean)
+                self.paths={}
+            q_arr,palette,index,_=self.labels
+            min_px=clean[2] if clean else 0.0
+            layers=[]
+            paths={}
+            for pidx in sorted(range(len(palette)),key=lambda i:hsv_v(*palette[i])[0]):
+                if gen!=self.generation:
+                    return
+                if index[pidx] is None:
+                    continue
+                step_px,modes=layer_hatch_params(palette[pidx],job,mm_per_px)
+                k=(pidx,step_px,tuple(modes),job.join_serpentine,min_px,job.hatch_engine)
+                path=self.paths.get(k)
+                if path is None:
+                    strokes=layer_source(q_arr,index,pidx,0,job.hatch_engine)
+                    tables=[t for t in strokes(step_px,modes,join=job.join_serpentine,min_px=min_px) if t[3]]
+                    path=strokes_path(tables or list(strokes(1,["h"],join=job.join_serpentine,min_px=min_px)))
+                paths[k]=path
+                layers.append((k,path,rgb_to_hex(*palette[pidx]),job.pen_mm/mm_per_px))
+            self.paths=paths
+            if gen==self.generation:
+                self.ready.emit(gen,layers,(time.perf_counter()-t0)*1000.0)
+        except Exception as e:
+            self.failed.emit(str(e))
+def rgba_qimage(arr):
+    h,w=arr.shape[:2]
+    return QImage(arr.data,w,h,w*4,QImage.Format_RGBA8888).copy()
+class ImageLoader(QObject):
+    loaded=Signal(int,object,object)
+    tile_ready=Signal(int,object,object)
+    failed=Signal(int,str)
+    def __init__(self):
+        super().__init__()
+        self.generation=0
+        self.wanted=set()
+        self.pool=concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    def load(self,path):
+        self.generation+=1
+        self.wanted=set()
+        self.pool.submit(self._load,self.generation,path)
+        return self.generation
+    def request_tiles(self,pyramid,want,new):
+        self.wanted=set(want)
+        for key in new:
+            self.pool.submit(self._tile,self.generation,pyramid,key)
+    def shutdown(self):
+        self.generation+=1
+        self.wanted=set()
+        self.pool.shutdown(wait=True)
+    def _load(self,gen,path):
+        try:
+            pyramid=load_pyramid(path)
+            if gen==self.generation:
+                self.loaded.emit(gen,pyramid.preview(),pyramid)
+        except Exception as e:
+            self.failed.emit(gen,str(e))
+    def _tile(self,gen,pyramid,key):
+        if gen!=self.generation or key not in self.wanted:
+            return
+        try:
+            self.tile_ready.emit(gen,key,rgba_qimage(pyramid.tile_rgba(*key)))
+        except Exception as e:
+            self.failed.emit(gen,str(e))
+class ZoomView(QGraphicsView):
+    TILE_CACHE=96
+    def __init__(self):
+        super().__init__()
+        self.setRenderHints(self.renderHints()|QPainter.Antialiasing|QPainter.SmoothPixmapTransform)
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self._scale=1.0
+        self.loader=None
+        self.pyramid=None
+        self.base=None
+        self.src_scale=1.0
+        self.tiles={}
+        self.pending=set()
+        self.tile_timer=QTimer(self)
+        self.tile_timer.setSingleShot(True)
+        self.tile_timer.setInterval(60)
+        self.tile_timer.timeout.connect(self.update_tiles)
+    def set_pyramid(self,loader,pyramid,base,src_scale):
+        self.clear_tiles()
+        self.loader=loader
+        self.pyramid=pyramid
+        self.base=base
+        self.src_scale=src_scale
+        self.tile_timer.start()
+    def clear_tiles(self):
+        for item in self.tiles.values():
+            self.scene().removeItem(item)
+        self.tiles={}
+        self.pending=set()
+        self.pyramid=None
+    def wheelEvent(self,event):
+        delta=event.angleDelta().y()
+        factor=1.15 if delta>0 else 1/1.15
+        self._scale*=factor
+        self.scale(factor,factor)
+        self.tile_timer.start()
+    def scrollContentsBy(self,dx,dy):
+        super().scrollContentsBy(dx,dy)
+        self.tile_timer.start()
+    def resizeEvent(self,event):
+        super().resizeEvent(event)
+        self.tile_timer.start()
+    def update_tiles(self):
+        if self.pyramid is None:
+            return
+        level=self.pyramid.level_for(self.transform().m11()*self.src_scale)
+        want=[]
+        if (1<<level)*self.src_scale<1.0:
+            r=self.mapToScene(self.viewport().rect()).boundingRect()
+            s=self.src_scale
+            want=[(level,tx,ty) for tx,ty in self.pyramid.tiles(level,r.left()/s,r.top()/s,r.right()/s,r.bottom()/s)]
+        self.pending&=set(want)
+        new=[k for k in want if k not in self.tiles and k not in self.pending]
+        self.pending.update(new)
+        self.loader.request_tiles(self.pyramid,want,new)
+        keep=set(want)
+        for k in [k for k in self.tiles if k not in keep][:max(0,len(self.tiles)-self.TILE_CACHE)]:
+            self.scene().removeItem(self.tiles.pop(k))
+    def add_tile(self,gen,key,qimg):
+        if self.pyramid is None or gen!=self.loader.generation or key in self.tiles:
+            return
+        self.pending.discard(key)
+        level,tx,ty=key
+        f=(1<<level)*self.src_scale
+        t=self.pyramid.tile*f
+        item=QGraphicsPixmapItem(QPixmap.fromImage(qimg),self.base)
+        item.setTransformationMode(Qt.SmoothTransformation)
+        item.setPos(tx*t,ty*t)
+        item.setScale(f)
+        item.setZValue(-level)
+        self.tiles[key]=item
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.settings=QSettings(Cfg.ORG,Cfg.APP)
+        self.queue=JobQueue(int(self.settings.value("export_jobs",1)))
+        self.queue.log.connect(lambda jid,msg:self._append_log(f"[#{jid}] {msg}"))
+        self.queue.progress.connect(self._on_job_progress)
+        self.queue.state.connect(self._on_job_state)
+        self.batch={}
+        self.input_path=""
+        self.scene=QGraphicsScene()
+        self.pixitem=QGraphicsPixmapItem()
+        self.scene.addItem(self.pixitem)
+        self.preview_img=None
+        self.preview_key=0
+        self.overlay={}
+        self.preview=PreviewWorker()
+        self.preview.ready.connect(self._on_preview_ready)
+        self.preview.failed.connect(lambda err:self._append_log("Hatch preview failed: "+err))
+        self.preview_timer=QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(120)
+        self.preview_timer.timeout.connect(self._start_preview)
+        self._build_ui()
+        self.loader=ImageLoader()
+        self.loader.loaded.connect(self._on_image_loaded)
+        self.loader.tile_ready.connect(self.view.add_tile)
+        self.loader.failed.connect(self._on_image_failed)
+        self._apply_dark_theme()
+        self._restore_state()
+        QTimer.singleShot(50,self._enter_fullscreen_if_needed)
+    def _build_ui(self):
+        self.setWindowTitle("HatchSmith")
+        self.setMinimumSize(QSize(1280,720))
+        cw=QWidget()
+        self.setCentralWidget(cw)
+        root=QVBoxLayout(cw)
+        root.setContentsMargins(12,12,12,12)
+        root.setSpacing(10)
+        top=QHBoxLayout()
+        self.lbl_file=QLabel("No file loaded")
+        self.lbl_file.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.btn_open=QPushButton("Open PNG…")
+        self.btn_open.clicked.connect(self.on_open)
+        self.btn_export=QPushButton("Export")
+        self.btn_export.clicked.connect(self.on_export)
+        self.btn_export.setEnabled(False)
+        self.btn_cancel=QPushButton("Cancel")
+        self.btn_cancel.clicked.connect(self.on_cancel)
+        self.btn_cancel.setEnabled(False)
+        top.addWidget(self.lbl_file,1)
+        top.addWidget(self.btn_open)
+        top.addWidget(self.btn_export)
+        top.addWidget(self.btn_cancel)
+        root.addLayout(top)
+        split=QSplitter(Qt.Horizontal)
+        root.addWidget(split,1)
+        left=QWidget()
+        left_l=QVBoxLayout(left)
+        left_l.setContentsMargins(0,0,0,0)
+        left_l.setSpacing(10)
+        preview_box=QGroupBox("Preview")
+        pb=QVBoxLayout(preview_box)
+        ph=QHBoxLayout()
+        self.cb_overlay=QCheckBox("Hatch preview")
+        self.cb_overlay.setChecked(bool(int(self.settings.value("hatch_preview","0"))))
+        self.lbl_overlay=QLabel("")
+        ph.addWidget(self.cb_overlay)
+        ph.addWidget(self.lbl_overlay,1)
+        pb.addLayout(ph)
+        self.view=ZoomView()
+        self.view.setScene(self.scene)
+        pb.addWidget(self.view)
+        left_l.addWidget(preview_box,3)
+        queue_box=QGroupBox("Export Queue")
+        qb=QVBoxLayout(queue_box)
+        qh=QHBoxLayout()
+        self.sp_jobs=QSpinBox()
+        self.sp_jobs.setRange(1,max(1,os.cpu_count() or 1))
+        self.sp_jobs.setValue(self.queue.max_jobs)
+        self.sp_jobs.valueChanged.connect(self.queue.set_max_jobs)
+        self.btn_clear_jobs=QPushButton("Clear finished")
+        self.btn_clear_jobs.clicked.connect(self.on_clear_jobs)
+        qh.addWidget(QLabel("Parallel exports"))
+        qh.addWidget(self.sp_jobs)
+        qh.addStretch(1)
+        qh.addWidget(self.btn_clear_jobs)
+        qb.addLayout(qh)
+        self.jobs=QTableWidget(0,5)
+        self.jobs.setHorizontalHeaderLabels(["#","Input","Status","Progress",""])
+        self.jobs.verticalHeader().setVisible(False)
+        self.jobs.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.jobs.setSelectionMode(QAbstractItemView.NoSelection)
+        self.jobs.horizontalHeader().setSectionResizeMode(1,QHeaderView.Stretch)
+        qb.addWidget(self.jobs)
+        left_l.addWidget(queue_box,1)
+        log_box=QGroupBox("Activity")
+        lb=QVBoxLayout(log_box)
+        self.log=QPlainTextEdit()
+        self.log.setReadOnly(True)
+        self.log.setMaximumBlockCount(4000)
+        lb.addWidget(self.log)
+        self.progress=QProgressBar()
+        self.progress.setRange(0,100)
+        self.progress.setValue(0)
+        lb.addWidget(self.progress)
+        left_l.addWidget(log_box,2)
+        split.addWidget(left)
+        right=QWidget()
+        right_l=QVBoxLayout(right)
+        right_l.setContentsMargins(0,0,0,0)
+        right_l.setSpacing(10)
+        settings_box=QGroupBox("Export Settings")
+        form=QFormLayout(settings_box)
+        self.sp_colors=QSpinBox()
+        self.sp_colors.setRange(Cfg.MIN_COLORS,Cfg.MAX_COLORS)
+        self.sp_colors.setValue(int(self.settings.value("n_colors",Cfg.DEFAULT_COLORS)))
+        self.cmb_quant=QComboBox()
+        self.cmb_quant.addItems(QUANTIZE_METHODS)
+        self.cmb_quant.setCurrentText(self.settings.value("quantize_method",QUANTIZE_METHODS[0]))
+        self.sp_pen=QDoubleSpinBox()
+        self.sp_pen.setRange(0.1,10.0)
+        self.sp_pen.setSingleStep(0.1)
+        self.sp_pen.setValue(float(self.settings.value("pen_mm",Cfg.DEFAULT_PEN_MM)))
+        self.sp_w=QDoubleSpinBox()
+        self.sp_w.setRange(50.0,20000.0)
+        self.sp_w.setSingleStep(10.0)
+        self.sp_w.setValue(float(self.settings.value("draw_w_mm",Cfg.DEFAULT_DRAW_W_MM)))
+        self.sp_h=QDoubleSpinBox()
+        self.sp_h.setRange(0.0,20000.0)
+        self.sp_h.setSingleStep(10.0)
+        self.sp_h.setValue(float(self.settings.value("draw_h_mm",0.0)))
+        self.cb_keep=QCheckBox("Keep aspect ratio")
+        self.cb_keep.setChecked(bool(int(self.settings.value("keep_aspect","1"))))
+        self.cb_cross=QCheckBox("Crosshatch for dark areas")
+        self.cb_cross.setChecked(bool(int(self.settings.value("crosshatch","1"))))
+        self.cmb_angles=QComboBox()
+        self.cmb_angles.addItems(ANGLE_SETS)
+        self.cmb_angles.setCurrentText(self.settings.value("angle_set",Cfg.DEFAULT_ANGLE_SET))
+        self.sp_angle=QDoubleSpinBox()
+        self.sp_angle.setRange(-90.0,90.0)
+        self.sp_angle.setSingleStep(5.0)
+        self.sp_angle.setSuffix("°")
+        self.sp_angle.setValue(float(self.settings.value("hatch_angle",Cfg.DEFAULT_HATCH_ANGLE)))
+        self.sp_angle.setEnabled(self.cmb_angles.currentText()=="Custom angle")
+        self.cmb_angles.currentTextChanged.connect(lambda t:self.sp_angle.setEnabled(t=="Custom angle"))
+        self.cmb_engine=QComboBox()
+        self.cmb_engine.addItems(HATCH_ENGINES)
+        self.cmb_engine.setCurrentText(self.settings.value("hatch_engine",HATCH_ENGINES[0]))
+        self.cb_speckle=QCheckBox("Remove speckles and strokes shorter than the pen")
+        self.cb_speckle.setChecked(bool(int(self.settings.value("speckle_filter","0"))))
+        self.sp_min_area=QDoubleSpinBox()
+        self.sp_min_area.setRange(0.0,10000.0)
+        self.sp_min_area.setSingleStep(1.0)
+        self.sp_min_area.setSuffix(" mm²")
+        self.sp_min_area.setSpecialValueText("Auto")
+        self.sp_min_area.setValue(float(self.settings.value("speckle_min_area_mm2",0.0)))
+        self.sp_min_seg=QDoubleSpinBox()
+        self.sp_min_seg.setRange(0.0,100.0)
+        self.sp_min_seg.setSingleStep(0.1)
+        self.sp_min_seg.setSuffix(" mm")
+        self.sp_min_seg.setSpecialValueText("Auto")
+        self.sp_min_seg.setValue(float(self.settings.value("min_segment_mm",0.0)))
+        for wid in (self.sp_min_area,self.sp_min_seg):
+            wid.setEnabled(self.cb_speckle.isChecked())
+            self.cb_speckle.toggled.connect(wid.setEnabled)
+        self.cb_user=QCheckBox("Use custom label/order list (must match color count)")
+        self.cb_user.setChecked(bool(int(self.settings.value("use_user_order","0"))))
+        self.cb_png=QCheckBox("Export PNG layers")
+        self.cb_png.setChecked(bool(int(self.settings.value("export_png","1"))))
+        self.cb_png_crop=QCheckBox("Crop PNG layers to content")
+        self.cb_png_crop.setChecked(bool(int(self.settings.value("png_crop","0"))))
+        self.cmb_png_mode=QComboBox()
+        self.cmb_png_mode.addItems(PNG_MODES)
+        self.cmb_png_mode.setCurrentText(self.settings.value("png_mode",PNG_MODES[0]))
+        self.sp_png_compress=QSpinBox()
+        self.sp_png_compress.setRange(0,9)
+        self.sp_png_compress.setValue(int(self.settings.value("png_compress",Cfg.DEFAULT_PNG_COMPRESS)))
+        for wid in (self.cb_png_crop,self.cmb_png_mode,self.sp_png_compress):
+            wid.setEnabled(self.cb_png.isChecked())
+            self.cb_png.toggled.connect(wid.setEnabled)
+        self.cb_svg=QCheckBox("Export SVG per layer")
+        self.cb_svg.setChecked(bool(int(self.settings.value("export_svg_layers","1"))))
+        self.cb_join=QCheckBox("Join hatch lines into zig-zag polylines")
+        self.cb_join.setChecked(bool(int(self.settings.value("join_serpentine","0"))))
+        self.cmb_travel=QComboBox()
+        self.cmb_travel.addItems(TRAVEL_MODES)
+        self.cmb_travel.setCurrentText(self.settings.value("travel_order",TRAVEL_MODES[0]))
+        self.cb_comb=QCheckBox("Export combined SVG")
+        self.cb_comb.setChecked(bool(int(self.settings.value("export_svg_combined","1"))))
+        self.sp_workers=QSpinBox()
+        self.sp_workers.setRange(1,max(1,os.cpu_count() or 1))
+        self.sp_workers.setValue(int(self.settings.value("svg_workers",Cfg.DEFAULT_SVG_WORKERS)))
+        self.sp_budget=QSpinBox()
+        self.sp_budget.setRange(0,65536)
+        self.sp_budget.setSingleStep(256)
+        self.sp_budget.setSuffix(" MB")
+        self.sp_budget.setSpecialValueText("Off")
+        self.sp_budget.setValue(int(self.settings.value("memory_budget_mb",Cfg.DEFAULT_MEMORY_BUDGET_MB)))
+        self.sp_cache=QSpinBox()
+        self.sp_cache.setRange(0,262144)
+        self.sp_cache.setSingleStep(512)
+        self.sp_cache.setSuffix(" MB")
+        self.sp_cache.setSpecialValueText("Off")
+        self.sp_cache.setValue(int(self.settings.value("result_cache_mb",Cfg.DEFAULT_CACHE_MB)))
+        self.sp_cache.setToolTip("Keeps each export's labels (1 byte per source pixel), PNG layers and strokes in the per-user cache, up to this size")
+        self.cb_profile=QCheckBox("Profile stages (log table + trace file)")
+        self.cb_profile.setChecked(bool(int(self.settings.value("profile","0"))))
+        self.cmb_svg_enc=QComboBox()
+        self.cmb_svg_enc.addItems(SVG_ENCODINGS)
+        self.cmb_svg_enc.setCurrentText(self.settings.value("svg_encoding",SVG_ENCODINGS[0]))
+        self.sp_panel_w=QDoubleSpinBox()
+        self.sp_panel_h=QDoubleSpinBox()
+        for sp,key in ((self.sp_panel_w,"panel_w_mm"),(self.sp_panel_h,"panel_h_mm")):
+            sp.setRange(0.0,20000.0)
+            sp.setSingleStep(10.0)
+            sp.setSuffix(" mm")
+            sp.setSpecialValueText("Full")
+            sp.setValue(float(self.settings.value(key,0.0)))
+        self.sp_panel_overlap=QDoubleSpinBox()
+        self.sp_panel_overlap.setRange(0.0,1000.0)
+        self.sp_panel_overlap.setSingleStep(1.0)
+        self.sp_panel_overlap.setSuffix(" mm")
+        self.sp_panel_overlap.setValue(float(self.settings.value("panel_overlap_mm",0.0)))
+        panel_row=QHBoxLayout()
+        panel_row.addWidget(self.sp_panel_w)
+        panel_row.addWidget(QLabel("×"))
+        panel_row.addWidget(self.sp_panel_h)
+        panel_row.addWidget(QLabel("overlap"))
+        panel_row.addWidget(self.sp_panel_overlap)
+        self.cb_gcode=QCheckBox("Export G-code per layer")
+        self.cb_gcode.setChecked(bool(int(self.settings.value("export_gcode","0"))))
+        self.cb_hpgl=QCheckBox("Export HPGL per layer")
+        self.cb_hpgl.setChecked(bool(int(self.settings.value("export_hpgl","0"))))
+        self.cb_segments=QCheckBox("Export segment arrays (.npy) per layer")
+        self.cb_segments.setChecked(bool(int(self.settings.value("export_segments","0"))))
+        self.ed_pen_up=QLineEdit(self.settings.value("pen_up",Cfg.DEFAULT_PEN_UP))
+        self.ed_pen_down=QLineEdit(self.settings.value("pen_down",Cfg.DEFAULT_PEN_DOWN))
+        self.sp_feed=QDoubleSpinBox()
+        self.sp_feed.setRange(0.0,100000.0)
+        self.sp_feed.setDecimals(0)
+        self.sp_feed.setSingleStep(100.0)
+        self.sp_feed.setSuffix(" mm/min")
+        self.sp_feed.setValue(float(self.settings.value("feed_draw",Cfg.DEFAULT_FEED)))
+        self.sp_travel_feed=QDoubleSpinBox()
+        self.sp_travel_feed.setRange(0.0,100000.0)
+        self.sp_travel_feed.setDecimals(0)
+        self.sp_travel_feed.setSingleStep(100.0)
+        self.sp_travel_feed.setSuffix(" mm/min")
+        self.sp_travel_feed.setValue(float(self.settings.value("feed_travel",Cfg.DEFAULT_TRAVEL_FEED)))
+        for wid in (self.ed_pen_up,self.ed_pen_down,self.sp_travel_feed):
+            wid.setEnabled(self.cb_gcode.isChecked())
+            self.cb_gcode.toggled.connect(wid.setEnabled)
+        self.sp_feed.setEnabled(self.cb_gcode.isChecked() or self.cb_hpgl.isChecked())
+        for cb in (self.cb_gcode,self.cb_hpgl):
+            cb.toggled.connect(lambda _:self.sp_feed.setEnabled(self.cb_gcode.isChecked() or self.cb_hpgl.isChecked()))
+        self.cmb_bundle=QComboBox()
+        self.cmb_bundle.addItems(BUNDLE_MODES)
+        self.cmb_bundle.setCurrentText(self.settings.value("bundle",BUNDLE_MODES[0]))
+        self.cmb_out=QComboBox()
+        self.cmb_out.addItems(["Export to app folder","Choose export folder…"])
+        self.cmb_out.setCurrentIndex(int(self.settings.value("export_dir_mode","0")))
+        form.addRow("Colors",self.sp_colors)
+        form.addRow("Quantization",self.cmb_quant)
+        form.addRow("Pen width (mm)",self.sp_pen)
+        form.addRow("Target width (mm)",self.sp_w)
+        form.addRow("Target height (mm)",self.sp_h)
+        form.addRow("",self.cb_keep)
+        form.addRow("Hatching",self.cmb_angles)
+        form.addRow("Hatch angle",self.sp_angle)
+        form.addRow("",self.cb_cross)
+        form.addRow("Hatch engine",self.cmb_engine)
+        form.addRow("",self.cb_join)
+        form.addRow("Pen travel",self.cmb_travel)
+        form.addRow("",self.cb_speckle)
+        form.addRow("Min. region",self.sp_min_area)
+        form.addRow("Min. stroke",self.sp_min_seg)
+        form.addRow("",self.cb_user)
+        form.addRow("",self.cb_png)
+        form.addRow("",self.cb_png_crop)
+        form.addRow("PNG format",self.cmb_png_mode)
+        form.addRow("PNG compression",self.sp_png_compress)
+        form.addRow("",self.cb_svg)
+        form.addRow("",self.cb_comb)
+        form.addRow("SVG paths",self.cmb_svg_enc)
+        form.addRow("Panels",panel_row)
+        form.addRow("",self.cb_gcode)
+        form.addRow("",self.cb_hpgl)
+        form.addRow("",self.cb_segments)
+        form.addRow("Pen up",self.ed_pen_up)
+        form.addRow("Pen down",self.ed_pen_down)
+        form.addRow("Draw feed",self.sp_feed)
+        form.addRow("Travel feed",self.sp_travel_feed)
+        form.addRow("SVG workers",self.sp_workers)
+        form.addRow("Memory budget",self.sp_budget)
+        form.addRow("Result cache",self.sp_cache)
+        form.addRow("",self.cb_profile)
+        form.addRow("Bundle",self.cmb_bundle)
+        form.addRow("Output",self.cmb_out)
+        right_l.addWidget(settings_box)
+        labels_box=QGroupBox("Optional: Label/Order List")
+        vb=QVBoxLayout(labels_box)
+        self.labels=QPlainTextEdit()
+        self.labels.setPlaceholderText("Example:\n01 - hell_tuerkis_2 (#93DBE9) Anteil 11.41%\n02 - hell_beige (#F8F8CA) Anteil 9.53%\n…")
+        self.labels.setPlainText(self.settings.value("labels_text",""))
+        vb.addWidget(self.labels,1)
+        right_l.addWidget(labels_box,2)
+        note_box=QGroupBox("Notes")
+        nb=QVBoxLayout(note_box)
+        self.note=QLabel("Plotters follow strokes, not fills. This tool generates hatch strokes to visually fill areas.\nSet the real target size and pen width for correct hatch density.")
+        self.note.setWordWrap(True)
+        nb.addWidget(self.note)
+        right_l.addWidget(note_box)
+        split.addWidget(right)
+        split.setSizes([720,520])
+        for sig in (self.sp_colors.valueChanged,self.cmb_quant.currentTextChanged,self.sp_pen.valueChanged,self.sp_w.valueChanged,self.cmb_angles.currentTextChanged,self.sp_angle.valueChanged,self.cb_cross.toggled,self.cb_join.toggled,self.cmb_engine.currentTextChanged,self.cb_speckle.toggled,self.sp_min_area.valueChanged,self.sp_min_seg.valueChanged,self.cb_overlay.toggled):
+            sig.connect(self._schedule_preview)
+        self._build_menu()
+    def _build_menu(self):
+        menubar=self.menuBar()
+        m_file=menubar.addMenu("File")
+        a_open=QAction("Open…",self)
+        a_open.setShortcut(QKeySequence.Open)
+        a_open.triggered.connect(self.on_open)
+        a_export=QAction("Export…",self)
+        a_export.setShortcut(QKeySequence("Ctrl+E"))
+        a_export.triggered.connect(self.on_export)
+        a_quit=QAction("Quit",self)
+        a_quit.setShortcut(QKeySequence.Quit)
+        a_quit.triggered.connect(self.close)
+        m_file.addAction(a_open)
+        m_file.addAction(a_export)
+        m_file.addSeparator()
+        m_file.addAction(a_quit)
+        m_edit=menubar.addMenu("Edit")
+        a_copy=QAction("Copy Activity Log",self)
+        a_copy.setShortcut(QKeySequence.Copy)
+        a_copy.triggered.connect(self.on_copy_log)
+        a_clear=QAction("Clear Activity Log",self)
+        a_clear.setShortcut(QKeySequence("Ctrl+L"))
+        a_clear.triggered.connect(lambda:self.log.setPlainText(""))
+        m_edit.addAction(a_copy)
+        m_edit.addAction(a_clear)
+        m_view=menubar.addMenu("View")
+        a_full=QAction("Toggle Fullscreen",self)
+        a_full.setShortcut(QKeySequence("F11"))
+        a_full.triggered.connect(self.toggle_fullscreen)
+        m_view.addAction(a_full)
+        m_help=menubar.addMenu("Help")
+        a_guide=QAction("Guide",self)
+        a_guide.triggered.connect(self.show_guide)
+        a_about=QAction("About HatchSmith",self)
+        a_about.triggered.connect(self.show_about)
+        m_help.addAction(a_guide)
+        m_help.addAction(a_about)
+    def _apply_dark_theme(self):
+        app=QApplication.instance()
+        pal=QPalette()
+        pal.setColor(QPalette.Window,QColor(18,18,20))
+        pal.setColor(QPalette.WindowText,QColor(235,235,240))
+        pal.setColor(QPalette.Base,QColor(24,24,28))
+        pal.setColor(QPalette.AlternateBase,QColor(30,30,34))
+        pal.setColor(QPalette.ToolTipBase,QColor(30,30,34))
+        pal.setColor(QPalette.ToolTipText,QColor(240,240,240))
+        pal.setColor(QPalette.Text,QColor(235,235,240))
+        pal.setColor(QPalette.Button,QColor(30,30,34))
+        pal.setColor(QPalette.ButtonText,QColor(235,235,240))
+        pal.setColor(QPalette.BrightText,QColor(255,80,80))
+        pal.setColor(QPalette.Highlight,QColor(68,132,255))
+        pal.setColor(QPalette.HighlightedText,QColor(10,10,10))
+        app.setPalette(pal)
+        app.setFont(QFont("Segoe UI",10))
+        self.setStyleSheet("QGroupBox{border:1px solid rgba(255,255,255,0.08);border-radius:14px;margin-top:8px;padding:10px;}QGroupBox::title{subcontrol-origin: margin;left:10px;padding:0 6px 0 6px;color:rgba(255,255,255,0.75);}QPushButton{border-radius:12px;padding:10px 14px;background:rgba(255,255,255,0.06);}QPushButton:hover{background:rgba(255,255,255,0.10);}QPushButton:pressed{background:rgba(255,255,255,0.14);}QPlainTextEdit{border-radius:12px;padding:10px;background:rgba(255,255,255,0.04);border:1px solid rgba(255,255,255,0.08);}QProgressBar{border-radius:12px;background:rgba(255,255,255,0.04);border:1px solid rgba(255,255,255,0.08);text-align:center;}QProgressBar::chunk{border-radius:12px;background:rgba(68,132,255,0.65);}")
+        self.menuBar().setStyleSheet("""QMenuBar{background:rgba(18,18,20,1);color:rgba(245,245,248,1);}QMenuBar::item{background:transparent;color:rgba(245,245,248,1);padding:6px 10px;}QMenuBar::item:selected{background:rgba(255,255,255,0.10);border-radius:8px;}QMenu{background:rgba(24,24,28,1);color:rgba(245,245,248,1);border:1px solid rgba(255,255,255,0.10);}QMenu::item{padding:8px 18px;color:rgba(245,245,248,1);}QMenu::item:selected{background:rgba(68,132,255,0.35);border-radius:8px;}""")
+    def _restore_state(self):
+        self.input_path=self.settings.value("last_png","")
+        if self.input_path and os.path.isfile(self.input_path):
+            self._load_preview(self.input_path)
+            self.lbl_file.setText(self.input_path)
+            self.btn_export.setEnabled(True)
+    def _save_state(self):
+        self.settings.setValue("n_colors",self.sp_colors.value())
+        self.settings.setValue("quantize_method",self.cmb_quant.currentText())
+        self.settings.setValue("pen_mm",self.sp_pen.value())
+        self.settings.setValue("draw_w_mm",self.sp_w.value())
+        self.settings.setValue("draw_h_mm",self.sp_h.value())
+        self.settings.setValue("keep_aspect","1" if self.cb_keep.isChecked() else "0")
+        self.settings.setValue("crosshatch","1" if self.cb_cross.isChecked() else "0")
+        self.settings.setValue("join_serpentine","1" if self.cb_join.isChecked() else "0")
+        self.settings.setValue("travel_order",self.cmb_travel.currentText())
+        self.settings.setValue("angle_set",self.cmb_angles.currentText())
+        self.settings.setValue("hatch_angle",self.sp_angle.value())
+        self.settings.setValue("use_user_order","1" if self.cb_user.isChecked() else "0")
+        self.settings.setValue("hatch_engine",self.cmb_engine.currentText())
+        self.settings.setValue("speckle_filter","1" if self.cb_speckle.isChecked() else "0")
+        self.settings.setValue("speckle_min_area_mm2",self.sp_min_area.value())
+        self.settings.setValue("min_segment_mm",self.sp_min_seg.value())
+        self.settings.setValue("export_png","1" if self.cb_png.isChecked() else "0")
+        self.settings.setValue("png_crop","1" if self.cb_png_crop.isChecked() else "0")
+        self.settings.setValue("png_mode",self.cmb_png_mode.currentText())
+        self.settings.setValue("png_compress",self.sp_png_compress.value())
+        self.settings.setValue("export_svg_layers","1" if self.cb_svg.isChecked() else "0")
+        self.settings.setValue("export_svg_combined","1" if self.cb_comb.isChecked() else "0")
+        self.settings.setValue("svg_encoding",self.cmb_svg_enc.currentText())
+        self.settings.setValue("panel_w_mm",self.sp_panel_w.value())
+        self.settings.setValue("panel_h_mm",self.sp_panel_h.value())
+        self.settings.setValue("panel_overlap_mm",self.sp_panel_overlap.value())
+        self.settings.setValue("export_gcode","1" if self.cb_gcode.isChecked() else "0")
+        self.settings.setValue("export_hpgl","1" if self.cb_hpgl.isChecked() else "0")
+        self.settings.setValue("export_segments","1" if self.cb_segments.isChecked() else "0")
+        self.settings.setValue("pen_up",self.ed_pen_up.text())
+        self.settings.setValue("pen_down",self.ed_pen_down.text())
+        self.settings.setValue("feed_draw",self.sp_feed.value())
+        self.settings.setValue("feed_travel",self.sp_travel_feed.value())
+        self.settings.setValue("svg_workers",self.sp_workers.value())
+        self.settings.setValue("memory_budget_mb",self.sp_budget.value())
+        self.settings.setValue("result_cache_mb",self.sp_cache.value())
+        self.settings.setValue("bundle",self.cmb_bundle.currentText())
+        self.settings.setValue("export_jobs",self.sp_jobs.value())
+        self.settings.setValue("profile","1" if self.cb_profile.isChecked() else "0")
+        self.settings.setValue("export_dir_mode",self.cmb_out.currentIndex())
+        self.settings.setValue("labels_text",self.labels.toPlainText())
+        self.settings.setValue("hatch_preview","1" if self.cb_overlay.isChecked() else "0")
+        self.settings.setValue("fullscreen","1" if self.isFullScreen() else "0")
+        if self.input_path:
+            self.settings.setValue("last_png",self.input_path)
+    def closeEvent(self,event):
+        try:
+            self._save_state()
+        except Exception:
+            pass
+        self.preview.shutdown()
+        self.loader.shutdown()
+        self.queue.shutdown()
+        super().closeEvent(event)
+    def _enter_fullscreen_if_needed(self):
+        if int(self.settings.value("fullscreen","1"))==1:
+            self.showFullScreen()
+        else:
+            self.resize(Cfg.UI_W,Cfg.UI_H)
+    def _append_log(self,msg):
+        ts=time.strftime("%H:%M:%S")
+        self.log.appendPlainText(f"[{ts}] {msg}")
+    def on_copy_log(self):
+        QApplication.clipboard().setText(self.log.toPlainText())
+    def toggle_fullscreen(self):
+        if self.isFullScreen():
+            self.showNormal()
+            self.resize(Cfg.UI_W,Cfg.UI_H)
+        else:
+            self.showFullScreen()
+    def show_about(self):
+        QMessageBox.information(self,"About HatchSmith","HatchSmith\n© FIWAtec GmbH\n\nPNG layers and hatch-filled SVG exports for pen plotters.\nDesigned for real stroke-based filling.")
+    def show_guide(self):
+        txt="Guide\n\n1) Open a PNG\n2) Set Colors, Target Size (mm) and Pen Width (mm)\n3) Optional: paste a label/order list and enable it\n4) Export\n\nTip: Target size and pen width directly control hatch density.\n\n© FIWAtec GmbH"
+        QMessageBox.information(self,"Guide",txt)
+    def on_open(self):
+        start=self.settings.value("last_open_dir",script_dir())
+        fn,_=QFileDialog.getOpenFileName(self,"Open PNG",start,"PNG (*.png)")
+        if not fn:
+            return
+        self.settings.setValue("last_open_dir",os.path.dirname(fn))
+        self.input_path=fn
+        self.lbl_file.setText(fn)
+        self.btn_export.setEnabled(True)
+        self._append_log("Loaded: "+fn)
+        self._load_preview(fn)
+    def _load_preview(self,fn):
+        self.view.clear_tiles()
+        self.preview_img=None
+        self.preview.cancel()
+        self._clear_overlay()
+        self.lbl_overlay.setText("Loading…")
+        self.loader.load(fn)
+    def _on_image_loaded(self,gen,img,pyramid):
+        if gen!=self.loader.generation:
+            return
+        try:
+            data=np.array(img)
+            qimg=QImage(data.data,img.size[0],img.size[1],QImage.Format_RGBA8888)
+            pix=QPixmap.fromImage(qimg)
+            self.pixitem.setPixmap(pix)
+            self.scene.setSceneRect(0,0,pix.width(),pix.height())
+            self.view.resetTransform()
+            self.view.set_pyramid(self.loader,pyramid,self.pixitem,pix.width()/float(pyramid.size[0]))
+            self.preview_img=img.convert("RGB")
+            self.preview_key+=1
+            self.lbl_overlay.setText("")
+            self._schedule_preview()
+        except Exception as e:
+            self._append_log("Preview failed: "+str(e))
+    def _on_image_failed(self,gen,err):
+        if gen==self.loader.generation:
+            self.lbl_overlay.setText("")
+            self._append_log("Preview failed: "+err)
+    def _schedule_preview(self,*_):
+        if not self.cb_overlay.isChecked():
+            self.preview.cancel()
+            self.preview_timer.stop()
+            self._clear_overlay()
+            self.lbl_overlay.setText("")
+            return
+        if self.preview_img is not None:
+            self.preview.cancel()
+            self.preview_timer.start()
+    def _start_preview(self):
+        if self.preview_img is not None and self.cb_overlay.isChecked():
+            self.lbl_overlay.setText("Hatching…")
+            self.preview.request(self.preview_img,self.preview_key,self._job_from_ui())
+    def _clear_overlay(self):
+        for item in self.overlay.values():
+            self.scene.removeItem(item)
+        self.overlay={}
+        self.pixitem.setOpacity(1.0)
+    def _on_preview_ready(self,gen,layers,ms):
+        if gen!=self.preview.generation or not self.cb_overlay.isChecked():
+            return
+        keep={k for k,_,_,_ in layers}
+        for k in [k for k in self.overlay if k not in keep]:
+            self.scene.removeItem(self.overlay.pop(k))
+        for z,(k,path,hx,width) in enumerate(layers):
+            item=self.overlay.get(k)
+            if item is None:
+                item=QGraphicsPathItem(path)
+                self.scene.addItem(item)
+                self.overlay[k]=item
+            pen=QPen(QColor("#"+hx),width,Qt.SolidLine,Qt.RoundCap,Qt.RoundJoin)
+            item.setPen(pen)
+            item.setZValue(1+z)
+        self.pixitem.setOpacity(0.15)
+        self.lbl_overlay.setText(f"{len(layers)} layers, {ms:.0f} ms")
+    def on_cancel(self):
+        if self.queue.busy():
+            self.queue.cancel_all()
+            self.btn_cancel.setEnabled(False)
+            self._append_log("Cancel requested for all exports")
+    def choose_output_dir(self):
+        if self.cmb_out.currentIndex()==0:
+            return safe_mkdir(os.path.join(script_dir(),"exports"))
+        d=QFileDialog.getExistingDirectory(self,"Choose export folder",self.settings.value("last_export_dir",script_dir()))
+        if not d:
+            return ""
+        self.settings.setValue("last_export_dir",d)
+        return d
+    def on_export(self):
+        if not self.input_path or not os.path.isfile(self.input_path):
+            QMessageBox.warning(self,"Export","Please open a PNG first.")
+            return
+        out_base=self.choose_output_dir()
+        if not out_base:
+            return
+        base=os.path.join(out_base,"export_"+time.strftime("%Y%m%d_%H%M%S"))
+        out=base
+        n=2
+        while os.path.exists(out):
+            out=f"{base}_{n}"
+            n+=1
+        job=self._job_from_ui()
+        job.output_dir=safe_mkdir(out)
+        self._save_state()
+        self.start_worker(job)
+    def _job_from_ui(self):
+        job=ExportJob()
+        job.input_png_path=self.input_path
+        job.n_colors=int(self.sp_colors.value())
+        job.quantize_method=self.cmb_quant.currentText()
+        job.pen_mm=float(self.sp_pen.value())
+        job.draw_w_mm=float(self.sp_w.value())
+        job.draw_h_mm=float(self.sp_h.value())
+        job.keep_aspect=self.cb_keep.isChecked()
+        job.use_crosshatch=self.cb_cross.isChecked()
+        job.join_serpentine=self.cb_join.isChecked()
+        job.travel_order=self.cmb_travel.currentText()
+        job.angle_set=self.cmb_angles.currentText()
+        job.hatch_angle=float(self.sp_angle.value())
+        job.export_png_layers=self.cb_png.isChecked()
+        job.png_crop=self.cb_png_crop.isChecked()
+        job.png_mode=self.cmb_png_mode.currentText()
+        job.png_compress=int(self.sp_png_compress.value())
+        job.export_svg_layers=self.cb_svg.isChecked()
+        job.export_svg_combined=self.cb_comb.isChecked()
+        job.svg_encoding=self.cmb_svg_enc.currentText()
+        job.panel_w_mm=float(self.sp_panel_w.value())
+        job.panel_h_mm=float(self.sp_panel_h.value())
+        job.panel_overlap_mm=float(self.sp_panel_overlap.value())
+        job.export_gcode=self.cb_gcode.isChecked()
+        job.export_hpgl=self.cb_hpgl.isChecked()
+        job.export_segments=self.cb_segments.isChecked()
+        job.pen_up=self.ed_pen_up.text().strip() or Cfg.DEFAULT_PEN_UP
+        job.pen_down=self.ed_pen_down.text().strip() or Cfg.DEFAULT_PEN_DOWN
+        job.feed_draw=float(self.sp_feed.value())
+        job.feed_travel=float(self.sp_travel_feed.value())
+        job.bundle=self.cmb_bundle.currentText()
+        job.profile=self.cb_profile.isChecked()
+        job.svg_workers=int(self.sp_workers.value())
+        job.memory_budget_mb=int(self.sp_budget.value())
+        job.cache_mb=int(self.sp_cache.value())
+        job.labels_text=self.labels.toPlainText()
+        job.force_user_order=self.cb_user.isChecked()
+        job.hatch_engine=self.cmb_engine.currentText()
+        job.speckle_filter=self.cb_speckle.isChecked()
+        job.speckle_min_area_mm2=float(self.sp_min_area.value())
+        job.min_segment_mm=float(self.sp_min_seg.value())
+        return job
+    def start_worker(self,job):
+        row=self.jobs.rowCount()
+        self.jobs.insertRow(row)
+        jid=self.queue.next_id
+        item=QTableWidgetItem(str(jid))
+        item.setData(Qt.UserRole,jid)
+        self.jobs.setItem(row,0,item)
+        self.jobs.setItem(row,1,QTableWidgetItem(f"{os.path.basename(job.input_png_path)} → {os.path.basename(job.output_dir)}"))
+        self.jobs.setItem(row,2,QTableWidgetItem(""))
+        bar=QProgressBar()
+        bar.setRange(0,100)
+        bar.setValue(0)
+        self.jobs.setCellWidget(row,3,bar)
+        btn=QPushButton("Cancel")
+        btn.clicked.connect(lambda _=False,jid=jid:self.queue.cancel(jid))
+        self.jobs.setCellWidget(row,4,btn)
+        self.batch[jid]=0
+        self.btn_cancel.setEnabled(True)
+        self._append_log(f"[#{jid}] Export queued: {job.input_png_path}")
+        self.queue.submit(job)
+    def _job_row(self,jid):
+        for row in range(self.jobs.rowCount()):
+            if self.jobs.item(row,0).data(Qt.UserRole)==jid:
+                return row
+        return -1
+    def _on_job_progress(self,jid,value):
+        row=self._job_row(jid)
+        if row>=0:
+            self.jobs.cellWidget(row,3).setValue(value)
+        if jid in self.batch:
+            self.batch[jid]=value
+            self._update_total_progress()
+    def _update_total_progress(self):
+        if self.batch:
+            self.progress.setValue(int(sum(v if isinstance(v,int) else 100 for v in self.batch.values())/len(self.batch)))
+    def _on_job_state(self,jid,state,detail):
+        row=self._job_row(jid)
+        if row>=0:
+            self.jobs.item(row,2).setText(state)
+            self.jobs.item(row,2).setToolTip(detail)
+            if state in JOB_FINAL:
+                self.jobs.cellWidget(row,4).setEnabled(False)
+                if state=="Done":
+                    self.jobs.cellWidget(row,3).setValue(100)
+        if state=="Running":
+            self._append_log(f"[#{jid}] Export started…")
+        if state not in JOB_FINAL:
+            return
+        if state=="Done":
+            self._append_log(f"[#{jid}] Export complete: "+detail)
+        elif state=="Failed":
+            self._append_log(f"[#{jid}] Export failed: "+detail)
+        else:
+            self._append_log(f"[#{jid}] Export canceled")
+        if jid in self.batch:
+            self.batch[jid]=(state,detail)
+            self._update_total_progress()
+        if self.queue.busy():
+            return
+        self.btn_cancel.setEnabled(False)
+        results=[v for v in self.batch.values() if not isinstance(v,int)]
+        self.batch={}
+        failed=[d for st,d in results if st=="Failed"]
+        if len(results)==1 and failed:
+            QMessageBox.critical(self,"Error",failed[0] or "Export failed.")
+        elif len(results)==1 and results[0][0]=="Done":
+            QMessageBox.information(self,"Done","Export complete.\n\n"+results[0][1])
+        elif len(results)>1:
+            done=sum(1 for st,_ in results if st=="Done")
+            box=QMessageBox.warning if failed else QMessageBox.information
+            box(self,"Export queue",f"{len(results)} exports finished: {done} done, {len(failed)} failed, {len(results)-done-len(failed)} canceled.")
+    def on_clear_jobs(self):
+        for row in reversed(range(self.jobs.rowCount())):
+            if self.jobs.item(row,2).text() in JOB_FINAL:
+                self.jobs.removeRow(row)
+def run_gui(argv,on_ready=None):
+    app=QApplication(argv)
+    app.setStyle("Fusion")
+    app.setApplicationName(Cfg.APP)
+    app.setOrganizationName(Cfg.ORG)
+    w=MainWindow()
+    w.show()
+    if on_ready:
+        QTimer.singleShot(0,on_ready)
+    return app.exec()
@@ -0,0 +1,13 @@
+import os,sys
+import numpy as np
+import pytest
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1234)
+def blob_labels(rng,h,w,n_labels,cells=6):
+    coarse=rng.integers(0,n_labels,size=(h//cells+1,w//cells+1))
+    labels=np.kron(coarse,np.ones((cells,cells),dtype=np.int64))[:h,:w]
+    noise=rng.random((h,w))<0.1
+    labels[noise]=rng.integers(0,n_labels,size=int(noise.sum()))
+    return labels.astype(np.uint8)
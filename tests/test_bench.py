@@ -0,0 +1,40 @@
+import tracemalloc
+import numpy as np
+import pytest
+from PIL import Image
+import hatchSmithbench as bench
+import hatchSmithcore as core
+core_stages={"decode","quantize","quantize (tiled)","speckle filter","layer list","PNG layers","SVG layers","panels","bundle"}
+def bench_args(*extra):
+    return bench.build_parser().parse_args(["--sizes","0.01","--colors","4"]+list(extra))
+@pytest.fixture
+def src(tmp_path,rng):
+    arr=np.zeros((40,60,3),dtype=np.uint8)
+    for k in range(4):
+        arr[:,k*15:(k+1)*15]=rng.integers(0,256,size=3)
+    path=str(tmp_path/"in.png")
+    Image.fromarray(arr).save(path)
+    return path
+@pytest.mark.parametrize("extra,stages",[
+    (("--hatching","Cross + 45°"),{"decode","quantize","layer list","PNG layers","SVG layers","bundle","hatch h","hatch v","hatch d1","hatch d2","SVG write"}),
+    (("--memory-budget-mb","1","--speckle-filter","--panel-w-mm","40","--panel-h-mm","40","--bundle","Zip only","--svg-workers","2"),{"quantize (tiled)","speckle filter","panels","bundle","hatch h","SVG write"}),
+    (("--hatch-engine",core.HATCH_ENGINES[1],"--travel",core.TRAVEL_MODES[1],"--hatching","Horizontal"),{"outline","hatch h","travel order","SVG write"}),
+])
+def test_bench_times_the_exporter_stages(tmp_path,src,extra,stages):
+    args=bench_args(*extra)
+    job=bench.job_from_args(args,src,str(tmp_path/"out"),4,bench.case_labels(src,4,args.quantize))
+    run={}
+    size,n_labels=bench.bench_export(job,run)
+    assert size==(60,40) and n_labels==4
+    assert stages<=set(run)
+    assert all(st["s"]>=0.0 for st in run.values())
+    assert all(bool(st.get("step"))==(name in stages-core_stages) for name,st in run.items() if name in stages)
+def test_warm_cache_times_cache_hits(tmp_path,src):
+    args=bench_args("--cache-mb","16","--warm-cache")
+    res=bench.run_case(bench.job_from_args(args,src,str(tmp_path/"out"),4),1,True,True)
+    assert "labels from cache" in res["stages"] and "quantize" not in res["stages"]
+    assert all("peak_mb" in st for st in res["stages"].values() if not st.get("step"))
+    assert not tracemalloc.is_tracing()
+def test_colors_are_limited_to_64():
+    with pytest.raises(SystemExit):
+        bench.main(["--colors","65"])
@@ -0,0 +1,95 @@
+import os
+import zipfile
+import numpy as np
+import pytest
+from PIL import Image
+import hatchSmithcore as core
+def test_abort_removes_partial_zip(tmp_path):
+    (tmp_path/"a.txt").write_text("x")
+    bundle=core.ZipBundle(str(tmp_path/"export.zip"),str(tmp_path))
+    bundle.add(str(tmp_path/"a.txt"))
+    bundle.abort()
+    assert not os.path.exists(tmp_path/"export.zip")
+    assert os.path.exists(tmp_path/"a.txt")
+def test_abort_tolerates_missing_or_locked_zip(tmp_path,monkeypatch):
+    bundle=core.ZipBundle(str(tmp_path/"export.zip"),str(tmp_path))
+    os.remove(tmp_path/"export.zip")
+    bundle.abort()
+    bundle=core.ZipBundle(str(tmp_path/"export.zip"),str(tmp_path))
+    def locked(path):
+        raise PermissionError(13,"locked",path)
+    monkeypatch.setattr(core.os,"remove",locked)
+    bundle.abort()
+def test_close_writes_all_entries(tmp_path):
+    for name in ("a.svg","b.png"):
+        (tmp_path/name).write_text(name)
+    bundle=core.ZipBundle(str(tmp_path/"export.zip"),str(tmp_path),keep_files=False)
+    bundle.add(str(tmp_path/"a.svg"))
+    bundle.add(str(tmp_path/"b.png"))
+    bundle.close()
+    with zipfile.ZipFile(tmp_path/"export.zip") as z:
+        assert sorted(z.namelist())==["a.svg","b.png"]
+    assert not os.path.exists(tmp_path/"a.svg")
+def test_export_error_survives_failed_cleanup(tmp_path,monkeypatch):
+    Image.fromarray(np.zeros((8,8,3),dtype=np.uint8)).save(tmp_path/"in.png")
+    job=core.ExportJob()
+    job.input_png_path=str(tmp_path/"in.png")
+    job.output_dir=str(tmp_path/"out")
+    job.cache_mb=0
+    def boom(*args):
+        raise RuntimeError("boom")
+    def locked(path):
+        raise PermissionError(13,"locked",path)
+    monkeypatch.setattr(core,"label_index",boom)
+    monkeypatch.setattr(core.os,"remove",locked)
+    with pytest.raises(RuntimeError,match="boom"):
+        core.Exporter(job).run()
+class CancelAt(core.StageProfiler):
+    def __init__(self,cat):
+        super().__init__()
+        self.cat=cat
+        self.exporter=None
+    def begin(self,name,cat="stage"):
+        if cat==self.cat:
+            self.exporter.stop()
+        return super().begin(name,cat)
+    def add(self,name,cat,*args,**kw):
+        if cat==self.cat:
+            self.exporter.stop()
+        super().add(name,cat,*args,**kw)
+def cancel_job(tmp_path,rng,workers,travel):
+    arr=np.repeat(np.repeat(rng.integers(0,256,(12,16,3)),8,axis=0),8,axis=1).astype(np.uint8)
+    Image.fromarray(arr).save(tmp_path/"in.png")
+    out=tmp_path/"out"
+    out.mkdir()
+    (out/"notes.txt").write_text("mine")
+    os.utime(out/"notes.txt",(1.0,1.0))
+    job=core.ExportJob()
+    job.input_png_path=str(tmp_path/"in.png")
+    job.output_dir=str(out)
+    job.n_colors=4
+    job.draw_w_mm=64.0
+    job.pen_mm=0.2
+    job.cache_mb=0
+    job.svg_workers=workers
+    job.travel_order=travel
+    job.export_gcode=True
+    return job
+@pytest.mark.parametrize("workers,travel",[(1,core.TRAVEL_MODES[0]),(1,core.TRAVEL_MODES[1]),(2,core.TRAVEL_MODES[2])])
+def test_cancel_while_hatching_leaves_no_partial_files(tmp_path,rng,workers,travel):
+    prof=CancelAt("layer")
+    exporter=prof.exporter=core.Exporter(cancel_job(tmp_path,rng,workers,travel),profiler=prof)
+    with pytest.raises(RuntimeError,match="Canceled."):
+        exporter.run()
+    assert sorted(os.listdir(tmp_path/"out"))==["notes.txt"]
+def test_cancel_during_travel_order_leaves_no_partial_files(tmp_path,rng,monkeypatch):
+    exporter=core.Exporter(cancel_job(tmp_path,rng,1,core.TRAVEL_MODES[1]))
+    stroke_ends=core.stroke_ends
+    def stop_then_ends(*args):
+        exporter.stop()
+        return stroke_ends(*args)
+    monkeypatch.setattr(core,"stroke_ends",stop_then_ends)
+    with pytest.raises(RuntimeError,match="Canceled.") as err:
+        exporter.run()
+    assert err.traceback[-2].name=="nearest_neighbour_order"
+    assert sorted(os.listdir(tmp_path/"out"))==["notes.txt"]
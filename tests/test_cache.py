@@ -0,0 +1,80 @@
+import os
+import time
+import numpy as np
+import pytest
+from PIL import Image
+import hatchSmithcore as core
+@pytest.fixture
+def src(tmp_path,rng):
+    arr=np.repeat(np.repeat(rng.integers(0,256,(8,10,3)),6,axis=0),6,axis=1).astype(np.uint8)
+    Image.fromarray(arr).save(tmp_path/"in.png")
+    return str(tmp_path/"in.png")
+def export_stats(tmp_path,src,name,**params):
+    job=core.ExportJob()
+    job.input_png_path=src
+    job.output_dir=str(tmp_path/name)
+    job.n_colors=4
+    job.draw_w_mm=60.0
+    job.cache_mb=64
+    job.cache_dir=str(tmp_path/"cache")
+    for k,v in params.items():
+        setattr(job,k,v)
+    logs=[]
+    core.Exporter(job,logs.append).run()
+    line=next(m for m in logs if m.startswith("Cache: "))
+    return {kind:tuple(int(v) for v in part.split()[1::3]) for kind,part in zip(core.CACHE_KINDS,line[7:].split(", "))}
+def fill(cache,key,ext,size,mtime):
+    p=cache.path(key,ext)
+    os.makedirs(os.path.dirname(p),exist_ok=True)
+    with open(p,"wb") as f:
+        f.write(b"\0"*size)
+    os.utime(p,(mtime,mtime))
+    return p
+def test_cache_key_follows_job_parameters(tmp_path,src):
+    first=export_stats(tmp_path,src,"a")
+    assert all(hit==0 for hit,_ in first.values()) and first["labels"]==(0,1)
+    again=export_stats(tmp_path,src,"b")
+    assert again["labels"]==(1,0) and again["png"]==(4,0) and again["hatch"]==(4,0)
+    pen=export_stats(tmp_path,src,"c",pen_mm=2.0)
+    assert pen["labels"]==(1,0) and pen["png"]==(4,0) and pen["hatch"]==(0,4)
+    colors=export_stats(tmp_path,src,"d",n_colors=3)
+    assert colors["labels"]==(0,1) and colors["hatch"][0]==0
+def test_lookup_counts_hits_and_misses(tmp_path):
+    cache=core.ResultCache(str(tmp_path),1)
+    key=core.cache_key("png",1)
+    assert cache.lookup("png",key,".png") is None
+    fill(cache,key,".png",10,1.0)
+    assert cache.lookup("png",key,".png")==cache.path(key,".png")
+    assert os.path.getmtime(cache.path(key,".png"))>1.0
+    assert cache.lookup("labels",key,".png",".json") is None
+    assert cache.stats["png"]==[1,1] and cache.stats["labels"]==[0,1]
+    assert core.cache_key("png",1)!=core.cache_key("png",2)
+def test_evict_drops_least_recently_used_within_budget(tmp_path):
+    cache=core.ResultCache(str(tmp_path),1)
+    now=time.time()-2*core.CACHE_GRACE_S
+    keys=[core.cache_key("hatch",i) for i in range(6)]
+    for i,key in enumerate(keys):
+        fill(cache,key,".npz",300<<10,now+i)
+    cache.lookup("hatch",keys[0],".npz")
+    assert cache.evict(time.time())==3
+    left=[key for key in keys if os.path.isfile(cache.path(key,".npz"))]
+    assert left==[keys[0],keys[4],keys[5]]
+def test_evict_keeps_entries_of_open_exports(tmp_path,monkeypatch):
+    monkeypatch.setattr(core,"CACHE_GRACE_S",0.0)
+    other=core.ResultCache(str(tmp_path),1)
+    cache=core.ResultCache(str(tmp_path),0)
+    old=fill(cache,"aaold",".npz",10,other.started-100)
+    used=fill(cache,"aaused",".npz",10,other.started-100)
+    assert other.lookup("hatch","aaused",".npz")
+    assert cache.evict(time.time())==1
+    assert not os.path.isfile(old) and os.path.isfile(used)
+    other.close()
+    assert cache.evict(time.time())==1
+    assert not os.path.isfile(used)
+def test_file_digest_memo_is_bounded(tmp_path):
+    p=tmp_path/"a.bin"
+    p.write_bytes(b"one")
+    first=core.file_digest(str(p))
+    p.write_bytes(b"two!")
+    assert core.file_digest(str(p))!=first
+    assert core._file_digest.cache_info().maxsize==core.FILE_DIGEST_MEMO
@@ -0,0 +1,34 @@
+import os
+import numpy as np
+import pytest
+from PIL import Image
+import hatchSmithcli as cli
+def test_output_dirs_are_unique():
+    inputs=[os.path.join("a","img.png"),os.path.join("b","img.png"),os.path.join("c","IMG.png"),os.path.join("d","img_2.png"),"other.png"]
+    dirs=cli.output_dirs(inputs,"out")
+    assert [os.path.basename(d) for d in dirs]==["img","img_2","IMG_3","img_2_2","other"]
+    assert all(os.path.dirname(d)=="out" for d in dirs)
+def test_colors_are_limited_to_64(capsys):
+    for n in ("1","65"):
+        with pytest.raises(SystemExit):
+            cli.main(["in.png","--colors",n])
+        assert "--colors" in capsys.readouterr().err
+    assert cli.build_parser().parse_args(["in.png","--colors","64"]).colors==64
+def test_same_stem_inputs_export_to_separate_folders(tmp_path,capsys):
+    rng=np.random.default_rng(7)
+    paths=[]
+    for sub,n in (("a",2),("b",3)):
+        os.makedirs(tmp_path/sub)
+        arr=np.zeros((24,32,3),dtype=np.uint8)
+        for k in range(n):
+            arr[:,k*32//n:(k+1)*32//n]=rng.integers(0,256,size=3)
+        Image.fromarray(arr).save(tmp_path/sub/"img.png")
+        paths.append(str(tmp_path/sub/"img.png"))
+    out=tmp_path/"out"
+    assert cli.main(paths+["-o",str(out),"-j","2","--colors","3","--cache-mb","0","--width-mm","32"])==0
+    assert sorted(os.listdir(out))==["img","img_2"]
+    for name,n in (("img",2),("img_2",3)):
+        layers=[fn for fn in os.listdir(out/name/"png_layers") if fn.endswith(".png")]
+        assert len(layers)==n
+    printed=capsys.readouterr().out
+    assert printed.count("[ok]")==2
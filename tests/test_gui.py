@@ -0,0 +1,25 @@
+import os
+import numpy as np
+import pytest
+os.environ.setdefault("QT_QPA_PLATFORM","offscreen")
+pytest.importorskip("PySide6")
+import hatchSmithcore as core
+import hatchSmithgui as gui
+from conftest import blob_labels
+def test_streamed_path_layout_matches_qt():
+    assert gui.streamed_path_ok()
+@pytest.mark.parametrize("join",[False,True])
+def test_strokes_path_round_trip(rng,join):
+    labels=blob_labels(rng,40,52,3,cells=8)
+    index=core.label_index(labels,3)
+    tables=list(core.layer_source(labels,index,1)(3,["h","v",30.0],join=join))
+    path=gui.strokes_path(tables)
+    xs,ys,offs,_=core.concat_strokes(tables)
+    kinds=np.ones(len(xs),dtype=int)
+    kinds[offs[:-1]]=0
+    assert gui.path_points(path)==list(zip(kinds.tolist(),xs.tolist(),ys.tolist()))
+    assert gui.path_points(path)==gui.path_points(gui.drawn_path(gui.path_elements(tables)))
+def test_strokes_path_falls_back_to_drawing(rng,monkeypatch):
+    tables=[(np.array([0.0,4.0,1.0,2.0]),np.array([1.0,1.0,3.0,5.0]),np.array([0,2,4]),2)]
+    monkeypatch.setattr(gui,"streamed_path_ok",lambda:False)
+    assert gui.path_points(gui.strokes_path(tables))==[(0,0.0,1.0),(1,4.0,1.0),(0,1.0,3.0),(1,2.0,5.0)]
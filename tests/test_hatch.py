@@ -0,0 +1,175 @@
+import numpy as np
+import pytest
+import hatchSmithcore as core
+from conftest import blob_labels
+ANGLES=[30.0,10.0,60.0,-70.0,89.0,1.0,135.0,-20.0]
+def ref_runs(row):
+    d=np.diff(np.pad(row.astype(np.int16),(1,1)))
+    return list(zip(np.flatnonzero(d==1),np.flatnonzero(d==-1)-1))
+def ref_emit_hv(mask,mm_per_px,step_px,modes):
+    h,w=mask.shape
+    out=[]
+    if "h" in modes:
+        for y in range(0,h,step_px):
+            for x0,x1 in ref_runs(mask[y,:]):
+                out.append(f'<path d="M {x0*mm_per_px:.3f} {y*mm_per_px:.3f} L {(x1+1)*mm_per_px:.3f} {y*mm_per_px:.3f}"/>\n')
+    if "v" in modes:
+        for x in range(0,w,step_px):
+            for y0,y1 in ref_runs(mask[:,x]):
+                out.append(f'<path d="M {x*mm_per_px:.3f} {y0*mm_per_px:.3f} L {x*mm_per_px:.3f} {(y1+1)*mm_per_px:.3f}"/>\n')
+    return "".join(out)
+def svg_text(tables,mm_per_px):
+    return "".join(text for t in tables for text,_ in core.stroke_path_batches(*t[:3],mm_per_px))
+def raster_sources(labels,pidx,index):
+    yield core.layer_source(labels,index,pidx)
+    yield core.layer_source(labels,index,pidx,strip_rows=7)
+def all_sources(labels,pidx,index):
+    yield from raster_sources(labels,pidx,index)
+    for rows in (0,7):
+        yield core.layer_source(labels,index,pidx,rows,core.HATCH_ENGINES[1])
+def segment_set(tables,shift=0.0,steep=False):
+    out=set()
+    for xs,ys,offs,_ in tables:
+        assert np.array_equal(np.diff(offs),np.full(len(offs)-1,2))
+        x0,y0,x1,y1=xs[0::2],ys[0::2],xs[1::2],ys[1::2]
+        if steep:
+            x0,x1=x0-shift,x1-shift
+        else:
+            y0,y1=y0-shift,y1-shift
+        for seg in np.round(np.column_stack((x0,y0,x1,y1)),9).tolist():
+            out.add(min(tuple(seg),tuple(seg[2:]+seg[:2])))
+    return out
+def covered_pixels(mask,angle_deg,step_px):
+    steep,slope,off,line,c,t0,t1=core.hatch_runs(mask,angle_deg,step_px)
+    hit=np.zeros(mask.shape,dtype=np.int64)
+    for ci,a,b in zip(c.tolist(),t0.tolist(),t1.tolist()):
+        t=np.arange(a,b)
+        minor=ci+off[t]
+        np.add.at(hit,(t,minor) if steep else (minor,t),1)
+    return hit,c
+@pytest.mark.parametrize("modes",[["h"],["v"],["h","v"]])
+@pytest.mark.parametrize("step_px",[1,2,3,5])
+def test_hv_matches_reference_emitter(rng,modes,step_px):
+    labels=blob_labels(rng,41,57,4)
+    index=core.label_index(labels,4)
+    for pidx in range(4):
+        expect=ref_emit_hv(labels==pidx,0.37,step_px,modes)
+        for strokes in raster_sources(labels,pidx,index):
+            assert svg_text(strokes(step_px,modes),0.37)==expect
+@pytest.mark.parametrize("angle",["d1","d2"]+ANGLES)
+def test_diagonal_runs_partition_mask(rng,angle):
+    mask=rng.random((33,47))<0.6
+    hit,_=covered_pixels(mask,core.HATCH_ANGLES.get(angle,angle),1)
+    assert np.array_equal(hit,mask.astype(np.int64))
+@pytest.mark.parametrize("angle",["d1","d2"]+ANGLES)
+@pytest.mark.parametrize("step_px",[2,3,7])
+def test_diagonal_runs_follow_step(rng,angle,step_px):
+    mask=rng.random((33,47))<0.6
+    a=core.HATCH_ANGLES.get(angle,angle)
+    hit,c=covered_pixels(mask,a,step_px)
+    steep,_,off,_=core.hatch_lines(47,33,float(a),1)
+    full=np.zeros(mask.shape,dtype=bool)
+    t=np.arange(len(off))
+    for ci in core.hatch_lines(47,33,float(a),step_px)[3].tolist():
+        minor=ci+off
+        ok=(minor>=0)&(minor<(47 if steep else 33))
+        full[(t[ok],minor[ok]) if steep else (minor[ok],t[ok])]=True
+    assert hit.max()<=1
+    assert np.array_equal(hit.astype(bool),mask&full)
+@pytest.mark.parametrize("angle",["d1","d2"]+ANGLES)
+@pytest.mark.parametrize("join",[False,True])
+def test_strokes_stay_inside_image(rng,angle,join):
+    labels=blob_labels(rng,38,51,3,cells=9)
+    labels[rng.random(labels.shape)<0.05]=0
+    index=core.label_index(labels,3)
+    h,w=labels.shape
+    for pidx in range(3):
+        for strokes in all_sources(labels,pidx,index):
+            for xs,ys,offs,_ in strokes(3,[angle],join=join):
+                assert len(xs)
+                assert xs.min()>=0.0 and xs.max()<=w
+                assert ys.min()>=0.0 and ys.max()<=h
+@pytest.mark.parametrize("mode",["h","v"])
+@pytest.mark.parametrize("rows",[0,5])
+def test_vector_matches_raster_on_axis_lines(rng,mode,rows):
+    labels=blob_labels(rng,27,34,4,cells=3)
+    index=core.label_index(labels,4)
+    for pidx in range(4):
+        raster=list(core.layer_source(labels,index,pidx,rows)(1,[mode]))
+        vector=list(core.layer_source(labels,index,pidx,rows,core.HATCH_ENGINES[1])(1,[mode]))
+        assert segment_set(vector,0.5,mode=="v")==segment_set(raster)
+        length=lambda tables:sum(np.hypot(xs[1::2]-xs[0::2],ys[1::2]-ys[0::2]).sum() for xs,ys,_,_ in tables)
+        assert length(vector)==pytest.approx(length(raster))
+        assert length(raster)==pytest.approx((labels==pidx).sum())
+@pytest.mark.parametrize("angle",["d1","d2"]+ANGLES)
+def test_clamped_segments_keep_angle(rng,angle):
+    mask=rng.random((29,43))<0.9
+    a=np.deg2rad(core.HATCH_ANGLES.get(angle,angle))
+    x0,y0,x1,y1=core.hatch_segments(mask,np.rad2deg(a),2)
+    cross=(x1-x0)*-np.sin(a)-(y1-y0)*np.cos(a)
+    assert np.abs(cross).max()<1e-9
+def test_runs_table_matches_row_scan(rng,monkeypatch):
+    lines=rng.random((23,31))<0.5
+    lines[3]=True
+    lines[4]=False
+    expect=[(k,a,b) for k in range(23) for a,b in ref_runs(lines[k])]
+    for chunk in (1,31,100,core.HATCH_CHUNK):
+        monkeypatch.setattr(core,"HATCH_CHUNK",chunk)
+        k,a,b=core.runs_table(lines)
+        assert list(zip(k.tolist(),a.tolist(),b.tolist()))==expect
+def test_runs_table_empty():
+    k,a,b=core.runs_table(np.zeros((0,5),dtype=bool))
+    assert len(k)==len(a)==len(b)==0
+@pytest.mark.parametrize("step_px",[1,2,4])
+def test_tiled_runs_merge_across_strips(rng,step_px):
+    labels=blob_labels(rng,64,40,3,cells=11)
+    index=core.label_index(labels,3)
+    for pidx in range(3):
+        full=list(core.layer_source(labels,index,pidx)(step_px,["h","v"]))
+        for rows in (1,5,16):
+            tiled=list(core.layer_source(labels,index,pidx,strip_rows=rows)(step_px,["h","v"]))
+            for a,b in zip(full,tiled):
+                assert a[3]==b[3]
+                assert all(np.array_equal(p,q) for p,q in zip(a[:3],b[:3]))
+def polyline_pieces(xs,ys,offs):
+    for a,b in zip(offs[:-1].tolist(),offs[1:].tolist()):
+        for i in range(a,b-1):
+            yield xs[i],ys[i],xs[i+1],ys[i+1]
+def along(angle_deg):
+    a=np.deg2rad(angle_deg)
+    return np.cos(a),-np.sin(a)
+@pytest.mark.parametrize("mode",["h","v","d1","d2",30.0,-70.0])
+@pytest.mark.parametrize("step_px",[1,2,3])
+def test_serpentine_draws_every_run(rng,mode,step_px):
+    labels=blob_labels(rng,40,52,3,cells=10)
+    mask=labels==1
+    plain=core.mode_strokes(mask,step_px,mode)
+    joined=core.mode_strokes(mask,step_px,mode,join=True)
+    assert joined[3]==plain[3]
+    assert len(joined[2])<len(plain[2])
+    ux,uy=along(core.HATCH_ANGLES.get(mode,mode))
+    drawn={}
+    for x0,y0,x1,y1 in polyline_pieces(*joined[:3]):
+        if abs((x1-x0)*uy-(y1-y0)*ux)<1e-9 and (x0,y0)!=(x1,y1):
+            u0,u1=sorted((x0*ux+y0*uy,x1*ux+y1*uy))
+            drawn.setdefault(round(x0*uy-y0*ux,6),[]).append((u0,u1))
+    for x0,y0,x1,y1 in polyline_pieces(*plain[:3]):
+        u0,u1=sorted((x0*ux+y0*uy,x1*ux+y1*uy))
+        assert any(a<=u0+1e-9 and u1<=b+1e-9 for a,b in drawn.get(round(x0*uy-y0*ux,6),[]))
+@pytest.mark.parametrize("mode",["h","v"])
+@pytest.mark.parametrize("step_px",[2,3,5])
+def test_serpentine_links_stay_in_mask(rng,mode,step_px):
+    labels=blob_labels(rng,40,52,3,cells=10)
+    for pidx in range(3):
+        mask=labels==pidx
+        xs,ys,offs,_=core.mode_strokes(mask,step_px,mode,join=True)
+        links=0
+        for x0,y0,x1,y1 in polyline_pieces(xs,ys,offs):
+            if (mode=="h" and x0!=x1) or (mode=="v" and y0!=y1):
+                continue
+            links+=1
+            T,a,b=(int(x0),int(min(y0,y1)),int(max(y0,y1))) if mode=="h" else (int(y0),int(min(x0,x1)),int(max(x0,x1)))
+            cols=mask.T if mode=="v" else mask
+            for m in range(a,b+1):
+                assert (T>0 and cols[m,T-1]) or (T<cols.shape[1] and cols[m,T])
+        assert links
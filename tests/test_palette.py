@@ -0,0 +1,61 @@
+import itertools
+import numpy as np
+import pytest
+import hatchSmithcore as core
+def brute_force(cost):
+    n,m=cost.shape
+    if n<=m:
+        return min(cost[np.arange(n),list(p)].sum() for p in itertools.permutations(range(m),n))
+    return min(cost[list(p),np.arange(m)].sum() for p in itertools.permutations(range(n),m))
+@pytest.mark.parametrize("shape",[(1,1),(3,3),(5,5),(6,6),(3,6),(6,3),(4,7),(7,2)])
+def test_assignment_is_optimal(rng,shape):
+    for trial in range(25):
+        cost=rng.random(shape)*100.0
+        if trial%5==0:
+            cost=np.round(cost/25.0)
+        rows,cols=core.linear_assignment(cost)
+        assert len(rows)==min(shape)
+        assert len(set(rows.tolist()))==len(rows) and len(set(cols.tolist()))==len(cols)
+        assert cost[rows,cols].sum()==pytest.approx(brute_force(cost))
+def test_palette_assignment_beats_greedy_trap():
+    palette=[(255,0,0),(200,0,0),(0,0,255)]
+    desired=["F00000","FF0000","0000FF"]
+    assigned,delta_e=core.palette_assignment_nearest(palette,desired)
+    assert assigned=={0:1,1:0,2:2}
+    assert delta_e[1]<1e-6 and delta_e[2]<1e-6
+def test_palette_assignment_skips_surplus_labels():
+    assigned,delta_e=core.palette_assignment_nearest([(0,0,0),(255,255,255)],["FFFFFF","101010","000000"])
+    assert sorted(assigned)==[0,2]
+    assert assigned[0]==1 and assigned[2]==0
+    assert set(delta_e)==set(assigned)
+def kmeans(arr,n_colors):
+    from PIL import Image
+    return core.quantize_image_rgb(Image.fromarray(arr),n_colors,core.QUANTIZE_METHODS[1])
+def test_kmeans_keeps_near_duplicate_colors_apart():
+    arr=np.zeros((30,40,3),dtype=np.uint8)
+    arr[:,10:20]=2
+    arr[:,20:30]=(200,10,10)
+    arr[:,30:]=(201,11,10)
+    _,q_arr,palette,counts=kmeans(arr,8)
+    assert sorted(palette)==[(0,0,0),(2,2,2),(200,10,10),(201,11,10)]
+    lookup={rgb:i for i,rgb in enumerate(palette)}
+    expect=np.array([[lookup[tuple(int(v) for v in px)] for px in row] for row in arr])
+    assert np.array_equal(q_arr,expect)
+    assert counts.tolist()==[300]*4
+def test_lut_resolves_pixels_in_palette_cells_exactly(rng):
+    palette=np.array([[0,0,0],[3,3,3],[1,2,3],[128,64,32],[130,66,33]],dtype=np.uint8)
+    rgb=np.concatenate((palette[rng.integers(0,5,500)],rng.integers(0,256,(500,3)))).astype(np.uint8).reshape(25,40,3)
+    got=core.palette_mapper(palette,core.QUANTIZE_METHODS[1])(rgb)
+    lab=core.srgb_to_lab(rgb.reshape(-1,3))
+    exact=core.nearest_center(lab,core.srgb_to_lab(palette)).reshape(25,40)
+    in_cell=np.isin(core.lut_cell(rgb),core.lut_cell(palette))
+    assert np.array_equal(got[in_cell],exact[in_cell])
+    assert (got.ravel()[:500]==exact.ravel()[:500]).all()
+@pytest.mark.parametrize("n_colors",[2,5,16])
+def test_kmeans_counts_match_labels(rng,n_colors):
+    arr=np.repeat(rng.integers(0,256,(6,3)),50,axis=0).astype(np.uint8).reshape(15,20,3)
+    _,q_arr,palette,counts=kmeans(arr,n_colors)
+    assert len(palette)==min(n_colors,6)==len(counts)
+    assert len(set(palette))==len(palette)
+    assert counts.tolist()==np.bincount(q_arr.ravel(),minlength=len(palette)).tolist()
+    assert counts.sum()==300 and (counts>0).all()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import hatchSmithcore as core
+from conftest import blob_labels
+MM_PER_PX=0.5
+def stroke_length(tables):
+    total=0.0
+    for xs,ys,offs,_ in tables:
+        seg=np.ones(max(0,len(xs)-1),dtype=bool)
+        seg[offs[1:-1]-1]=False
+        total+=np.hypot(np.diff(xs),np.diff(ys))[seg].sum()
+    return total
+def edge_strokes(w,h,seams):
+    xs,ys=[],[]
+    for x in [0.0,float(w)]+[float(s) for s in seams]:
+        xs+=[x,x]
+        ys+=[0.0,float(h)]
+    for y in (0.0,float(h)):
+        xs+=[0.0,float(w)]
+        ys+=[y,y]
+    return np.array(xs),np.array(ys),np.arange(0,len(xs)+1,2),len(xs)//2
+def layer_tables(rng,join):
+    labels=blob_labels(rng,40,56,3,cells=5)
+    index=core.label_index(labels,3)
+    tables=[]
+    for pidx in range(3):
+        tables+=list(core.layer_source(labels,index,pidx)(2,["h","v","d1",30.0],join=join))
+    return tables+[edge_strokes(56,40,[20,28,40])]
+@pytest.mark.parametrize("panel",[(14.0,10.0),(10.0,8.0),(28.0,6.0)])
+@pytest.mark.parametrize("overlap",[0.0,1.5])
+@pytest.mark.parametrize("join",[False,True])
+def test_panels_add_up_to_the_drawing(rng,panel,overlap,join):
+    tables=layer_tables(rng,join)
+    grid=core.panel_grid(28.0,20.0,*panel,overlap)
+    boxes=core.panel_rects(grid,MM_PER_PX)
+    cores=core.panel_rects(grid,MM_PER_PX,3)
+    total=0.0
+    for box,area in zip(boxes,cores):
+        clipped=[core.clip_strokes(xs,ys,offs,box) for xs,ys,offs,_ in tables]
+        assert all(t[0].min()>=0.0 and t[1].min()>=0.0 for t in clipped if t[3])
+        local=(area[0]-box[0],area[1]-box[1],area[2]-box[0],area[3]-box[1])
+        total+=stroke_length([core.clip_strokes(xs,ys,offs,local) for xs,ys,offs,_ in clipped])
+        if not overlap:
+            assert stroke_length(clipped)==pytest.approx(stroke_length([core.clip_strokes(xs,ys,offs,local) for xs,ys,offs,_ in clipped]))
+    assert total==pytest.approx(stroke_length(tables))
+@pytest.mark.parametrize("overlap",[0.0,1.5])
+def test_outer_edges_belong_to_the_last_row_and_column(overlap):
+    xs,ys,offs,_=edge_strokes(56,40,[28])
+    grid=core.panel_grid(28.0,20.0,14.0,10.0,overlap)
+    for (name,row,col,_,_),rect in zip(grid,core.panel_rects(grid,MM_PER_PX)):
+        px,py,po,n=core.clip_strokes(xs,ys,offs,rect)
+        right=sum(1 for k in range(n) if np.all(px[po[k]:po[k+1]]+rect[0]==56.0))
+        bottom=sum(1 for k in range(n) if np.all(py[po[k]:po[k+1]]+rect[1]==40.0))
+        assert right==(col==2),name
+        assert bottom==(row==2),name
@@ -0,0 +1,101 @@
+import re
+import numpy as np
+import pytest
+import hatchSmithcore as core
+from conftest import blob_labels
+MM_PER_PX=0.5
+HEIGHT_MM=20.0
+def plot_tables(rng):
+    strokes=[[(0.0,0.0),(10.0,0.0),(10.0,4.0)],[(2.0,6.0),(8.0,6.0)],[(5.0,5.0)],[(1.0,1.0),(1.004,1.004),(1.0,1.002)],[(3.0,30.0),(3.0,39.5)]]
+    xs=np.array([p[0] for s in strokes for p in s])
+    ys=np.array([p[1] for s in strokes for p in s])
+    offs=np.concatenate(([0],np.cumsum([len(s) for s in strokes]))).astype(np.int64)
+    labels=blob_labels(rng,40,30,3,cells=5)
+    return [(xs,ys,offs,len(strokes))]+list(core.layer_source(labels,core.label_index(labels,3),1)(2,["h","v"],join=True))
+def table_strokes(tables,flip):
+    out=[]
+    for xs,ys,offs,_ in tables:
+        for a,b in zip(offs[:-1].tolist(),offs[1:].tolist()):
+            X=xs[a:b]*MM_PER_PX
+            Y=ys[a:b]*MM_PER_PX
+            out.append(np.column_stack((X,HEIGHT_MM-Y if flip else Y)))
+    return out
+def plot_opts(feed_draw=1500.0,feed_travel=6000.0):
+    return {"pen_up":"M5 ; up 100%","pen_down":"M3 S1000","feed_draw":feed_draw,"feed_travel":feed_travel,"height_mm":HEIGHT_MM}
+def parse_gcode(text,opts):
+    lines=text.splitlines()
+    assert lines[2:4]==["G21","G90"] and lines[-1]==opts["pen_up"]
+    strokes,feeds=[],[]
+    pen="up"
+    for line in lines[4:]:
+        if line==opts["pen_up"]:
+            pen="up"
+        elif line==opts["pen_down"]:
+            assert pen=="moved"
+            pen="down"
+            feeds.append([])
+        else:
+            m=re.fullmatch(r"(G[01]) X(-?[\d.]+) Y(-?[\d.]+)(?: F([\d.]+))?",line)
+            assert m, line
+            if m.group(1)=="G0":
+                assert pen=="up"
+                pen="moved"
+                strokes.append([])
+                feeds.append(m.group(4))
+            else:
+                assert pen=="down"
+                feeds[-1].append(m.group(4))
+            strokes[-1].append((float(m.group(2)),float(m.group(3))))
+    assert pen=="up"
+    return strokes,feeds
+def parse_hpgl(text):
+    lines=text.splitlines()
+    assert lines[-1]=="PU;SP0;"
+    strokes=[]
+    for line in lines[1:-1]:
+        m=re.fullmatch(r"PU(-?\d+),(-?\d+);PD((?:-?\d+,-?\d+,)*-?\d+,-?\d+);",line)
+        assert m, line
+        nums=[int(m.group(1)),int(m.group(2))]+[int(v) for v in m.group(3).split(",")]
+        strokes.append(np.array(nums).reshape(-1,2))
+    return lines[0],strokes
+@pytest.fixture(params=[4,core.SVG_BATCH])
+def batch(request,monkeypatch):
+    monkeypatch.setattr(core,"SVG_BATCH",request.param)
+def test_gcode_round_trip(tmp_path,rng,batch):
+    tables=plot_tables(rng)
+    opts=plot_opts()
+    core.write_gcode(str(tmp_path/"a.gcode"),tables,MM_PER_PX,"Red",opts)
+    strokes,feeds=parse_gcode((tmp_path/"a.gcode").read_text(encoding="utf-8"),opts)
+    expect=table_strokes(tables,True)
+    assert len(strokes)==len(expect)
+    for got,want in zip(strokes,expect):
+        assert np.allclose(got,want,atol=5e-4)
+    travel,draw=feeds[0::2],feeds[1::2]
+    assert travel==["6000"]*len(expect)
+    assert [len(d) for d in draw]==[len(w)-1 for w in expect]
+    assert all(d==["1500"]+[None]*(len(d)-1) for d in draw if d)
+    assert strokes[0]==[(0.0,20.0),(5.0,20.0),(5.0,18.0)]
+def test_gcode_without_feeds_leaves_rates_to_controller(tmp_path,rng):
+    opts=plot_opts(0.0,0.0)
+    core.write_gcode(str(tmp_path/"a.gcode"),plot_tables(rng),MM_PER_PX,"Red",opts)
+    _,feeds=parse_gcode((tmp_path/"a.gcode").read_text(encoding="utf-8"),opts)
+    assert not any(f for f in feeds[0::2]) and not any(any(d) for d in feeds[1::2])
+def test_hpgl_round_trip_skips_dots(tmp_path,rng,batch):
+    tables=plot_tables(rng)
+    core.write_hpgl(str(tmp_path/"a.hpgl"),tables,MM_PER_PX,"Red",plot_opts())
+    header,strokes=parse_hpgl((tmp_path/"a.hpgl").read_text(encoding="ascii"))
+    assert header=="IN;SP1;VS2.5;"
+    expect=[np.rint(s*core.HPGL_UNITS_PER_MM).astype(np.int64) for s in table_strokes(tables,True)]
+    expect=[s for s in expect if np.any(s!=s[0])]
+    assert len(expect)==len(table_strokes(tables,True))-2
+    assert len(strokes)==len(expect)
+    assert all(np.array_equal(got,want) for got,want in zip(strokes,expect))
+    assert strokes[0].tolist()==[[0,800],[200,800],[200,720]]
+def test_segments_round_trip(tmp_path,rng,batch):
+    tables=plot_tables(rng)
+    core.write_segments(str(tmp_path/"a.npy"),tables,MM_PER_PX,"Red",plot_opts())
+    seg=np.load(str(tmp_path/"a.npy"))
+    expect=np.concatenate([np.column_stack((s[:-1],s[1:])) for s in table_strokes(tables,False) if len(s)>1])
+    assert seg.dtype==np.float32 and seg.shape==expect.shape
+    assert np.allclose(seg,expect,atol=1e-5)
+    assert seg[0].tolist()==[0.0,0.0,5.0,0.0]
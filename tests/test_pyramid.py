@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from PIL import Image
+import hatchSmithcore as core
+def make_png(path,mode,h=301,w=419,seed=5):
+    rng=np.random.default_rng(seed)
+    arr=rng.integers(0,256,size=(h,w,4),dtype=np.uint8)
+    arr[...,:3]=np.clip(arr[...,:3]//4+np.mgrid[0:h,0:w][1][...,None]*200//w,0,255)
+    if mode=="RGBA":
+        arr[...,3]=np.where(rng.random((h,w))<0.3,rng.integers(0,256,size=(h,w)),255)
+    img=Image.fromarray(arr,"RGBA")
+    if mode=="P":
+        img=img.convert("RGB").quantize(32)
+        img.info["transparency"]=bytes([0,128]+[255]*30)
+        img.save(path,transparency=img.info["transparency"])
+    else:
+        img.convert(mode).save(path)
+    return np.asarray(Image.open(path).convert("RGBA"))
+@pytest.mark.parametrize("mode",["RGB","RGBA","L","P"])
+def test_level_zero_tiles_match_full_decode(tmp_path,mode):
+    full=make_png(tmp_path/"src.png",mode)
+    pyr=core.load_pyramid(str(tmp_path/"src.png"),tile=128)
+    assert pyr.size==(419,301)
+    for tx,ty in pyr.tiles(0,0,0,419,301):
+        assert np.array_equal(pyr.tile_rgba(0,tx,ty),full[ty*128:ty*128+128,tx*128:tx*128+128])
+def test_levels_are_memory_mapped_reductions(tmp_path):
+    full=make_png(tmp_path/"src.png","RGB")
+    pyr=core.load_pyramid(str(tmp_path/"src.png"),tile=64)
+    assert pyr.sizes==[(419,301),(210,151),(105,76),(53,38)]
+    assert all(isinstance(level,np.memmap) for level in pyr.levels[1:])
+    ref=Image.fromarray(full,"RGBA")
+    for level in range(1,len(pyr.sizes)):
+        ref=ref.reduce(2)
+        w,h=pyr.sizes[level]
+        assert np.array_equal(pyr.rgba(level,0,h),np.asarray(ref))
+def test_reduce_weights_colour_by_alpha(rng):
+    a=rng.integers(0,256,size=(9,11,4),dtype=np.uint8)
+    expect=np.asarray(Image.fromarray(a,"RGBA").reduce(2)).astype(int)
+    got=core.reduce_rgba(a).astype(int)
+    assert np.array_equal(got[...,3],expect[...,3])
+    visible=expect[...,3]>32
+    assert np.abs(got-expect)[visible][:,:3].max()<=8
+def test_preview_fits_and_tiles_cover_level(tmp_path):
+    make_png(tmp_path/"src.png","RGB",h=900,w=2600)
+    pyr=core.load_pyramid(str(tmp_path/"src.png"),tile=256)
+    img=pyr.preview((1200,700))
+    assert img.mode=="RGBA" and img.size==(1200,415)
+    level=pyr.level_for(0.3)
+    assert level==1
+    w,h=pyr.sizes[level]
+    keys=pyr.tiles(level,0,0,2600,900)
+    assert sum(pyr.tile_rgba(level,tx,ty).shape[0]*pyr.tile_rgba(level,tx,ty).shape[1] for tx,ty in keys)==w*h
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+import hatchSmithcore as core
+from conftest import blob_labels
+def ref_opening(lab,radius):
+    h,w=lab.shape
+    core_px=np.zeros((h,w),dtype=bool)
+    for y in range(h):
+        for x in range(w):
+            win=lab[max(0,y-radius):y+radius+1,max(0,x-radius):x+radius+1]
+            core_px[y,x]=(win==lab[y,x]).all()
+    kept=np.zeros((h,w),dtype=bool)
+    for y,x in zip(*np.nonzero(core_px)):
+        kept[max(0,y-radius):y+radius+1,max(0,x-radius):x+radius+1]=True
+    return ~kept
+def ref_areas(lab):
+    h,w=lab.shape
+    area=np.zeros((h,w),dtype=np.int64)
+    seen=np.zeros((h,w),dtype=bool)
+    for sy in range(h):
+        for sx in range(w):
+            if seen[sy,sx]:
+                continue
+            todo,comp=[(sy,sx)],[]
+            seen[sy,sx]=True
+            while todo:
+                y,x=todo.pop()
+                comp.append((y,x))
+                for ny,nx in ((y-1,x),(y+1,x),(y,x-1),(y,x+1)):
+                    if 0<=ny<h and 0<=nx<w and not seen[ny,nx] and lab[ny,nx]==lab[y,x]:
+                        seen[ny,nx]=True
+                        todo.append((ny,nx))
+            for y,x in comp:
+                area[y,x]=len(comp)
+    return area
+@pytest.mark.parametrize("radius",[1,2,3])
+def test_opening_matches_brute_force(rng,radius):
+    for cells in (1,3,7):
+        lab=blob_labels(rng,23,31,4,cells)
+        assert np.array_equal(core.label_opening(lab,radius),ref_opening(lab,radius))
+@pytest.mark.parametrize("shape",[(1,17),(17,1),(19,23)])
+def test_component_areas_match_brute_force(rng,shape):
+    for cells in (1,2,5):
+        lab=blob_labels(rng,*shape,3,cells)
+        size,comp,area,top,bottom=core.label_components(lab)
+        assert np.array_equal(np.repeat(area[comp],size).reshape(shape),ref_areas(lab))
+        assert size[:top].sum()==shape[1] and size[bottom:].sum()==shape[1]
+@pytest.mark.parametrize("radius,min_area",[(0,1),(0,12),(1,1),(1,9),(2,40),(3,25)])
+def test_strips_match_whole_image(rng,radius,min_area):
+    for cells in (1,3,6):
+        lab=blob_labels(rng,61,37,5,cells)
+        whole=np.empty_like(lab)
+        n=core.clean_labels(lab,whole,radius,min_area)
+        assert n==np.count_nonzero(whole!=lab)
+        for rows in (1,2,5,16,60,61):
+            out=np.empty_like(lab)
+            assert core.clean_labels(lab,out,radius,min_area,rows)==n
+            assert np.array_equal(out,whole),rows
+def test_small_regions_are_reassigned_to_neighbours():
+    lab=np.zeros((30,40),dtype=np.uint8)
+    lab[:,20:]=1
+    lab[5:7,5:7]=2
+    lab[20,30]=3
+    lab[10:25,10:13]=4
+    out=np.empty_like(lab)
+    core.clean_labels(lab,out,0,5,rows=4)
+    assert set(np.unique(out))=={0,1,4}
+    assert (out[5:7,5:7]==0).all() and out[20,30]==1
+    assert np.array_equal(out[10:25,10:13],lab[10:25,10:13])
+    core.clean_labels(lab,out,1,1,rows=4)
+    assert set(np.unique(out))=={0,1,4}
+@pytest.mark.parametrize("angle",["h","v",30.0,-70.0])
+def test_drop_short_runs_uses_stroke_length(rng,angle):
+    mask=blob_labels(rng,50,60,3,2)==0
+    runs=core.hatch_runs(mask,core.HATCH_ANGLES.get(angle,angle),2)
+    steep,slope,_,_,c,t0,t1=runs
+    x0,y0,x1,y1=core.segments_from_runs(steep,slope,c,t0,t1)
+    length=np.hypot(x1-x0,y1-y0)
+    for min_px in (1.5,3.0,7.0):
+        kept=core.drop_short_runs(runs,min_px)
+        assert np.array_equal(kept[4],c[length>=min_px-1e-9])
+        assert np.array_equal(kept[5],t0[length>=min_px-1e-9])
+        assert len(core.mode_strokes(mask,2,angle,min_px=min_px)[2])-1==int((length>=min_px-1e-9).sum())
+@pytest.mark.parametrize("engine,rows",[(core.HATCH_ENGINES[0],0),(core.HATCH_ENGINES[0],7),(core.HATCH_ENGINES[1],0)])
+def test_run_count_matches_stroke_tables(rng,engine,rows):
+    labels=blob_labels(rng,45,52,4,cells=3)
+    labels[:,:3]=3
+    index=core.label_index(labels,5)
+    for pidx in range(5):
+        for step,modes in ((2,["h","v"]),(3,["d1",30.0]),(40,["h"])):
+            strokes=core.layer_source(labels,index,pidx,rows,engine) if index[pidx] else None
+            expect=0 if strokes is None else sum(t[3] for t in strokes(step,modes)) or sum(t[3] for t in strokes(1,["h"]))
+            assert core.layer_run_count(labels,index,pidx,rows,engine,step,modes)==expect
+def test_export_caches_counts_before_filter(tmp_path,rng):
+    from PIL import Image
+    arr=np.repeat(np.repeat(rng.integers(0,256,(8,10,3)),6,axis=0),6,axis=1).astype(np.uint8)
+    arr[rng.random(arr.shape[:2])<0.05]=255
+    Image.fromarray(arr).save(tmp_path/"in.png")
+    logs=[]
+    for k in range(2):
+        job=core.ExportJob()
+        job.input_png_path=str(tmp_path/"in.png")
+        job.output_dir=str(tmp_path/f"out{k}")
+        job.n_colors=4
+        job.draw_w_mm=60.0
+        job.speckle_filter=True
+        job.cache_mb=64
+        job.cache_dir=str(tmp_path/"cache")
+        core.Exporter(job,logs.append).run()
+    assert any("runs 0 hit / 1 miss" in m for m in logs)
+    assert any("runs 1 hit / 0 miss" in m for m in logs)
+    stats=[open(tmp_path/f"out{k}"/"svg"/"svg_stats.txt",encoding="utf-8").read() for k in range(2)]
+    assert stats[0]==stats[1] and "paths_before_filter=" in stats[0]
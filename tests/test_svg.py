@@ -0,0 +1,69 @@
+import re
+import numpy as np
+import pytest
+import hatchSmithcore as core
+PATH=re.compile(r'<path d="([^"]*)"/>')
+CMD=re.compile(r"([mlhv])(-?\d+)(?: (-?\d+))?")
+ABS=re.compile(r"([ML]) (-?[\d.]+) (-?[\d.]+)")
+def decode_compact(text):
+    strokes=[]
+    for d in PATH.findall(text):
+        x=y=0
+        for cmd,a,b in CMD.findall(d):
+            if cmd in "ml":
+                x,y=x+int(a),y+int(b)
+            elif cmd=="h":
+                x+=int(a)
+            else:
+                y+=int(a)
+            if cmd=="m":
+                strokes.append([])
+            strokes[-1].append((x,y))
+        assert "".join(m.group(0) for m in CMD.finditer(d))==d
+    return strokes
+def decode_absolute(text):
+    strokes=[]
+    for d in PATH.findall(text):
+        strokes.append([(float(a),float(b)) for _,a,b in ABS.findall(d)])
+    return strokes
+def random_strokes(rng,n,max_pts=5,size=2000.0):
+    lens=rng.integers(2,max_pts+1,size=n)
+    offs=np.concatenate(([0],np.cumsum(lens))).astype(np.int64)
+    xs=rng.random(offs[-1])*size
+    ys=rng.random(offs[-1])*size
+    snap=rng.random(offs[-1])<0.3
+    xs[1:][snap[1:]]=xs[:-1][snap[1:]]
+    snap=rng.random(offs[-1])<0.3
+    ys[1:][snap[1:]]=ys[:-1][snap[1:]]
+    return xs,ys,offs
+def expected_um(xs,ys,offs,mm_per_px):
+    X=np.rint(xs*mm_per_px*core.SVG_UNITS_PER_MM).astype(np.int64)
+    Y=np.rint(ys*mm_per_px*core.SVG_UNITS_PER_MM).astype(np.int64)
+    return [list(zip(X[a:b].tolist(),Y[a:b].tolist())) for a,b in zip(offs[:-1],offs[1:])]
+@pytest.mark.parametrize("batch",[core.SVG_BATCH,1,3])
+@pytest.mark.parametrize("max_pts",[2,6])
+def test_compact_paths_decode_to_rounded_microns(rng,monkeypatch,batch,max_pts):
+    monkeypatch.setattr(core,"SVG_BATCH",batch)
+    xs,ys,offs=random_strokes(rng,40,max_pts)
+    mm_per_px=0.137
+    batches=list(core.compact_path_batches(xs,ys,offs,mm_per_px))
+    assert sum(n for _,n in batches)==len(offs)-1
+    assert decode_compact("".join(t for t,_ in batches))==expected_um(xs,ys,offs,mm_per_px)
+def test_compact_uses_short_commands_for_axis_moves():
+    xs=np.array([0.0,10.0,10.0,3.0,7.0])
+    ys=np.array([0.0,0.0,5.0,1.0,2.0])
+    offs=np.array([0,3,5])
+    text="".join(t for t,_ in core.compact_path_batches(xs,ys,offs,1.0))
+    assert text=='<path d="m0 0h10000v5000m-7000 -4000l4000 1000"/>\n'
+def test_compact_matches_absolute_encoding(rng):
+    xs,ys,offs=random_strokes(rng,30,4)
+    mm_per_px=0.0421
+    compact,absolute=[],[]
+    stat_c=core.write_strokes(compact.append,[(xs,ys,offs,7)],mm_per_px,encoding=core.SVG_ENCODINGS[1])
+    stat_a=core.write_strokes(absolute.append,[(xs,ys,offs,7)],mm_per_px,encoding=core.SVG_ENCODINGS[0])
+    assert stat_c==stat_a
+    got=decode_compact("".join(compact))
+    ref=decode_absolute("".join(absolute))
+    assert [len(s) for s in got]==[len(s) for s in ref]
+    diff=np.abs(np.array([p for s in got for p in s])/core.SVG_UNITS_PER_MM-np.array([p for s in ref for p in s]))
+    assert diff.max()<=0.001+1e-9
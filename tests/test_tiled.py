@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from PIL import Image
+import hatchSmithcore as core
+def photo(h=120,w=160,seed=3):
+    rng=np.random.default_rng(seed)
+    y,x=np.mgrid[0:h,0:w]
+    img=np.stack([x*255.0/w,y*255.0/h,128+100*np.sin(x/9.0+y/13.0)],-1)+rng.normal(0,12,(h,w,3))
+    return np.clip(img,0,255).astype(np.uint8)
+def save_mode(path,mode):
+    img=Image.fromarray(photo(37,53))
+    img=img.quantize(20) if mode=="P" else img.convert(mode)
+    img.save(path)
+    return np.asarray(Image.open(path).convert("RGB"))
+@pytest.mark.parametrize("mode",["RGB","RGBA","L","P"])
+def test_direct_decode_matches_pillow(tmp_path,mode):
+    expect=save_mode(tmp_path/"src.png",mode)
+    src=core.TiledSource(str(tmp_path/"src.png"),str(tmp_path/"src.npy"))
+    major=int(Image.__version__.split(".")[0])
+    assert src.direct==(core.PNG_DIRECT_PILLOW[0]<=major<=core.PNG_DIRECT_PILLOW[1])
+    assert src.size==(53,37)
+    assert np.array_equal(np.concatenate([src.rows(y,y+5) for y in range(0,37,5)]),expect)
+@pytest.mark.parametrize("mode",["RGB","P"])
+def test_fallback_decode_matches_pillow(tmp_path,monkeypatch,mode):
+    expect=save_mode(tmp_path/"src.png",mode)
+    monkeypatch.setattr(core,"PNG_DIRECT_PILLOW",(0,0))
+    monkeypatch.setattr(core,"HATCH_CHUNK",200)
+    src=core.TiledSource(str(tmp_path/"src.png"),str(tmp_path/"src.npy"))
+    assert not src.direct
+    assert np.array_equal(src.rows(0,37),expect)
+def test_decode_ignores_global_pixel_limit(tmp_path,monkeypatch):
+    expect=save_mode(tmp_path/"src.png","RGB")
+    monkeypatch.setattr(Image,"MAX_IMAGE_PIXELS",100)
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(tmp_path/"src.png")
+    src=core.TiledSource(str(tmp_path/"src.png"),str(tmp_path/"src.npy"))
+    assert np.array_equal(src.rows(0,37),expect)
+    assert Image.MAX_IMAGE_PIXELS==100
+@pytest.mark.parametrize("n_colors",[4,8,16])
+def test_tiled_labels_close_to_full_decode(tmp_path,n_colors):
+    img=photo()
+    Image.fromarray(img).save(tmp_path/"src.png")
+    src=core.TiledSource(str(tmp_path/"src.png"),str(tmp_path/"src.npy"))
+    palette=core.fit_palette_sample(src,n_colors,64)
+    tiled=core.palette_mapper(palette)(src.rows(0,120))
+    _,full,full_palette,_=core.quantize_image_rgb(Image.fromarray(img),n_colors)
+    assert palette==full_palette
+    assert (tiled==full).mean()>=0.95
+    pal=np.array(palette,dtype=float)
+    err=lambda labels:((img-pal[labels])**2).sum(axis=-1).mean()
+    assert err(tiled)<=1.02*err(full)
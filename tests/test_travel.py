@@ -0,0 +1,79 @@
+import time
+import numpy as np
+import pytest
+import hatchSmithcore as core
+from conftest import blob_labels
+def random_strokes(rng,n,max_pts=4):
+    lens=rng.integers(2,max_pts+1,size=n)
+    offs=np.concatenate(([0],np.cumsum(lens))).astype(np.int64)
+    return rng.random(offs[-1])*100.0,rng.random(offs[-1])*60.0,offs
+def stroke_set(xs,ys,offs):
+    out=[]
+    for a,b in zip(offs[:-1].tolist(),offs[1:].tolist()):
+        fwd=tuple(zip(xs[a:b].tolist(),ys[a:b].tolist()))
+        out.append(min(fwd,fwd[::-1]))
+    return sorted(out)
+def greedy_order(sx,sy,ex,ey):
+    n=len(sx)
+    left=set(range(1,n))
+    order=[0]
+    flip=[False]
+    cx,cy=ex[0],ey[0]
+    while left:
+        best=min(((sx[i]-cx)**2+(sy[i]-cy)**2,i,False) for i in left)
+        best=min(best,min(((ex[i]-cx)**2+(ey[i]-cy)**2,i,True) for i in left))
+        _,i,rev=best
+        left.discard(i)
+        order.append(i)
+        flip.append(rev)
+        cx,cy=(sx[i],sy[i]) if rev else (ex[i],ey[i])
+    return order,flip
+@pytest.mark.parametrize("n",[3,17,200])
+@pytest.mark.parametrize("refine",[False,True])
+def test_order_is_permutation_of_strokes(rng,n,refine):
+    xs,ys,offs=random_strokes(rng,n)
+    oxs,oys,ooffs=core.optimize_stroke_order(xs,ys,offs,refine)
+    assert np.array_equal(np.sort(np.diff(ooffs)),np.sort(np.diff(offs)))
+    assert stroke_set(oxs,oys,ooffs)==stroke_set(xs,ys,offs)
+@pytest.mark.parametrize("n",[5,40,300])
+def test_nearest_neighbour_matches_greedy_search(rng,n):
+    ends=core.stroke_ends(*random_strokes(rng,n))
+    order,flip=core.nearest_neighbour_order(*ends)
+    expect_order,expect_flip=greedy_order(*(e.tolist() for e in ends))
+    assert order.tolist()==expect_order
+    assert flip.tolist()==expect_flip
+def stacked_ends(n,width,transpose):
+    y=np.arange(n,dtype=float)*0.5
+    ends=(np.zeros(n),y,np.full(n,width),y.copy())
+    return (ends[1],ends[0],ends[3],ends[2]) if transpose else ends
+@pytest.mark.parametrize("transpose",[False,True])
+def test_nearest_neighbour_matches_greedy_on_stacked_strokes(transpose):
+    ends=stacked_ends(60,40.0,transpose)
+    order,flip=core.nearest_neighbour_order(*ends)
+    expect_order,expect_flip=greedy_order(*(e.tolist() for e in ends))
+    assert order.tolist()==expect_order
+    assert flip.tolist()==expect_flip
+@pytest.mark.parametrize("transpose",[False,True])
+def test_nearest_neighbour_is_fast_on_stacked_strokes(transpose):
+    ends=stacked_ends(100000,3000.0,transpose)
+    t=time.perf_counter()
+    order,flip=core.nearest_neighbour_order(*ends)
+    assert time.perf_counter()-t<5.0
+    assert order.tolist()==list(range(100000))
+    assert flip.tolist()==[i%2==1 for i in range(100000)]
+def test_two_opt_never_lengthens_travel(rng):
+    for _ in range(5):
+        xs,ys,offs=core.optimize_stroke_order(*random_strokes(rng,150),False)
+        order,flip=core.two_opt_refine(*core.stroke_ends(xs,ys,offs))
+        assert sorted(order.tolist())==list(range(150))
+        assert core.stroke_travel(*core.apply_stroke_order(xs,ys,offs,order,flip))<=core.stroke_travel(xs,ys,offs)+1e-9
+def test_layer_travel_keeps_strokes(rng):
+    labels=blob_labels(rng,48,60,3,cells=7)
+    index=core.label_index(labels,3)
+    tables=list(core.layer_source(labels,index,1)(2,["h","v"],join=True))
+    xs,ys,offs,runs=core.concat_strokes(tables)
+    for mode in core.TRAVEL_MODES[1:]:
+        keep=[]
+        stat=core.write_strokes(lambda text:None,tables,0.5,mode,keep)
+        assert stat[1]==runs
+        assert stroke_set(*keep[0][:3])==stroke_set(xs,ys,offs)